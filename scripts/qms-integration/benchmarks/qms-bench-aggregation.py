@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+QMS Aggregation Benchmark
+Compares the reporter's metrics and trend aggregation done the old way
+(``pd.read_sql_query`` plus DataFrame filtering and ``to_dict('records')``)
+with the tuple-based ``qms_rollups`` engine. Both run the same raw aggregate
+queries, so the difference is the DataFrame overhead; the rollup path shows
+what the reporter actually does when rollups are installed.
+"""
+
+import os
+import sys
+import json
+import argparse
+import sqlite3
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'database'))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'reporting'))
+from qms_migrations import connect, migrate
+from qms_rollups import DAY_MS, ROLLUP_SOURCES, combine, raw_aggregate_query, read_series, read_window
+from qms_time import TimeWindow
+from qms_profiler import StageProfiler
+from qms_bench_data import populate
+
+SUMMARY_TABLES = ['quality_gate_results', 'code_coverage_results', 'security_scan_results', 'code_review_results']
+TREND_TABLES = ['quality_gate_results', 'code_coverage_results']
+
+
+def pandas_path(conn: sqlite3.Connection, window: TimeWindow) -> Dict[str, Any]:
+    """The same raw aggregate queries, materialised and post-processed as DataFrames"""
+    import pandas as pd
+
+    metrics: Dict[str, Any] = {}
+    for table in SUMMARY_TABLES:
+        sql, params = raw_aggregate_query(ROLLUP_SOURCES[table], window)
+        df = pd.read_sql_query(sql, conn, params=params)
+        totals = df.drop(columns='dim').sum()
+        metrics[table] = {
+            'total': int(totals.iloc[0]),
+            'by_dimension': df[df['dim'] != ''].to_dict('records')
+        }
+
+    for table in TREND_TABLES:
+        sql, params = raw_aggregate_query(ROLLUP_SOURCES[table], window, group_by_bucket=DAY_MS)
+        df = pd.read_sql_query(sql, conn, params=params)
+        df['date'] = pd.to_datetime(df['bucket'], unit='ms')
+        metrics[f"{table}_trend"] = df.drop(columns='dim').groupby('date').sum().reset_index().to_dict('records')
+
+    return metrics
+
+
+def lean_path(conn: sqlite3.Connection, window: TimeWindow, use_rollups: bool) -> Dict[str, Any]:
+    """The reporter's current tuple-based aggregation"""
+    def fetch(query, params=()):
+        return conn.execute(query, params).fetchall()
+
+    metrics: Dict[str, Any] = {}
+    for table in SUMMARY_TABLES:
+        aggregates = read_window(fetch, table, window, use_rollups)
+        metrics[table] = {
+            metric: combine(aggregates, metric).mean for _, metric in aggregates
+        }
+    for table in TREND_TABLES:
+        metrics[f"{table}_trend"] = read_series(fetch, table, 'day', window, use_rollups)
+    return metrics
+
+
+def measure(profiler: StageProfiler, name: str, run: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """Median wall time and mean CPU time in milliseconds, profiled as stage ``name``"""
+    for _ in range(repeat):
+        with profiler.stage(name):
+            run()
+    summary = profiler.summary()[name]
+    return {'path': name, 'median_ms': summary['median_wall_ms'], 'cpu_ms': summary['cpu_ms'] / summary['calls']}
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Benchmark DataFrame vs tuple-based metric aggregation')
+    parser.add_argument('--rows', type=int, default=200000, help='Rows per result table')
+    parser.add_argument('--days', type=int, default=90, help='Days of history to spread rows over')
+    parser.add_argument('--window-days', type=int, default=30, help='Report window in days')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed runs per path')
+    parser.add_argument('--json', action='store_true', help='Output results in JSON format')
+    parser.add_argument('--profile', metavar='FILE', help='Also write every timed run as a stage profile')
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect(os.path.join(tmp, 'qms-bench.db'))
+        migrate(conn, target=1)
+        populate(conn, args.rows, args.days)
+        migrate(conn)
+
+        window = TimeWindow.last(days=args.window_days)
+        profiler = StageProfiler()
+        results: List[Dict[str, Any]] = []
+
+        try:
+            # Warm-up also pays the one-off pandas import outside the timed runs
+            pandas_path(conn, window)
+            results.append(measure(profiler, 'pandas_raw', lambda: pandas_path(conn, window), args.repeat))
+        except ImportError:
+            print("pandas not installed; skipping the DataFrame path", file=sys.stderr)
+
+        for name, use_rollups in (('tuples_raw', False), ('tuples_rollups', True)):
+            lean_path(conn, window, use_rollups)
+            results.append(measure(profiler, name, lambda: lean_path(conn, window, use_rollups), args.repeat))
+        conn.close()
+
+    if args.profile:
+        profiler.write_json(Path(args.profile))
+
+    baseline = results[0]['median_ms']
+    for item in results:
+        item['median_ms'] = round(item['median_ms'], 3)
+        item['cpu_ms'] = round(item['cpu_ms'], 3)
+        item['speedup'] = round(baseline / max(item['median_ms'], 1e-6), 1)
+
+    if args.json:
+        print(json.dumps({'rows_per_table': args.rows, 'window_days': args.window_days, 'results': results}, indent=2))
+        return
+
+    print(f"{args.rows} rows per table, {args.window_days}-day window (median of {args.repeat} runs)\n")
+    for item in results:
+        print(f"  {item['path']:<16} {item['median_ms']:10.3f} ms  {item['cpu_ms']:10.3f} ms CPU  {item['speedup']}x")
+
+
+if __name__ == '__main__':
+    main()
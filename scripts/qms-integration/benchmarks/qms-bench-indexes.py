@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+QMS Index Benchmark
+Times the reporter and monitor time-window queries against a synthetic
+database before and after the epoch-timestamp migration: first on the
+reporting indexes over ``created_at`` text, then on the ``created_at_ms``
+indexes that replace them, and shows the query plan of each.
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'database'))
+from qms_migrations import EPOCH_VERSION, connect, migrate
+from qms_rollups import ROLLUP_SOURCES, raw_aggregate_query
+from qms_time import TimeWindow, utc_from_epoch_ms
+from qms_bench_data import populate
+
+
+def _on_text_timestamps(query: Tuple[str, Tuple[int, int]], window: TimeWindow) -> Tuple[str, Tuple[str, str]]:
+    """The same query filtering ``created_at`` text, as it ran before the epoch column existed"""
+    sql, params = query
+    epoch_where, _ = window.sql()
+    text_where, _ = window.sql('created_at')
+    bounds = tuple(utc_from_epoch_ms(value).strftime('%Y-%m-%d %H:%M:%S') for value in params)
+    return sql.replace(epoch_where, text_where), bounds
+
+
+def benchmark_queries(epoch: bool = True) -> Dict[str, Tuple[str, Tuple[Any, ...]]]:
+    """The raw-table queries issued by the reporter fallback/edges and the monitor.
+
+    With ``epoch=False`` they filter on ``created_at`` so they run on a
+    schema older than ``EPOCH_VERSION``.
+    """
+    last_hour = TimeWindow.last(hours=1)
+    last_hour_where, last_hour_params = last_hour.sql()
+    queries = {
+        'monitor_quality_gates_last_hour': ((f"""
+            SELECT status, COUNT(*) as count, AVG(score) as avg_score
+            FROM quality_gate_results
+            WHERE {last_hour_where}
+            GROUP BY status
+        """, last_hour_params), last_hour),
+        'reporter_quality_gates_30d': ('quality_gate_results', TimeWindow.last(days=30)),
+        'reporter_quality_gates_edge_hour': ('quality_gate_results', last_hour),
+        'reporter_security_7d': ('security_scan_results', TimeWindow.last(days=7)),
+        'reporter_code_review_7d': ('code_review_results', TimeWindow.last(days=7))
+    }
+
+    built = {}
+    for name, (query, window) in queries.items():
+        if isinstance(query, str):
+            query = raw_aggregate_query(ROLLUP_SOURCES[query], window)
+        built[name] = query if epoch else _on_text_timestamps(query, window)
+    return built
+
+
+def measure(conn, queries: Dict[str, Tuple[str, Tuple[Any, ...]]], repeat: int) -> Dict[str, Dict[str, Any]]:
+    """Median wall time and query plan for each query"""
+    results = {}
+    for name, (sql, params) in queries.items():
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = {'median_ms': statistics.median(timings), 'plan': plan}
+    return results
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Benchmark QMS queries before and after the epoch-timestamp migration')
+    parser.add_argument('--rows', type=int, default=200000, help='Rows per result table')
+    parser.add_argument('--days', type=int, default=90, help='Days of history to spread rows over')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query')
+    parser.add_argument('--json', action='store_true', help='Output results in JSON format')
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect(os.path.join(tmp, 'qms-bench.db'))
+        # Populate before the rollup triggers exist, then bring the schema up to
+        # the last version that indexes ``created_at`` text
+        migrate(conn, target=1)
+        populate(conn, args.rows, args.days)
+        migrate(conn, target=EPOCH_VERSION - 1)
+        before = measure(conn, benchmark_queries(epoch=False), args.repeat)
+
+        migrate(conn, target=EPOCH_VERSION)
+        queries = benchmark_queries()
+        after = measure(conn, queries, args.repeat)
+        conn.close()
+
+    report: List[Dict[str, Any]] = []
+    for name in queries:
+        report.append({
+            'query': name,
+            'before_ms': round(before[name]['median_ms'], 3),
+            'after_ms': round(after[name]['median_ms'], 3),
+            'speedup': round(before[name]['median_ms'] / max(after[name]['median_ms'], 1e-6), 1),
+            'plan_before': before[name]['plan'],
+            'plan_after': after[name]['plan']
+        })
+
+    if args.json:
+        print(json.dumps({'rows_per_table': args.rows, 'days': args.days, 'results': report}, indent=2))
+        return
+
+    print(f"{args.rows} rows per table over {args.days} days (median of {args.repeat} runs)\n")
+    for item in report:
+        print(f"{item['query']}")
+        print(f"  before: {item['before_ms']:10.3f} ms  {' | '.join(item['plan_before'])}")
+        print(f"  after:  {item['after_ms']:10.3f} ms  {' | '.join(item['plan_after'])}")
+        print(f"  speedup: {item['speedup']}x\n")
+
+
+if __name__ == '__main__':
+    main()
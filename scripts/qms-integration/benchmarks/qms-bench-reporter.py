@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+QMS Reporter Benchmark
+Times the reporter's pipeline stages (metric collection, each chart method
+and each output format) against deterministic synthetic databases of
+10k to 50M rows per result table.
+
+Generated databases are expensive at the upper end, so they are kept in
+``--data-dir`` under a name derived from the generator arguments and reused
+by later runs. Results are written as JSON that ``--compare`` can diff
+against a run from another commit.
+"""
+
+import os
+import sys
+import json
+import platform
+import argparse
+import importlib.util
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+REPORTER = SCRIPTS_DIR / 'reporting' / 'qms-reporter.py'
+
+sys.path.insert(0, str(SCRIPTS_DIR / 'database'))
+sys.path.insert(0, str(SCRIPTS_DIR / 'reporting'))
+from qms_migrations import connect, migrate
+from qms_profiler import StageProfiler
+from qms_bench_data import populate
+
+SUFFIXES = {'k': 1000, 'm': 1000000}
+
+# Stages faster than this are too noisy for --compare to call a regression
+NOISE_FLOOR_MS = 5.0
+
+
+def row_count(value: str) -> int:
+    """Row counts such as 10000, 10k or 50M"""
+    multiplier = SUFFIXES.get(value[-1:].lower(), 1)
+    return int(float(value[:-1] if multiplier > 1 else value) * multiplier)
+
+
+def load_reporter():
+    """The qms-reporter.py module (its file name is not importable)"""
+    spec = importlib.util.spec_from_file_location('qms_reporter', REPORTER)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def benchmark_database(data_dir: Path, rows: int, days: int, seed: int, end: datetime) -> Dict[str, Any]:
+    """Path of the generated database for these arguments, generating it if needed"""
+    db_path = data_dir / f"qms-bench-{rows}r-{days}d-s{seed}-{end:%Y%m%d%H}.db"
+    generate_s = None
+    if not db_path.exists():
+        data_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = db_path.with_suffix('.db.tmp')
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+        def progress(table: str, written: int) -> None:
+            if written % 1000000 == 0 or written == rows:
+                print(f"  {table}: {written} rows", file=sys.stderr)
+
+        print(f"Generating {rows} rows per table into {db_path}", file=sys.stderr)
+        start = time.perf_counter()
+        conn = connect(str(tmp_path))
+        # Populate before the rollup and sketch triggers exist; the migrations backfill them in bulk
+        migrate(conn, target=1)
+        populate(conn, rows, days, seed, end, progress=progress)
+        migrate(conn)
+        conn.close()
+        os.replace(tmp_path, db_path)
+        generate_s = round(time.perf_counter() - start, 1)
+
+    return {'path': db_path, 'generate_s': generate_s, 'database_bytes': db_path.stat().st_size}
+
+
+def run_pipeline(reporter, window_days: int, charts: bool, formats: List[str]) -> None:
+    """One pass over the benchmarked stages, recorded by ``reporter.profiler``"""
+    profiler = reporter.profiler
+    with profiler.stage('collect_quality_metrics'):
+        metrics = reporter.collect_quality_metrics(window_days)
+
+    chart_sources: Dict[str, str] = {}
+    if charts:
+        for name, generate in (('generate_trend_charts', lambda: reporter.generate_trend_charts(metrics, window_days)),
+                               ('generate_summary_charts', lambda: reporter.generate_summary_charts(metrics))):
+            with profiler.stage(name):
+                encoded = generate()
+            chart_sources.update({chart: f"data:image/png;base64,{image}" for chart, image in encoded.items()})
+
+    for output_format in formats:
+        with profiler.stage(f"format:{output_format}"):
+            with profiler.stage('render'):
+                if output_format == 'html':
+                    content = reporter.generate_html_report(metrics, chart_sources)
+                else:
+                    content = reporter.generate_json_report(metrics)
+            with profiler.stage('save'):
+                reporter.save_report(content, f"bench.{output_format}", output_format)
+
+
+def benchmark(module, db_path: Path, work_dir: Path, args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    """Per-stage timings over ``args.repeat`` runs after one warm-up run"""
+    config_path = work_dir / 'qms-config.yaml'
+    with open(config_path, 'w') as f:
+        # Caches off: every run must do the full work
+        yaml.safe_dump({
+            'database': {'type': 'sqlite', 'path': str(db_path)},
+            'reporting': {
+                'output_dir': str(work_dir / 'reports'),
+                'query_cache': {'enabled': False},
+                'chart_cache': {'enabled': False}
+            }
+        }, f)
+
+    reporter = module.QMSReporter(str(config_path), str(db_path))
+    # The warm-up pays one-off imports and template compilation outside the timed runs
+    run_pipeline(reporter, args.window_days, not args.no_charts, args.formats)
+
+    reporter.profiler = StageProfiler(trace_memory=args.trace_memory)
+    for _ in range(args.repeat):
+        run_pipeline(reporter, args.window_days, not args.no_charts, args.formats)
+
+    return {
+        name: {
+            'median_ms': summary['median_wall_ms'],
+            'cpu_ms': round(summary['cpu_ms'] / summary['calls'], 3),
+            'peak_memory_bytes': summary['peak_memory_bytes']
+        }
+        for name, summary in sorted(reporter.profiler.summary().items())
+    }
+
+
+def git_revision() -> Optional[str]:
+    """Commit being benchmarked, with a '-dirty' suffix for uncommitted changes"""
+    try:
+        revision = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=SCRIPTS_DIR, check=True,
+                                  capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=SCRIPTS_DIR,
+                               check=True, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{revision}-dirty" if dirty else revision
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print per-stage changes against ``baseline``; returns the stages slower than ``threshold``"""
+    regressions = []
+    baseline_runs = {run['rows_per_table']: run for run in baseline.get('results', [])}
+    print(f"\nCompared with {baseline.get('revision') or 'baseline'}:")
+    for run in results['results']:
+        previous = baseline_runs.get(run['rows_per_table'])
+        if previous is None:
+            continue
+        for name, stage in run['stages'].items():
+            before = previous['stages'].get(name)
+            if before is None or '/' in name:
+                continue
+            ratio = stage['median_ms'] / max(before['median_ms'], 1e-6)
+            slower = ratio > threshold and stage['median_ms'] - before['median_ms'] > NOISE_FLOOR_MS
+            if slower:
+                regressions.append(f"{run['rows_per_table']}:{name}")
+            print(f"  {run['rows_per_table']:>10} {name:<28} {before['median_ms']:10.1f} -> "
+                  f"{stage['median_ms']:10.1f} ms  {ratio:5.2f}x{'  SLOWER' if slower else ''}")
+    return regressions
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Benchmark the QMS reporter against synthetic databases')
+    parser.add_argument('--rows', type=row_count, nargs='+', default=[10000],
+                        help='Rows per result table, e.g. 10k 1M 50M (one benchmark per value)')
+    parser.add_argument('--days', type=int, default=90, help='Days of history to spread rows over')
+    parser.add_argument('--window-days', type=int, default=30, help='Report window in days')
+    parser.add_argument('--seed', type=int, default=42, help='Generator seed')
+    parser.add_argument('--end', type=datetime.fromisoformat,
+                        help='End of the generated history, ISO date/time in UTC (default: start of today)')
+    parser.add_argument('--data-dir', help='Keep generated databases here and reuse them (default: temporary)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per database')
+    parser.add_argument('--formats', nargs='+', choices=['html', 'json'], default=['html', 'json'],
+                        help='Output formats to time')
+    parser.add_argument('--no-charts', action='store_true', help='Skip the chart stages')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Record peak memory per stage (slows allocation-heavy stages)')
+    parser.add_argument('--output', '-o', help='Write results to this JSON file')
+    parser.add_argument('--compare', metavar='BASELINE', help='Compare with results JSON from an earlier run')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='Slowdown ratio against --compare that fails the run')
+    parser.add_argument('--json', action='store_true', help='Output results in JSON format')
+
+    args = parser.parse_args()
+
+    end = args.end or datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+
+    module = load_reporter()
+    module.logger.setLevel('WARNING')
+    results: Dict[str, Any] = {
+        'revision': git_revision(),
+        'generated_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'parameters': {
+            'days': args.days, 'window_days': args.window_days, 'seed': args.seed, 'end': end.isoformat(),
+            'repeat': args.repeat, 'formats': args.formats, 'charts': not args.no_charts
+        },
+        'results': []
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(args.data_dir) if args.data_dir else Path(tmp) / 'data'
+        for rows in args.rows:
+            database = benchmark_database(data_dir, rows, args.days, args.seed, end)
+            work_dir = Path(tmp) / f"run-{rows}"
+            work_dir.mkdir()
+            results['results'].append({
+                'rows_per_table': rows,
+                'generate_s': database['generate_s'],
+                'database_bytes': database['database_bytes'],
+                'stages': benchmark(module, database['path'], work_dir, args)
+            })
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{args.window_days}-day window over {args.days} days of history (median of {args.repeat} runs)")
+        for run in results['results']:
+            print(f"\n{run['rows_per_table']} rows per table ({run['database_bytes'] / (1024 * 1024):.0f} MB)")
+            for name, stage in run['stages'].items():
+                print(f"  {name:<60} {stage['median_ms']:10.1f} ms  {stage['cpu_ms']:10.1f} ms CPU")
+
+    regressions: List[str] = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        print('FAIL: ' + ', '.join(regressions) if regressions else 'PASS')
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
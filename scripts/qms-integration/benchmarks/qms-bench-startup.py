@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+QMS Reporter Startup Benchmark
+Runs ``qms-reporter.py --format json`` end to end against an empty, migrated
+database and fails if the median wall time exceeds the budget or if any of
+the plotting, PDF or templating stacks get imported on the way.
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Set
+
+import yaml
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+REPORTER = SCRIPTS_DIR / 'reporting' / 'qms-reporter.py'
+
+sys.path.insert(0, str(SCRIPTS_DIR / 'database'))
+from qms_migrations import connect, migrate
+
+# Top-level packages the JSON path must never import
+HEAVY_MODULES = {'pandas', 'numpy', 'matplotlib', 'seaborn', 'plotly', 'reportlab', 'jinja2'}
+
+
+def imported_packages(stderr: str) -> Set[str]:
+    """Top-level package names from ``python -X importtime`` output"""
+    packages = set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        module = line.rsplit('|', 1)[1].strip()
+        packages.add(module.split('.')[0])
+    return packages
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Benchmark qms-reporter.py --format json startup')
+    parser.add_argument('--runs', type=int, default=5, help='Number of timed runs')
+    parser.add_argument('--budget-ms', type=float, default=500.0,
+                        help='Maximum allowed median wall time in milliseconds')
+    parser.add_argument('--json', action='store_true', help='Output results in JSON format')
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'qms.db')
+        conn = connect(db_path)
+        migrate(conn)
+        conn.close()
+
+        config_path = os.path.join(tmp, 'qms-config.yaml')
+        with open(config_path, 'w') as f:
+            yaml.safe_dump({
+                'database': {'type': 'sqlite', 'path': db_path},
+                'reporting': {'output_dir': os.path.join(tmp, 'reports')}
+            }, f)
+
+        command = [sys.executable, str(REPORTER), '--config', config_path, '--format', 'json',
+                   '--output', 'startup.json']
+
+        timings: List[float] = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            subprocess.run(command, check=True, capture_output=True)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        traced = subprocess.run([sys.executable, '-X', 'importtime'] + command[1:],
+                                check=True, capture_output=True, text=True)
+        heavy = sorted(imported_packages(traced.stderr) & HEAVY_MODULES)
+
+    median_ms = statistics.median(timings)
+    passed = median_ms <= args.budget_ms and not heavy
+
+    if args.json:
+        print(json.dumps({
+            'median_ms': round(median_ms, 1),
+            'min_ms': round(min(timings), 1),
+            'budget_ms': args.budget_ms,
+            'heavy_imports': heavy,
+            'passed': passed
+        }, indent=2))
+    else:
+        print(f"qms-reporter.py --format json: median {median_ms:.1f} ms, "
+              f"min {min(timings):.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+        print(f"Heavy imports: {', '.join(heavy) if heavy else 'none'}")
+        print('PASS' if passed else 'FAIL')
+
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+QMS Benchmark Data
+Synthetic result rows shared by the QMS benchmarks.
+
+Rows are deterministic for a given (rows, days, seed, end): the same
+arguments always produce the same database contents. Timestamps follow a
+working-week pattern (busy weekday office hours, quiet nights and weekends)
+with activity growing over the period, and values are drawn from skewed
+distributions rather than uniform ones, so query selectivity and rollup
+bucket fill look like a real CI installation's.
+"""
+
+import time
+import bisect
+import random
+import itertools
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Relative activity per UTC hour of day and per weekday (Monday first)
+HOURLY_WEIGHTS = [1, 1, 1, 1, 1, 2, 3, 5, 8, 10, 10, 9, 7, 9, 10, 10, 9, 7, 5, 3, 2, 2, 1, 1]
+WEEKDAY_WEIGHTS = [10, 10, 10, 10, 8, 2, 1]
+
+# Activity at the end of the period relative to its start
+GROWTH = 1.5
+
+REPOSITORIES = [f"org/service-{index:02d}" for index in range(40)]
+# Zipf-like: a few repositories produce most of the results
+REPOSITORY_WEIGHTS = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(REPOSITORIES))))
+GATE_NAMES = ['build', 'unit-tests', 'integration-tests', 'lint', 'sast', 'coverage']
+SCANNERS = ['bandit', 'semgrep', 'trivy', 'gitleaks']
+REVIEWERS = [f"reviewer{index:02d}" for index in range(25)]
+
+Row = Tuple
+RowFactory = Callable[[random.Random, str], Row]
+
+
+def _hour_slots(days: int, end_s: int) -> Tuple[List[int], List[float]]:
+    """Start of every hour in the period and the cumulative activity weights for sampling them"""
+    start_s = end_s - days * 86400
+    slots = list(range(start_s - start_s % 3600, end_s, 3600))
+    weights = []
+    for slot in slots:
+        moment = time.gmtime(slot)
+        trend = 1 + (GROWTH - 1) * (slot - start_s) / max(end_s - start_s, 1)
+        weights.append(HOURLY_WEIGHTS[moment.tm_hour] * WEEKDAY_WEIGHTS[moment.tm_wday] * trend)
+    return slots, list(itertools.accumulate(weights))
+
+
+def _repository(rng: random.Random) -> str:
+    return rng.choices(REPOSITORIES, cum_weights=REPOSITORY_WEIGHTS)[0]
+
+
+def _quality_gate(rng: random.Random, created_at: str) -> Row:
+    status = rng.choices(('PASS', 'FAIL', 'WARNING'), (80, 12, 8))[0]
+    mean, spread = {'PASS': (88, 6), 'FAIL': (52, 12), 'WARNING': (71, 6)}[status]
+    return (_repository(rng), f"{rng.getrandbits(160):040x}", rng.choice(GATE_NAMES), status,
+            min(100.0, max(0.0, rng.gauss(mean, spread))), created_at)
+
+
+def _code_coverage(rng: random.Random, created_at: str) -> Row:
+    line_coverage = rng.betavariate(8, 2) * 100
+    return (_repository(rng), f"{rng.getrandbits(160):040x}", line_coverage,
+            line_coverage * rng.uniform(0.6, 1.0), created_at)
+
+
+def _security_scan(rng: random.Random, created_at: str) -> Row:
+    severity = rng.choices(('CRITICAL', 'HIGH', 'MEDIUM', 'LOW'), (2, 10, 38, 50))[0]
+    return (_repository(rng), f"{rng.getrandbits(160):040x}", rng.choice(SCANNERS),
+            f"R{rng.randrange(1000):03d}", severity, 'RESOLVED' if rng.random() < 0.7 else 'OPEN', created_at)
+
+
+def _code_review(rng: random.Random, created_at: str) -> Row:
+    return (_repository(rng), rng.randrange(1, 100000), rng.choice(REVIEWERS), rng.lognormvariate(1.2, 1.0),
+            min(int(rng.expovariate(1 / 4)), 200), int(rng.random() < 0.85), created_at)
+
+
+GENERATORS: Dict[str, Tuple[str, RowFactory]] = {
+    'quality_gate_results': (
+        "INSERT INTO quality_gate_results (repository, commit_sha, gate_name, status, score, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)", _quality_gate
+    ),
+    'code_coverage_results': (
+        "INSERT INTO code_coverage_results (repository, commit_sha, line_coverage, branch_coverage, created_at) "
+        "VALUES (?, ?, ?, ?, ?)", _code_coverage
+    ),
+    'security_scan_results': (
+        "INSERT INTO security_scan_results (repository, commit_sha, scanner, rule_id, severity, status, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)", _security_scan
+    ),
+    'code_review_results': (
+        "INSERT INTO code_review_results (repository, pull_request, reviewer, review_time_hours, comments_count, "
+        "approved, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)", _code_review
+    )
+}
+
+
+def populate(conn, rows: int, days: int, seed: int = 42, end: Optional[datetime] = None,
+             batch_size: int = 10000, progress: Optional[Callable[[str, int], None]] = None) -> None:
+    """Fill the result tables with ``rows`` rows each, spread over the ``days`` days before ``end``.
+
+    ``end`` defaults to the start of the current UTC hour. Rows are inserted
+    in (near) ``created_at`` order, as a live installation writes them, and
+    ``progress`` (if given) is called with (table, rows written) after every
+    batch.
+    """
+    end = end or datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    end_s = int(end.timestamp())
+    slots, cum_weights = _hour_slots(days, end_s)
+    total, last_slot = cum_weights[-1], len(slots) - 1
+
+    for table_index, (table, (sql, make_row)) in enumerate(GENERATORS.items()):
+        # Each table has its own seeded stream, so its rows don't depend on the other tables
+        rng = random.Random(f"{seed}:{table_index}")
+        written = 0
+        while written < rows:
+            count = min(batch_size, rows - written)
+            # Stratified inverse-CDF sampling: row i lands in the i-th slice of total activity,
+            # so rows come out in time order while following the hourly weights
+            stamps = sorted(
+                slots[min(bisect.bisect_left(cum_weights, (index + rng.random()) * total / rows), last_slot)]
+                + rng.randrange(3600)
+                for index in range(written, written + count)
+            )
+
+            conn.execute("BEGIN")
+            conn.executemany(sql, (
+                make_row(rng, time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(stamp))) for stamp in stamps
+            ))
+            conn.execute("COMMIT")
+            written += count
+            if progress is not None:
+                progress(table, written)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+QMS Connection Pool
+Reusable, read-only, tuned SQLite connections for the reporter and monitor.
+
+Connections are opened once with ``mode=ro`` URIs and reused across queries
+and monitor cycles, so readers skip the connect, schema-parse and page-cache
+warm-up on every query. At most ``max_connections`` are open at a time;
+further borrowers wait for one to be returned. The migrator switches the
+database to WAL journaling so these readers never block the CI writers (and
+vice versa); the pool itself never writes, and a missing database is an
+error rather than an empty file.
+"""
+
+import os
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable through the ``database.pool`` configuration section
+DEFAULT_POOL_OPTIONS: Dict[str, Any] = {
+    'max_connections': 4,
+    'mmap_size_mb': 256,
+    'cache_size_mb': 32,
+    'statement_cache_size': 256,
+    'busy_timeout_ms': 5000
+}
+
+
+class ConnectionPool:
+    """Read-only connections to one database, each handed out to one user at a time"""
+
+    def __init__(self, db_path: str, **options: Any):
+        self.db_path = db_path
+        self.options = {**DEFAULT_POOL_OPTIONS, **{k: v for k, v in options.items() if v is not None}}
+        self._idle: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(int(self.options['max_connections']))
+
+    def _open(self) -> sqlite3.Connection:
+        uri = f"file:{quote(os.path.abspath(self.db_path))}?mode=ro"
+        conn = sqlite3.connect(
+            uri, uri=True, check_same_thread=False,
+            timeout=self.options['busy_timeout_ms'] / 1000,
+            cached_statements=self.options['statement_cache_size']
+        )
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA mmap_size = {int(self.options['mmap_size_mb']) * 1024 * 1024}")
+        # Negative cache_size is in KiB
+        conn.execute(f"PRAGMA cache_size = -{int(self.options['cache_size_mb']) * 1024}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection for the duration of the block, waiting while all are in use"""
+        self._slots.acquire()
+        try:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                conn = self._open()
+
+            try:
+                yield conn
+            finally:
+                self._release(conn)
+        finally:
+            self._slots.release()
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        # Don't hand a connection with a read transaction still open to the next user
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            self._idle.append(conn)
+
+    def execute(self, query: str, params: Tuple = ()) -> Tuple[List[str], List[Tuple]]:
+        """Run a query on a pooled connection, returning column names and rows"""
+        with self.connection() as conn:
+            cursor = conn.execute(query, params)
+            columns = [description[0] for description in cursor.description or ()]
+            return columns, cursor.fetchall()
+
+    def close(self) -> None:
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_pools: Dict[Tuple[str, Tuple], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str, options: Optional[Dict[str, Any]] = None) -> ConnectionPool:
+    """Process-wide pool for a database path and option set"""
+    options = options or {}
+    key = (str(Path(db_path).resolve()), tuple(sorted(options.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(db_path, **options)
+        return pool
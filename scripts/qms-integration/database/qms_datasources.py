@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+QMS Data Sources
+Pluggable backends the reporter reads the QMS result tables from.
+
+``SQLiteDataSource`` is the hot CI database, read through pooled read-only
+connections and the incrementally maintained rollups. ``DuckDBDataSource``
+runs the same portable metric and trend queries with DuckDB's vectorized
+engine, either against a DuckDB database or against partitioned Parquet files,
+which suits multi-year history. ``export_sqlite`` copies the SQLite tables
+into either columnar form.
+"""
+
+import os
+import sys
+import argparse
+import hashlib
+import logging
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+from qms_connections import get_pool
+from qms_migrations import database_path
+from qms_rollups import ROLLUP_SOURCES
+from qms_time import TIME_COLUMN
+
+logger = logging.getLogger(__name__)
+
+QueryResult = Tuple[List[str], List[Tuple]]
+
+# Parquet layout: <root>/<table>/year=YYYY/month=M/*.parquet (UTC months of created_at_ms)
+PARTITION_COLUMNS = ('year', 'month')
+
+
+def sqlite_identity(db_path: str, data_version: Optional[int] = None) -> Optional[str]:
+    """Token that changes whenever the database content may have changed (None if it doesn't exist).
+
+    Built from the inode, size and modification time of the database file and
+    its WAL, plus ``PRAGMA data_version`` when the caller holds a long-lived
+    connection to read it from.
+    """
+    try:
+        stat = os.stat(db_path)
+    except FileNotFoundError:
+        return None
+    parts = [f"{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}"]
+
+    # An empty WAL is created and removed by readers alone, so it counts as no WAL
+    try:
+        wal = os.stat(f"{db_path}-wal")
+        parts.append(f"{wal.st_ino}:{wal.st_size}:{wal.st_mtime_ns}" if wal.st_size else '-')
+    except FileNotFoundError:
+        parts.append('-')
+
+    if data_version is not None:
+        parts.append(f"v{data_version}")
+    return '/'.join(parts)
+
+
+def directory_identity(root: str) -> Optional[str]:
+    """Token that changes whenever any file under ``root`` is added, removed or rewritten"""
+    if not os.path.isdir(root):
+        return None
+
+    digest = hashlib.sha256()
+    for directory, _, files in sorted(os.walk(root)):
+        for name in sorted(files):
+            stat = os.stat(os.path.join(directory, name))
+            digest.update(f"{os.path.relpath(os.path.join(directory, name), root)}:"
+                          f"{stat.st_size}:{stat.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class DataSource:
+    """A readable store of the QMS result tables"""
+
+    # Whether the qms_rollups buckets can be queried in this backend
+    supports_rollups = False
+
+    def __init__(self, location: str):
+        self.location = location
+
+    def exists(self) -> bool:
+        return os.path.exists(self.location)
+
+    def identity(self) -> Optional[str]:
+        """Cache-invalidation token for the current content (None if unknown)"""
+        raise NotImplementedError
+
+    def execute(self, query: str, params: Sequence[Any] = ()) -> QueryResult:
+        """Run a read query, returning column names and rows"""
+        raise NotImplementedError
+
+    def iter_chunks(self, query: str, params: Sequence[Any] = (),
+                    chunk_rows: int = 100000) -> Iterator[QueryResult]:
+        """Stream a read query as (columns, rows) chunks of at most ``chunk_rows`` rows"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteDataSource(DataSource):
+    """The hot SQLite database, read through the shared connection pool"""
+
+    supports_rollups = True
+
+    def __init__(self, location: str, pool_options: Optional[Dict[str, Any]] = None):
+        super().__init__(location)
+        self.pool_options = pool_options
+
+    def identity(self) -> Optional[str]:
+        return sqlite_identity(self.location)
+
+    def execute(self, query: str, params: Sequence[Any] = ()) -> QueryResult:
+        return get_pool(self.location, self.pool_options).execute(query, tuple(params))
+
+    def iter_chunks(self, query: str, params: Sequence[Any] = (),
+                    chunk_rows: int = 100000) -> Iterator[QueryResult]:
+        with get_pool(self.location, self.pool_options).connection() as conn:
+            yield from sqlite_chunks(conn, query, params, chunk_rows)
+
+
+class DuckDBDataSource(DataSource):
+    """A DuckDB database file, or a directory of partitioned Parquet files queried through DuckDB"""
+
+    def __init__(self, location: str, parquet: bool = False, threads: Optional[int] = None):
+        super().__init__(location)
+        self.parquet = parquet
+        self.threads = threads
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        with self._lock:
+            if self._conn is None:
+                duckdb = _import_duckdb()
+                if self.parquet:
+                    conn = duckdb.connect()
+                    for table in ROLLUP_SOURCES:
+                        table_dir = Path(self.location) / table
+                        if table_dir.is_dir():
+                            # The hive partition columns are path metadata, not table columns
+                            conn.execute(f"""
+                                CREATE VIEW {table} AS
+                                SELECT * EXCLUDE ({', '.join(PARTITION_COLUMNS)})
+                                FROM read_parquet('{_sql_string(table_dir / '**' / '*.parquet')}',
+                                                           hive_partitioning = true, union_by_name = true)
+                            """)
+                else:
+                    conn = duckdb.connect(self.location, read_only=True)
+                if self.threads:
+                    conn.execute(f"SET threads = {int(self.threads)}")
+                self._conn = conn
+            return self._conn
+
+    def identity(self) -> Optional[str]:
+        if self.parquet:
+            return directory_identity(self.location)
+        return sqlite_identity(self.location)
+
+    def execute(self, query: str, params: Sequence[Any] = ()) -> QueryResult:
+        # A cursor is DuckDB's per-thread handle onto the shared database
+        cursor = self._connect().cursor()
+        try:
+            cursor.execute(query, list(params))
+            columns = [description[0] for description in cursor.description or ()]
+            return columns, cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def iter_chunks(self, query: str, params: Sequence[Any] = (),
+                    chunk_rows: int = 100000) -> Iterator[QueryResult]:
+        cursor = self._connect().cursor()
+        try:
+            cursor.execute(query, list(params))
+            columns = [description[0] for description in cursor.description or ()]
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                yield columns, rows
+        finally:
+            cursor.close()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def create_data_source(db_config: Dict[str, Any], location: Optional[str] = None) -> DataSource:
+    """Data source for the ``database`` configuration section (``location`` overrides its path)"""
+    db_type = db_config.get('type', 'sqlite')
+    location = location or db_config.get('path', './qms.db')
+
+    if db_type == 'sqlite':
+        return SQLiteDataSource(location, db_config.get('pool'))
+    if db_type in ('duckdb', 'parquet'):
+        return DuckDBDataSource(location, parquet=db_type == 'parquet', threads=db_config.get('threads'))
+    raise ValueError(f"Unsupported database type for reporting: {db_type}")
+
+
+def _import_duckdb():
+    try:
+        import duckdb
+    except ImportError:
+        raise ImportError("The duckdb package is required for DuckDB and Parquet data sources "
+                          "(pip install duckdb pyarrow)") from None
+    return duckdb
+
+
+def _sql_string(value: Any) -> str:
+    """Escape a value for use inside a single-quoted SQL literal"""
+    return str(value).replace("'", "''")
+
+
+# SQLite (and DuckDB) declared column type -> Arrow type for exported columns
+_ARROW_TYPES = {
+    'INTEGER': 'int64', 'REAL': 'float64', 'TEXT': 'string', 'TIMESTAMP': 'string',
+    'BIGINT': 'int64', 'DOUBLE': 'float64', 'VARCHAR': 'string'
+}
+
+
+def sqlite_chunks(conn: sqlite3.Connection, query: str, params: Sequence[Any] = (),
+                  chunk_rows: int = 100000) -> Iterator[Tuple[List[str], List[Tuple]]]:
+    """Stream a query's result as (columns, rows) chunks of at most ``chunk_rows`` rows"""
+    cursor = conn.execute(query, tuple(params))
+    columns = [description[0] for description in cursor.description]
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            break
+        yield columns, rows
+
+
+def arrow_schema(conn: sqlite3.Connection, table: str):
+    """Arrow schema for a SQLite table from its declared column types"""
+    return table_info_schema(conn.execute(f"PRAGMA table_info({table})"))
+
+
+def table_info_schema(table_info: Iterable[Tuple]):
+    """Arrow schema from ``PRAGMA table_info`` rows, as returned by SQLite and DuckDB"""
+    import pyarrow as pa
+
+    fields = []
+    for _, name, declared_type, *_ in table_info:
+        type_name = _ARROW_TYPES.get((declared_type or '').upper())
+        fields.append(pa.field(name, getattr(pa, type_name)() if type_name else pa.string()))
+    return pa.schema(fields)
+
+
+def arrow_chunk(schema, columns: List[str], rows: List[Tuple]):
+    """Arrow table for one chunk of SQLite rows"""
+    import pyarrow as pa
+
+    arrays = [pa.array([row[index] for row in rows], type=schema.field(name).type)
+              for index, name in enumerate(columns)]
+    return pa.Table.from_arrays(arrays, schema=pa.schema([schema.field(name) for name in columns]))
+
+
+def load_sqlite_table(duck, source: sqlite3.Connection, table: str, where: str = '',
+                      params: Sequence[Any] = (), chunk_rows: int = 100000) -> int:
+    """(Re)create ``table`` in DuckDB from SQLite rows streamed in Arrow chunks; returns the row count"""
+    schema = arrow_schema(source, table)
+    duck.register('qms_load_chunk', schema.empty_table())
+    duck.execute(f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM qms_load_chunk")
+
+    count = 0
+    query = f"SELECT * FROM {table} {f'WHERE {where}' if where else ''}"
+    for columns, rows in sqlite_chunks(source, query, params, chunk_rows):
+        duck.register('qms_load_chunk', arrow_chunk(schema, columns, rows))
+        duck.execute(f"INSERT INTO {table} SELECT * FROM qms_load_chunk")
+        count += len(rows)
+    duck.unregister('qms_load_chunk')
+    return count
+
+
+def copy_partitioned(duck, relation_sql: str, table_dir: Path, overwrite: bool = False,
+                     filename_prefix: Optional[str] = None) -> None:
+    """Write a DuckDB relation as month-partitioned Parquet files under ``table_dir``.
+
+    Without ``overwrite`` new files are added next to existing ones, named
+    ``<filename_prefix>_<uuid>.parquet`` when a prefix is given.
+    """
+    table_dir.parent.mkdir(parents=True, exist_ok=True)
+    options = ['FORMAT PARQUET', 'COMPRESSION ZSTD', f"PARTITION_BY ({', '.join(PARTITION_COLUMNS)})"]
+    options.append('OVERWRITE' if overwrite else 'APPEND')
+    if filename_prefix:
+        options.append(f"FILENAME_PATTERN '{_sql_string(filename_prefix)}_{{uuid}}'")
+    duck.execute(f"""
+        COPY (
+            SELECT *, year(epoch_ms({TIME_COLUMN})) AS year, month(epoch_ms({TIME_COLUMN})) AS month
+            FROM ({relation_sql})
+        ) TO '{_sql_string(table_dir)}'
+        ({', '.join(options)})
+    """)
+
+
+def export_sqlite(sqlite_path: str, duckdb_path: Optional[str] = None, parquet_dir: Optional[str] = None,
+                  tables: Optional[Sequence[str]] = None, chunk_rows: int = 100000) -> Dict[str, int]:
+    """Copy result tables from SQLite into a DuckDB database and/or month-partitioned Parquet.
+
+    Rows are streamed from SQLite in Arrow chunks, so memory stays bounded by
+    ``chunk_rows``; returns the number of rows exported per table. Without a
+    DuckDB path, tables are staged one at a time in a scratch DuckDB file
+    next to ``parquet_dir`` (not in memory) and dropped once written.
+    """
+    if not duckdb_path and not parquet_dir:
+        raise ValueError("Nothing to export to: pass a DuckDB path and/or a Parquet directory")
+
+    duckdb = _import_duckdb()
+    if duckdb_path:
+        os.makedirs(os.path.dirname(os.path.abspath(duckdb_path)), exist_ok=True)
+        scratch = None
+    else:
+        parquet_parent = Path(parquet_dir).resolve().parent
+        parquet_parent.mkdir(parents=True, exist_ok=True)
+        scratch = tempfile.TemporaryDirectory(prefix='.qms-export-', dir=parquet_parent)
+    source = sqlite3.connect(f"file:{quote(os.path.abspath(sqlite_path))}?mode=ro", uri=True)
+
+    counts = {}
+    try:
+        duck = duckdb.connect(duckdb_path or os.path.join(scratch.name, 'export.duckdb'))
+        try:
+            for table in tables or list(ROLLUP_SOURCES):
+                counts[table] = load_sqlite_table(duck, source, table, chunk_rows=chunk_rows)
+                if parquet_dir:
+                    copy_partitioned(duck, f"SELECT * FROM {table}", Path(parquet_dir) / table, overwrite=True)
+                if scratch is not None:
+                    duck.execute(f"DROP TABLE {table}")
+                logger.info(f"Exported {counts[table]} rows from {table}")
+        finally:
+            duck.close()
+    finally:
+        source.close()
+        if scratch is not None:
+            scratch.cleanup()
+
+    return counts
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Export QMS result tables to DuckDB or partitioned Parquet')
+    parser.add_argument('--config', '-c', help='Path to QMS configuration file')
+    parser.add_argument('--db', help='Path to the SQLite database (overrides the configuration)')
+    parser.add_argument('--duckdb', help='DuckDB database file to (re)create')
+    parser.add_argument('--parquet', help='Directory to write month-partitioned Parquet files to')
+    parser.add_argument('--table', action='append', choices=list(ROLLUP_SOURCES),
+                        help='Table to export (repeatable; default: all result tables)')
+    parser.add_argument('--chunk-rows', type=int, default=100000, help='Rows per streamed chunk')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Verbose output')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    try:
+        db_path = args.db or database_path(args.config)
+        counts = export_sqlite(db_path, args.duckdb, args.parquet, args.table, args.chunk_rows)
+        logger.info(f"Exported {sum(counts.values())} rows from {db_path}")
+    except Exception as e:
+        logger.error(f"Export failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+QMS Schema Migrations
+Versioned, idempotent schema management for the QMS SQLite database.
+
+Each migration runs in its own transaction and is recorded both in
+``PRAGMA user_version`` and in the ``qms_schema_migrations`` history table,
+so re-running the migrator only applies what is missing.
+"""
+
+import os
+import sys
+import argparse
+import logging
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import yaml
+
+from qms_rollups import (ROLLUP_SOURCES, create_rollup_schema, install_rollup_maintenance, rebuild_rollups,
+                         refresh_rollup_triggers)
+from qms_sketches import create_sketch_schema, install_sketch_maintenance, refresh_sketches
+from qms_time import TIME_COLUMN, epoch_ms_sql
+
+logger = logging.getLogger(__name__)
+
+HISTORY_TABLE = 'qms_schema_migrations'
+
+
+@dataclass(frozen=True)
+class Migration:
+    """A single schema version step"""
+    version: int
+    name: str
+    apply: Callable[[sqlite3.Connection], None]
+
+
+def _create_base_schema(conn: sqlite3.Connection) -> None:
+    """Result tables written by the CI integrations"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS quality_gate_results (
+            id INTEGER PRIMARY KEY,
+            repository TEXT,
+            commit_sha TEXT,
+            gate_name TEXT,
+            status TEXT,
+            score REAL,
+            details TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS code_coverage_results (
+            id INTEGER PRIMARY KEY,
+            repository TEXT,
+            commit_sha TEXT,
+            line_coverage REAL,
+            branch_coverage REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS security_scan_results (
+            id INTEGER PRIMARY KEY,
+            repository TEXT,
+            commit_sha TEXT,
+            scanner TEXT,
+            rule_id TEXT,
+            severity TEXT,
+            status TEXT DEFAULT 'OPEN',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS code_review_results (
+            id INTEGER PRIMARY KEY,
+            repository TEXT,
+            pull_request INTEGER,
+            reviewer TEXT,
+            review_time_hours REAL,
+            comments_count INTEGER,
+            approved INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _add_epoch_columns(conn: sqlite3.Connection) -> None:
+    """Integer epoch-millisecond timestamps on every result table.
+
+    Writers may set ``created_at_ms`` directly; rows that only carry
+    ``created_at`` get it filled in by an insert trigger.
+    """
+    for table in ROLLUP_SOURCES:
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if TIME_COLUMN not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {TIME_COLUMN} INTEGER")
+
+        conn.execute(
+            f"UPDATE {table} SET {TIME_COLUMN} = {epoch_ms_sql('created_at')} WHERE {TIME_COLUMN} IS NULL"
+        )
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS qms_epoch_{table}
+            AFTER INSERT ON {table}
+            WHEN NEW.{TIME_COLUMN} IS NULL
+            BEGIN
+                UPDATE {table} SET {TIME_COLUMN} = {epoch_ms_sql('NEW.created_at')}
+                WHERE rowid = NEW.rowid;
+            END
+        """)
+
+
+def _install_rollups(conn: sqlite3.Connection) -> None:
+    """Rollup table and insert triggers, backfilled from existing history"""
+    rebuild_rollups(conn, create_rollup_schema(conn))
+
+
+# Covering indexes: time-range seek first, then the grouped and aggregated columns
+REPORTING_INDEX_COLUMNS: Dict[str, List[str]] = {
+    'quality_gate_results': ['status', 'score'],
+    'code_coverage_results': ['line_coverage', 'branch_coverage'],
+    'security_scan_results': ['severity', 'status'],
+    'code_review_results': ['review_time_hours', 'comments_count', 'approved']
+}
+
+
+def _create_reporting_indexes(conn: sqlite3.Connection) -> None:
+    """Covering indexes for the reporter and monitor time-window queries"""
+    for table, columns in REPORTING_INDEX_COLUMNS.items():
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_reporting ON {table} (created_at, {', '.join(columns)})"
+        )
+    conn.execute("ANALYZE")
+
+
+def _index_epoch_timestamps(conn: sqlite3.Connection) -> None:
+    """Move the covering indexes and rollup triggers onto created_at_ms"""
+    _add_epoch_columns(conn)
+    for table, columns in REPORTING_INDEX_COLUMNS.items():
+        conn.execute(f"DROP INDEX IF EXISTS idx_{table}_reporting")
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_{TIME_COLUMN} ON {table} ({TIME_COLUMN}, {', '.join(columns)})"
+        )
+    refresh_rollup_triggers(conn)
+    conn.execute("ANALYZE")
+
+
+def _install_sketches(conn: sqlite3.Connection) -> None:
+    """Daily quantile sketches, backfilled from existing history"""
+    create_sketch_schema(conn)
+    refresh_sketches(conn)
+
+
+def _maintain_rollups_on_change(conn: sqlite3.Connection) -> None:
+    """Update and delete triggers, so changed or removed rows leave the rollups"""
+    install_rollup_maintenance(conn)
+
+
+def _maintain_sketches_on_change(conn: sqlite3.Connection) -> None:
+    """Update and delete triggers, so days with changed or removed rows get their sketches rebuilt"""
+    install_sketch_maintenance(conn)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, 'base_schema', _create_base_schema),
+    Migration(2, 'rollups', _install_rollups),
+    Migration(3, 'reporting_indexes', _create_reporting_indexes),
+    Migration(4, 'epoch_timestamps', _index_epoch_timestamps),
+    Migration(5, 'quantile_sketches', _install_sketches),
+    Migration(6, 'rollup_maintenance', _maintain_rollups_on_change),
+    Migration(7, 'sketch_maintenance', _maintain_sketches_on_change),
+    Migration(8, 'rollup_archive_extremes', _maintain_rollups_on_change),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+SKETCHES_VERSION = next(migration.version for migration in MIGRATIONS if migration.name == 'quantile_sketches')
+# The reporter and monitor filter on the epoch column, so they need at least this version
+EPOCH_VERSION = next(migration.version for migration in MIGRATIONS if migration.name == 'epoch_timestamps')
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    """Schema version recorded in the database (0 for an unmanaged database)"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def outdated_schema_message(version: int) -> Optional[str]:
+    """Why a database at ``version`` can't be queried yet, or None if its schema is recent enough"""
+    if version >= EPOCH_VERSION:
+        return None
+    return (f"Database schema is at version {version} but version {EPOCH_VERSION} or later is required; "
+            f"run `qms migrate` (or database/qms_migrations.py) first")
+
+
+def migrate(conn: sqlite3.Connection, target: Optional[int] = None) -> List[Migration]:
+    """Apply every pending migration up to ``target`` (latest by default).
+
+    The connection must be in autocommit mode (``isolation_level=None``) so
+    each migration can run inside its own explicit transaction. The database
+    is switched to WAL journaling first, since the read-only connection pool
+    can't do that itself, and new databases get incremental auto-vacuum so
+    retention can hand freed pages back without rewriting the file. Once the quantile sketches are installed, rows added since the last run are folded
+    into them afterwards, so every migrator run also brings them up to date.
+    """
+    target = LATEST_VERSION if target is None else target
+    # Only takes effect before the first table exists, so it has to precede the
+    # history table; existing databases keep their mode (see qms_retention)
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    # Persistent; lets the reporter and monitor read while CI writers commit
+    mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+    if mode.lower() != 'wal':
+        logger.warning(f"Database is in {mode} journal mode; readers may block writers")
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {HISTORY_TABLE} (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    """)
+
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version > target:
+            break
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-read under the write lock so concurrent migrators don't double-apply
+            if migration.version <= current_version(conn):
+                conn.execute("ROLLBACK")
+                continue
+
+            logger.info(f"Applying migration {migration.version}: {migration.name}")
+            migration.apply(conn)
+            conn.execute(
+                f"INSERT OR REPLACE INTO {HISTORY_TABLE} (version, name, applied_at) VALUES (?, ?, ?)",
+                (migration.version, migration.name, datetime.now(timezone.utc).isoformat())
+            )
+            conn.execute(f"PRAGMA user_version = {migration.version}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        applied.append(migration)
+
+    if current_version(conn) >= SKETCHES_VERSION:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            folded = refresh_sketches(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        logger.debug(f"Folded {sum(folded.values())} rows into the quantile sketches")
+
+    return applied
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """Open a connection suitable for ``migrate``"""
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    return sqlite3.connect(db_path, isolation_level=None, timeout=30)
+
+
+def _find_config() -> Optional[str]:
+    """Find QMS configuration file"""
+    possible_paths = [
+        os.environ.get('QMS_CONFIG_FILE'),
+        os.path.expanduser('~/.qms/config/qms-config.yaml'),
+        './qms-config.yaml',
+        './.qms/config/qms-config.yaml',
+        './config/qms-config.yaml'
+    ]
+
+    for path in possible_paths:
+        if path and os.path.exists(path):
+            return path
+
+    return None
+
+
+def database_path(config_path: Optional[str]) -> str:
+    """Resolve the SQLite path from the QMS configuration"""
+    config_path = config_path or _find_config()
+    if not config_path:
+        raise FileNotFoundError("QMS configuration file not found; pass --db or --config")
+
+    with open(config_path, 'r') as f:
+        config = yaml.safe_load(f) or {}
+
+    db_config = config.get('database', {})
+    if db_config.get('type', 'sqlite') != 'sqlite':
+        raise ValueError(f"Unsupported database type for migrations: {db_config.get('type')}")
+    return db_config.get('path', './qms.db')
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='QMS database schema migrations')
+    parser.add_argument('--config', '-c', help='Path to QMS configuration file')
+    parser.add_argument('--db', help='Path to QMS database file (overrides the configuration)')
+    parser.add_argument('--target', type=int, help='Migrate up to this schema version (default: latest)')
+    parser.add_argument('--status', action='store_true', help='Show the schema version and exit')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Verbose output')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    try:
+        db_path = args.db or database_path(args.config)
+        conn = connect(db_path)
+        try:
+            if args.status:
+                print(f"{db_path}: schema version {current_version(conn)} (latest {LATEST_VERSION})")
+                return
+
+            applied = migrate(conn, args.target)
+        finally:
+            conn.close()
+
+        if applied:
+            logger.info(f"Migrated {db_path} to schema version {applied[-1].version}")
+        else:
+            logger.info(f"{db_path} is already up to date")
+
+    except Exception as e:
+        logger.error(f"Migration failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
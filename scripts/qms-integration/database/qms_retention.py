@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+QMS Retention
+Enforces ``reporting.retention_days`` on the hot database and the reports directory.
+
+Raw result rows older than the retention window are moved into the
+month-partitioned Parquet archive (the same layout the Parquet data source
+reads), while their hourly/daily rollups stay in SQLite so long-range
+reports keep working. Expired report files and chart assets no report
+references any more are deleted, and the freed database pages are returned
+to the filesystem with incremental VACUUM.
+"""
+
+import os
+import re
+import sys
+import time
+import uuid
+import argparse
+import logging
+import sqlite3
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+from qms_datasources import _import_duckdb, copy_partitioned, load_sqlite_table
+from qms_migrations import _find_config, connect
+from qms_rollups import ROLLUP_SOURCES, mark_archived
+from qms_sketches import clamp_sketch_watermark, installed_sketches, refresh_sketches
+from qms_time import DAY_MS, TIME_COLUMN, now_ms
+
+logger = logging.getLogger(__name__)
+
+REPORT_SUFFIXES = ('.html', '.json')
+ASSET_REFERENCE = re.compile(r'assets/([0-9a-f]+\.(?:png|svg))')
+
+# Unreferenced assets younger than this may belong to a report still being written
+ASSET_GRACE_SECONDS = 3600
+
+
+@dataclass
+class RetentionResult:
+    """What a retention run archived, deleted and reclaimed"""
+    archived_rows: Dict[str, int] = field(default_factory=dict)
+    deleted_reports: List[str] = field(default_factory=list)
+    deleted_assets: List[str] = field(default_factory=list)
+    freed_bytes: int = 0
+
+
+def _archive_chunk(conn: sqlite3.Connection, duck, archive_dir: Path, table: str, where: str,
+                   params: tuple, prefix: str, chunk_rows: int, sketched: bool, cutoff_ms: int) -> int:
+    """Archive and delete one bounded chunk of expired rows in its own short transaction"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        count = load_sqlite_table(duck, conn, table, where, params, chunk_rows)
+        if count:
+            copy_partitioned(duck, f"SELECT * FROM {table}", archive_dir / table, filename_prefix=prefix)
+            # Archived rows keep their rollup buckets; the delete trigger skips them
+            mark_archived(conn, cutoff_ms)
+            conn.execute(f"DELETE FROM {table} WHERE {where}", params)
+            if sketched:
+                clamp_sketch_watermark(conn, table)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        for path in (archive_dir / table).glob(f"**/{prefix}_*.parquet"):
+            path.unlink()
+        raise
+    finally:
+        duck.execute(f"DROP TABLE IF EXISTS {table}")
+    return count
+
+
+def archive_expired_rows(conn: sqlite3.Connection, archive_dir: Path, cutoff_ms: int,
+                         chunk_rows: int = 100000, dry_run: bool = False) -> Dict[str, int]:
+    """Move rows created before ``cutoff_ms`` into monthly Parquet partitions.
+
+    Tables are archived in rowid ranges of at most ``chunk_rows`` rows, each
+    written to its own Parquet part (tagged with this run's id and the chunk
+    number) and deleted in its own short write transaction, so memory stays
+    bounded and CI writers are only blocked for one chunk at a time. If a
+    chunk fails, its transaction is rolled back and its files are removed;
+    chunks already committed stay archived, so rows are never lost or
+    archived twice and a re-run carries on where it stopped. Rollup buckets
+    of archived rows are kept (see ``mark_archived``), and quantile sketches
+    are brought up to date first so no expiring row is missing from them.
+    """
+    if dry_run:
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {TIME_COLUMN} < ?", (cutoff_ms,)).fetchone()[0]
+            for table in ROLLUP_SOURCES
+        }
+
+    sketched = installed_sketches(lambda query, params: conn.execute(query, params).fetchall())
+    if sketched:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            refresh_sketches(conn, chunk_rows=chunk_rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    duck = _import_duckdb().connect()
+    run_id = f"archive_{time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    where = f"rowid > ? AND rowid <= ? AND {TIME_COLUMN} < ?"
+    archived = {}
+    try:
+        for table in ROLLUP_SOURCES:
+            # Rows arrive in time order, so expired rows sit below this rowid; new rows land above it
+            high_rowid = conn.execute(
+                f"SELECT MAX(rowid) FROM {table} WHERE {TIME_COLUMN} < ?", (cutoff_ms,)
+            ).fetchone()[0]
+            count, low_rowid, part = 0, 0, 0
+            while high_rowid is not None and low_rowid < high_rowid:
+                chunk_high = conn.execute(f"""
+                    SELECT MAX(rowid) FROM (
+                        SELECT rowid FROM {table} WHERE rowid > ? AND rowid <= ? ORDER BY rowid LIMIT ?
+                    )
+                """, (low_rowid, high_rowid, chunk_rows)).fetchone()[0]
+                if chunk_high is None:
+                    break
+                part += 1
+                count += _archive_chunk(conn, duck, archive_dir, table, where, (low_rowid, chunk_high, cutoff_ms),
+                                        f"{run_id}_{part:05d}", chunk_rows, table in sketched, cutoff_ms)
+                low_rowid = chunk_high
+
+            archived[table] = count
+            if count:
+                logger.info(f"Archived {count} rows from {table} in {part} chunk(s)")
+    finally:
+        duck.close()
+
+    return archived
+
+
+def _is_report(path: Path, reports_dir: Path) -> bool:
+    """Report files anywhere under ``reports_dir``, outside the assets and hidden (e.g. .cache) directories"""
+    relative = path.relative_to(reports_dir).parts
+    return (path.suffix in REPORT_SUFFIXES and path.is_file() and 'assets' not in relative[:-1]
+            and not any(part.startswith('.') for part in relative[:-1]))
+
+
+def clean_reports(reports_dir: Path, cutoff_seconds: float, dry_run: bool = False) -> Dict[str, List[str]]:
+    """Delete reports last modified before ``cutoff_seconds`` (at any depth) and assets no remaining report uses"""
+    deleted: Dict[str, List[str]] = {'reports': [], 'assets': []}
+    if not reports_dir.is_dir():
+        return deleted
+
+    referenced = set()
+    for path in sorted(reports_dir.rglob('*')):
+        if not _is_report(path, reports_dir):
+            continue
+        if path.stat().st_mtime < cutoff_seconds:
+            deleted['reports'].append(str(path))
+            if not dry_run:
+                path.unlink()
+        elif path.suffix == '.html':
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    referenced.update(ASSET_REFERENCE.findall(line))
+
+    assets_dir = reports_dir / 'assets'
+    if assets_dir.is_dir():
+        grace = time.time() - ASSET_GRACE_SECONDS
+        for path in assets_dir.iterdir():
+            if path.name not in referenced and path.stat().st_mtime < grace:
+                deleted['assets'].append(str(path))
+                if not dry_run:
+                    path.unlink()
+
+    return deleted
+
+
+def incremental_vacuum(conn: sqlite3.Connection, pages: int = 0, full_vacuum: bool = False) -> int:
+    """Return free pages to the filesystem (all of them when ``pages`` is 0); returns bytes freed.
+
+    Databases created before the migrator enabled ``auto_vacuum = INCREMENTAL``
+    can only be converted by a full VACUUM, which rewrites the whole file under
+    an exclusive lock. That only happens when ``full_vacuum`` is set; otherwise
+    nothing is reclaimed and a warning says how to convert the database.
+    """
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    before = conn.execute("PRAGMA page_count").fetchone()[0]
+
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        if not full_vacuum:
+            logger.warning("Database does not use incremental auto-vacuum, so freed pages stay in the file; "
+                           "run retention once with --full-vacuum to convert it (rewrites the whole database)")
+            return 0
+        logger.info("Enabling incremental auto-vacuum (one-off full VACUUM)")
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    else:
+        conn.execute(f"PRAGMA incremental_vacuum({int(pages)})" if pages else "PRAGMA incremental_vacuum")
+
+    # Fold the WAL back into the shrunken file and truncate it
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    after = conn.execute("PRAGMA page_count").fetchone()[0]
+    return (before - after) * page_size
+
+
+def apply_retention(db_path: str, archive_dir: Path, reports_dir: Optional[Path], retention_days: float,
+                    chunk_rows: int = 100000, vacuum_pages: int = 0, full_vacuum: bool = False,
+                    dry_run: bool = False) -> RetentionResult:
+    """Archive expired rows, delete expired reports and reclaim the freed space"""
+    result = RetentionResult()
+    cutoff_ms = now_ms() - int(retention_days * DAY_MS)
+
+    if os.path.exists(db_path):
+        conn = connect(db_path)
+        try:
+            result.archived_rows = archive_expired_rows(conn, archive_dir, cutoff_ms, chunk_rows, dry_run)
+            if not dry_run and any(result.archived_rows.values()):
+                result.freed_bytes = incremental_vacuum(conn, vacuum_pages, full_vacuum)
+        finally:
+            conn.close()
+    else:
+        logger.warning(f"Database not found at {db_path}; skipping row archival")
+
+    if reports_dir is not None:
+        deleted = clean_reports(reports_dir, cutoff_ms / 1000, dry_run)
+        result.deleted_reports = deleted['reports']
+        result.deleted_assets = deleted['assets']
+
+    return result
+
+
+def _load_config(config_path: Optional[str]) -> Dict[str, Any]:
+    config_path = config_path or _find_config()
+    if not config_path:
+        return {}
+    with open(config_path, 'r') as f:
+        return yaml.safe_load(f) or {}
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Apply QMS data and report retention')
+    parser.add_argument('--config', '-c', help='Path to QMS configuration file')
+    parser.add_argument('--db', help='Path to QMS database file (overrides the configuration)')
+    parser.add_argument('--days', type=float, help='Retention window in days (default: reporting.retention_days)')
+    parser.add_argument('--archive-dir', help='Parquet archive directory (default: database.archive_dir)')
+    parser.add_argument('--reports-dir', help='Reports directory (default: reporting.output_dir)')
+    parser.add_argument('--chunk-rows', type=int, default=100000, help='Rows per streamed chunk')
+    parser.add_argument('--full-vacuum', action='store_true',
+                        help='Convert a database without incremental auto-vacuum with a one-off full VACUUM')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would be archived or deleted')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Verbose output')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    try:
+        config = _load_config(args.config)
+        db_config = config.get('database', {})
+        reporting_config = config.get('reporting', {})
+
+        if db_config.get('type', 'sqlite') != 'sqlite':
+            raise ValueError(f"Retention only applies to the SQLite database, not {db_config.get('type')}")
+
+        db_path = args.db or db_config.get('path', './qms.db')
+        archive_dir = Path(args.archive_dir or db_config.get(
+            'archive_dir', os.path.join(os.path.dirname(os.path.abspath(db_path)), 'archive')
+        ))
+        reports_dir = args.reports_dir or reporting_config.get('output_dir')
+        retention_days = args.days if args.days is not None else reporting_config.get('retention_days', 30)
+
+        result = apply_retention(
+            db_path, archive_dir, Path(reports_dir) if reports_dir else None, float(retention_days),
+            chunk_rows=args.chunk_rows, vacuum_pages=int(db_config.get('vacuum_pages', 0)),
+            full_vacuum=args.full_vacuum, dry_run=args.dry_run
+        )
+
+        verb = 'Would archive' if args.dry_run else 'Archived'
+        logger.info(f"{verb} {sum(result.archived_rows.values())} rows older than {retention_days} days "
+                    f"into {archive_dir}")
+        logger.info(f"{'Would delete' if args.dry_run else 'Deleted'} {len(result.deleted_reports)} reports "
+                    f"and {len(result.deleted_assets)} unused chart assets")
+        if result.freed_bytes:
+            logger.info(f"Reclaimed {result.freed_bytes / (1024 * 1024):.1f} MB from {db_path}")
+
+    except Exception as e:
+        logger.error(f"Retention failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
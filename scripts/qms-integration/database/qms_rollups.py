@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+"""
+QMS Rollups
+Incrementally maintained hourly and daily aggregates over the QMS result tables.
+
+Every insert into a raw result table fires a trigger that folds the new row
+into the matching hour and day buckets of ``qms_rollups``; updates and deletes
+take the old row back out (recomputing a bucket's minimum or maximum from its
+remaining raw rows when the old row held it). Deletes of rows the retention
+job archived leave their buckets alone, so rollups keep covering history
+that only exists in the Parquet archive. A bucket that straddles the archive
+cutoff can't recompute its extremes from the rows left, so there a removed
+row's minimum or maximum is kept and the stored extreme is approximate
+(never narrower than the true one). Readers combine
+those buckets for the whole hours/days of a window and only aggregate raw rows
+for the partial hours at its edges (including the still-open current hour).
+"""
+
+import sys
+import argparse
+import logging
+import sqlite3
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from qms_time import DAY_MS, HOUR_MS, TIME_COLUMN, TimeWindow, epoch_ms_sql
+
+logger = logging.getLogger(__name__)
+
+# Coarsest grain first; window planning walks this list in order
+GRAINS: Tuple[Tuple[str, int], ...] = (('day', DAY_MS), ('hour', HOUR_MS))
+
+ROLLUP_TABLE = 'qms_rollups'
+TRIGGER_PREFIX = 'qms_rollup_'
+# Update/delete triggers: qms_rollup_update_<table> and qms_rollup_delete_<table>
+MAINTENANCE_TRIGGERS = ('update', 'delete')
+# One row: rows created before archived_before were archived and keep their buckets when deleted
+ARCHIVE_MARK_TABLE = 'qms_rollup_archive_mark'
+
+# Callable that runs a query and returns all rows as tuples
+FetchRows = Callable[[str, Sequence[object]], List[Tuple]]
+
+
+@dataclass(frozen=True)
+class RollupSource:
+    """Rollup definition for one raw result table.
+
+    Measure expressions use ``{row}`` as the column prefix so the same
+    definition can be rendered for triggers (``NEW.``) and plain scans ('').
+    """
+    table: str
+    dimension: Optional[str]
+    measures: Dict[str, str]
+
+
+ROLLUP_SOURCES: Dict[str, RollupSource] = {
+    'quality_gate_results': RollupSource(
+        table='quality_gate_results',
+        dimension='status',
+        measures={'score': '{row}score'}
+    ),
+    'code_coverage_results': RollupSource(
+        table='code_coverage_results',
+        dimension=None,
+        measures={
+            'line_coverage': '{row}line_coverage',
+            'branch_coverage': '{row}branch_coverage'
+        }
+    ),
+    'security_scan_results': RollupSource(
+        table='security_scan_results',
+        dimension='severity',
+        measures={'resolved': "CASE WHEN {row}status = 'RESOLVED' THEN 1 ELSE 0 END"}
+    ),
+    'code_review_results': RollupSource(
+        table='code_review_results',
+        dimension=None,
+        measures={
+            'review_time_hours': '{row}review_time_hours',
+            'comments_count': '{row}comments_count',
+            'approved': 'CASE WHEN {row}approved = 1 THEN 1 ELSE 0 END'
+        }
+    )
+}
+
+
+@dataclass
+class Aggregate:
+    """Mergeable partial aggregate for one (dimension, metric) pair"""
+    row_count: int = 0
+    value_count: int = 0
+    value_sum: float = 0.0
+    value_min: Optional[float] = None
+    value_max: Optional[float] = None
+
+    def merge(self, row_count: int, value_count: int, value_sum: Optional[float],
+              value_min: Optional[float], value_max: Optional[float]) -> None:
+        """Fold another partial aggregate into this one"""
+        self.row_count += row_count or 0
+        self.value_count += value_count or 0
+        self.value_sum += value_sum or 0.0
+        if value_min is not None:
+            self.value_min = value_min if self.value_min is None else min(self.value_min, value_min)
+        if value_max is not None:
+            self.value_max = value_max if self.value_max is None else max(self.value_max, value_max)
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.value_sum / self.value_count if self.value_count else None
+
+
+# (dimension, metric) -> Aggregate; dimension is None for sources without one
+WindowAggregates = Dict[Tuple[Optional[str], str], Aggregate]
+
+
+def combine(aggregates: WindowAggregates, metric: str) -> Aggregate:
+    """Merge one metric's aggregates across all dimension values"""
+    total = Aggregate()
+    for (_, name), aggregate in aggregates.items():
+        if name == metric:
+            total.merge(aggregate.row_count, aggregate.value_count, aggregate.value_sum,
+                        aggregate.value_min, aggregate.value_max)
+    return total
+
+
+def _timestamp_sql(row: str = '', epoch_column: bool = True) -> str:
+    """Epoch-ms timestamp of a row.
+
+    Inside triggers the column may not be filled in yet, so fall back to
+    converting ``created_at`` the same way the fill trigger does. Tables
+    migrated only up to the rollups (before the epoch column existed) always
+    convert ``created_at``.
+    """
+    if not epoch_column:
+        return epoch_ms_sql(row + 'created_at')
+    if row:
+        return f"COALESCE({row}{TIME_COLUMN}, {epoch_ms_sql(row + 'created_at')})"
+    return TIME_COLUMN
+
+
+def _has_epoch_column(conn: sqlite3.Connection, table: str) -> bool:
+    return any(row[1] == TIME_COLUMN for row in conn.execute(f"PRAGMA table_info({table})"))
+
+
+def _dimension_sql(source: RollupSource, row: str = '') -> str:
+    return f"COALESCE({row}{source.dimension}, '')" if source.dimension else "''"
+
+
+def create_rollup_schema(conn: sqlite3.Connection) -> List[str]:
+    """Create the rollup table and insert triggers for every raw table present.
+
+    Returns the raw tables whose trigger was newly created, i.e. the ones that
+    still need a backfill. Safe to run repeatedly.
+    """
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+            source_table TEXT NOT NULL,
+            grain TEXT NOT NULL,
+            bucket_start INTEGER NOT NULL,
+            dimension TEXT NOT NULL DEFAULT '',
+            metric TEXT NOT NULL,
+            row_count INTEGER NOT NULL DEFAULT 0,
+            value_count INTEGER NOT NULL DEFAULT 0,
+            value_sum REAL NOT NULL DEFAULT 0,
+            value_min REAL,
+            value_max REAL,
+            PRIMARY KEY (source_table, grain, bucket_start, dimension, metric)
+        ) WITHOUT ROWID
+    """)
+
+    existing = {
+        row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+    }
+
+    created = []
+    for source in ROLLUP_SOURCES.values():
+        if source.table not in existing:
+            logger.debug(f"Skipping rollup trigger for missing table {source.table}")
+            continue
+        if f"{TRIGGER_PREFIX}{source.table}" in existing:
+            continue
+        conn.execute(_trigger_sql(source, _has_epoch_column(conn, source.table)))
+        created.append(source.table)
+
+    return created
+
+
+def _fold_sql(source: RollupSource, row: str = 'NEW.', epoch_column: bool = True) -> str:
+    """INSERT statement that folds ``row`` into its hour and day buckets"""
+    timestamp = _timestamp_sql(row, epoch_column)
+    dimension = _dimension_sql(source, row)
+
+    values = []
+    for grain, size in GRAINS:
+        for metric, expression in source.measures.items():
+            value = expression.format(row=row)
+            values.append(
+                f"('{source.table}', '{grain}', {timestamp} - {timestamp} % {size}, {dimension}, "
+                f"'{metric}', 1, ({value}) IS NOT NULL, COALESCE({value}, 0), {value}, {value})"
+            )
+
+    return f"""
+            INSERT INTO {ROLLUP_TABLE} (
+                source_table, grain, bucket_start, dimension, metric,
+                row_count, value_count, value_sum, value_min, value_max
+            ) VALUES
+            {', '.join(values)}
+            ON CONFLICT (source_table, grain, bucket_start, dimension, metric) DO UPDATE SET
+                row_count = row_count + excluded.row_count,
+                value_count = value_count + excluded.value_count,
+                value_sum = value_sum + excluded.value_sum,
+                value_min = COALESCE(MIN(value_min, excluded.value_min), value_min, excluded.value_min),
+                value_max = COALESCE(MAX(value_max, excluded.value_max), value_max, excluded.value_max);
+    """
+
+
+def _unfold_sql(source: RollupSource, row: str = 'OLD.') -> str:
+    """Statements that take ``row`` back out of its hour and day buckets"""
+    timestamp = _timestamp_sql(row)
+    statements = []
+    for grain, size in GRAINS:
+        for metric, expression in source.measures.items():
+            value = expression.format(row=row)
+            raw_value = expression.format(row='')
+            bucket = (f"source_table = '{source.table}' AND grain = '{grain}' "
+                      f"AND bucket_start = {timestamp} - {timestamp} % {size} "
+                      f"AND dimension = {_dimension_sql(source, row)} AND metric = '{metric}'")
+            # Runs after the raw row changed, so the bucket's remaining rows are what the table holds now;
+            # only for buckets entirely after the archive cutoff, others keep their (approximate) extremes
+            remaining = (f"FROM {source.table} WHERE {TIME_COLUMN} >= {ROLLUP_TABLE}.bucket_start "
+                         f"AND {TIME_COLUMN} < {ROLLUP_TABLE}.bucket_start + {size} "
+                         f"AND {_dimension_sql(source)} = {ROLLUP_TABLE}.dimension")
+            statements.append(f"""
+            UPDATE {ROLLUP_TABLE}
+            SET row_count = row_count - 1,
+                value_count = value_count - (({value}) IS NOT NULL),
+                value_sum = value_sum - COALESCE({value}, 0)
+            WHERE {bucket};
+            UPDATE {ROLLUP_TABLE}
+            SET value_min = (SELECT MIN({raw_value}) {remaining}),
+                value_max = (SELECT MAX({raw_value}) {remaining})
+            WHERE {bucket} AND ({value} = value_min OR {value} = value_max)
+              AND bucket_start >= COALESCE((SELECT archived_before FROM {ARCHIVE_MARK_TABLE}), 0);
+            DELETE FROM {ROLLUP_TABLE} WHERE {bucket} AND row_count <= 0;""")
+    return ''.join(statements)
+
+
+def _trigger_sql(source: RollupSource, epoch_column: bool = True) -> str:
+    """Build the AFTER INSERT trigger that folds a new row into its buckets"""
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS {TRIGGER_PREFIX}{source.table}
+        AFTER INSERT ON {source.table}
+        BEGIN
+            {_fold_sql(source, 'NEW.', epoch_column)}
+        END
+    """
+
+
+def _maintenance_trigger_sql(source: RollupSource, event: str) -> str:
+    """Build the AFTER UPDATE or AFTER DELETE trigger that moves a changed row between buckets"""
+    if event == 'delete':
+        when = (f"{_timestamp_sql('OLD.')} >= "
+                f"COALESCE((SELECT archived_before FROM {ARCHIVE_MARK_TABLE}), 0)")
+        body = _unfold_sql(source, 'OLD.')
+    else:
+        # Only changes to what the rollups see; e.g. the epoch fill trigger's update is skipped
+        compared = [_timestamp_sql('{row}'), _dimension_sql(source, '{row}')] + list(source.measures.values())
+        when = ' OR '.join(
+            f"({expression.format(row='OLD.')}) IS NOT ({expression.format(row='NEW.')})" for expression in compared
+        )
+        body = _unfold_sql(source, 'OLD.') + _fold_sql(source, 'NEW.')
+
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS {TRIGGER_PREFIX}{event}_{source.table}
+        AFTER {event.upper()} ON {source.table}
+        WHEN {when}
+        BEGIN
+            {body}
+        END
+    """
+
+
+def install_rollup_maintenance(conn: sqlite3.Connection) -> None:
+    """(Re)create the update and delete triggers of every installed rollup; safe to run repeatedly"""
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {ARCHIVE_MARK_TABLE} (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            archived_before INTEGER NOT NULL
+        )
+    """)
+    for table in installed_rollups(lambda query, params: conn.execute(query, params).fetchall()):
+        for event in MAINTENANCE_TRIGGERS:
+            conn.execute(f"DROP TRIGGER IF EXISTS {TRIGGER_PREFIX}{event}_{table}")
+            conn.execute(_maintenance_trigger_sql(ROLLUP_SOURCES[table], event))
+
+
+def mark_archived(conn: sqlite3.Connection, cutoff_ms: int) -> None:
+    """Record that rows created before ``cutoff_ms`` are archived, so deleting them keeps their buckets"""
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                        (ARCHIVE_MARK_TABLE,)).fetchone():
+        return
+    conn.execute(f"""
+        INSERT INTO {ARCHIVE_MARK_TABLE} (id, archived_before) VALUES (1, ?)
+        ON CONFLICT (id) DO UPDATE SET archived_before = MAX(archived_before, excluded.archived_before)
+    """, (cutoff_ms,))
+
+
+def refresh_rollup_triggers(conn: sqlite3.Connection) -> None:
+    """Recreate the installed insert triggers from the current definitions"""
+    for table in installed_rollups(lambda query, params: conn.execute(query, params).fetchall()):
+        conn.execute(f"DROP TRIGGER IF EXISTS {TRIGGER_PREFIX}{table}")
+        conn.execute(_trigger_sql(ROLLUP_SOURCES[table], _has_epoch_column(conn, table)))
+
+
+def rebuild_rollups(conn: sqlite3.Connection, tables: Optional[Sequence[str]] = None) -> None:
+    """Recompute rollups from the raw rows currently in the database.
+
+    Hourly buckets are aggregated from raw rows, daily buckets from the hourly
+    ones. Buckets whose raw rows have since been deleted are lost, so only
+    rebuild tables whose history is still complete.
+    """
+    hour_size = dict(GRAINS)['hour']
+    if tables is None:
+        tables = installed_rollups(lambda query, params: conn.execute(query, params).fetchall())
+
+    for table in tables:
+        source = ROLLUP_SOURCES[table]
+        timestamp = _timestamp_sql(epoch_column=_has_epoch_column(conn, table))
+        conn.execute(f"DELETE FROM {ROLLUP_TABLE} WHERE source_table = ?", (table,))
+
+        for metric, expression in source.measures.items():
+            value = expression.format(row='')
+            conn.execute(f"""
+                INSERT INTO {ROLLUP_TABLE} (
+                    source_table, grain, bucket_start, dimension, metric,
+                    row_count, value_count, value_sum, value_min, value_max
+                )
+                SELECT ?, 'hour', ts - ts % {hour_size}, dim, ?,
+                       COUNT(*), COUNT(value), TOTAL(value), MIN(value), MAX(value)
+                FROM (
+                    SELECT {timestamp} AS ts, {_dimension_sql(source)} AS dim, {value} AS value
+                    FROM {table}
+                    WHERE {timestamp} IS NOT NULL
+                )
+                GROUP BY 3, 4
+            """, (table, metric))
+
+        for grain, size in GRAINS:
+            if grain == 'hour':
+                continue
+            conn.execute(f"""
+                INSERT INTO {ROLLUP_TABLE} (
+                    source_table, grain, bucket_start, dimension, metric,
+                    row_count, value_count, value_sum, value_min, value_max
+                )
+                SELECT source_table, ?, bucket_start - bucket_start % {size}, dimension, metric,
+                       SUM(row_count), SUM(value_count), TOTAL(value_sum), MIN(value_min), MAX(value_max)
+                FROM {ROLLUP_TABLE}
+                WHERE source_table = ? AND grain = 'hour'
+                GROUP BY 3, 4, 5
+            """, (grain, table))
+
+        logger.info(f"Rebuilt rollups for {table}")
+
+
+def installed_rollups(fetch: FetchRows) -> List[str]:
+    """Return the raw tables whose rollups are maintained by a trigger"""
+    rows = fetch(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE ?",
+        (f"{TRIGGER_PREFIX}%",)
+    )
+    names = {row[0] for row in rows}
+    return [table for table in ROLLUP_SOURCES if f"{TRIGGER_PREFIX}{table}" in names]
+
+
+def plan_segments(start_ms: int, end_ms: int,
+                  grains: Sequence[Tuple[str, int]] = GRAINS) -> List[Tuple[str, int, int]]:
+    """Split [start_ms, end_ms) into whole rollup buckets plus raw edge segments.
+
+    Returns (kind, lo, hi) triples where kind is a grain name or 'raw'.
+    """
+    if start_ms >= end_ms:
+        return []
+    if not grains:
+        return [('raw', start_ms, end_ms)]
+
+    (grain, size), finer = grains[0], grains[1:]
+    lo = -(-start_ms // size) * size
+    hi = end_ms // size * size
+    if lo >= hi:
+        return plan_segments(start_ms, end_ms, finer)
+
+    return plan_segments(start_ms, lo, finer) + [(grain, lo, hi)] + plan_segments(hi, end_ms, finer)
+
+
+def raw_aggregate_query(source: RollupSource, window: TimeWindow,
+                        group_by_bucket: Optional[int] = None) -> Tuple[str, Tuple[int, int]]:
+    """One-pass aggregate over raw rows in a time window, one column group per metric"""
+    columns = [f"{_dimension_sql(source)} AS dim"]
+    group_by = ['dim']
+    if group_by_bucket:
+        columns.insert(0, f"{_timestamp_sql()} - {_timestamp_sql()} % {group_by_bucket} AS bucket")
+        group_by.insert(0, 'bucket')
+
+    columns.append('COUNT(*)')
+    for expression in source.measures.values():
+        value = expression.format(row='')
+        # COALESCE(SUM()) rather than SQLite's TOTAL() so the query also runs on DuckDB
+        columns.append(f"COUNT({value}), COALESCE(SUM({value}), 0), MIN({value}), MAX({value})")
+
+    where, params = window.sql()
+    return f"""
+        SELECT {', '.join(columns)}
+        FROM {source.table}
+        WHERE {where}
+        GROUP BY {', '.join(group_by)}
+    """, params
+
+
+def _fold_raw_row(source: RollupSource, aggregates: WindowAggregates, dim: str,
+                  row_count: int, measure_columns: Sequence) -> None:
+    dimension = dim or None
+    for index, metric in enumerate(source.measures):
+        value_count, value_sum, value_min, value_max = measure_columns[index * 4:index * 4 + 4]
+        aggregates.setdefault((dimension, metric), Aggregate()).merge(
+            row_count, value_count, value_sum, value_min, value_max
+        )
+
+
+def read_window(fetch: FetchRows, table: str, window: TimeWindow,
+                use_rollups: bool = True) -> WindowAggregates:
+    """Aggregate a raw table over a time window.
+
+    With ``use_rollups`` whole buckets come from ``qms_rollups`` and only the
+    partial-hour edges are aggregated from raw rows; otherwise the whole
+    window is scanned.
+    """
+    source = ROLLUP_SOURCES[table]
+    if use_rollups:
+        segments = plan_segments(window.start_ms, window.end_ms)
+    else:
+        segments = [('raw', window.start_ms, window.end_ms)]
+    aggregates: WindowAggregates = {}
+
+    for kind, lo, hi in segments:
+        if kind == 'raw':
+            rows = fetch(*raw_aggregate_query(source, TimeWindow(lo, hi)))
+            for dim, row_count, *measure_columns in rows:
+                _fold_raw_row(source, aggregates, dim, row_count, measure_columns)
+            continue
+
+        rows = fetch(f"""
+            SELECT dimension, metric, SUM(row_count), SUM(value_count), TOTAL(value_sum),
+                   MIN(value_min), MAX(value_max)
+            FROM {ROLLUP_TABLE}
+            WHERE source_table = ? AND grain = ? AND bucket_start >= ? AND bucket_start < ?
+            GROUP BY dimension, metric
+        """, (table, kind, lo, hi))
+        for dim, metric, *values in rows:
+            aggregates.setdefault((dim or None, metric), Aggregate()).merge(*values)
+
+    return aggregates
+
+
+def read_series(fetch: FetchRows, table: str, grain: str, window: TimeWindow,
+                use_rollups: bool = True) -> Dict[int, WindowAggregates]:
+    """Per-bucket aggregates for every bucket of ``grain`` overlapping the window"""
+    source = ROLLUP_SOURCES[table]
+    size = dict(GRAINS)[grain]
+    window = window.aligned(size)
+    series: Dict[int, WindowAggregates] = {}
+
+    if use_rollups:
+        rows = fetch(f"""
+            SELECT bucket_start, dimension, metric, row_count, value_count, value_sum,
+                   value_min, value_max
+            FROM {ROLLUP_TABLE}
+            WHERE source_table = ? AND grain = ? AND bucket_start >= ? AND bucket_start < ?
+            ORDER BY bucket_start
+        """, (table, grain, window.start_ms, window.end_ms))
+        for bucket, dim, metric, *values in rows:
+            series.setdefault(bucket, {}).setdefault((dim or None, metric), Aggregate()).merge(*values)
+        return series
+
+    rows = fetch(*raw_aggregate_query(source, window, group_by_bucket=size))
+    for bucket, dim, row_count, *measure_columns in sorted(rows, key=lambda row: row[0]):
+        _fold_raw_row(source, series.setdefault(bucket, {}), dim, row_count, measure_columns)
+    return series
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='QMS rollup maintenance')
+    parser.add_argument('command', choices=['install', 'rebuild'],
+                        help='install adds missing triggers and backfills them; rebuild recomputes every rollup')
+    parser.add_argument('--db', required=True, help='Path to QMS database file')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Verbose output')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    try:
+        with sqlite3.connect(args.db) as conn:
+            created = create_rollup_schema(conn)
+            install_rollup_maintenance(conn)
+            rebuild_rollups(conn, created if args.command == 'install' else None)
+        logger.info(f"Rollup {args.command} complete")
+    except Exception as e:
+        logger.error(f"Rollup {args.command} failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
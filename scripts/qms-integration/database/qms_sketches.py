@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+"""
+QMS Quantile Sketches
+Per-day t-digests of the result tables' continuous measures, for percentiles
+over any window without scanning raw rows.
+
+Digests are mergeable: a window's percentiles come from merging the daily
+digests of its whole days with digests built on the fly from the raw rows of
+its partial edge days. Unlike the rollups, digests cannot be maintained by an
+SQL trigger, so ``refresh_sketches`` folds rows inserted since a per-table
+rowid watermark into their days; readers scan only the rows past that
+watermark, so percentiles are complete even between refreshes.
+
+Updates and deletes of rows that were already folded mark their days dirty
+(through triggers); readers scan dirty days raw and the next refresh rebuilds
+their digests. A dirty day that is partly archived by the retention job can't
+be rebuilt from the rows left, so its digest is kept as it is and still
+counts the changed row's old value.
+"""
+
+import sys
+import math
+import struct
+import argparse
+import logging
+import sqlite3
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from qms_rollups import ARCHIVE_MARK_TABLE, ROLLUP_SOURCES, FetchRows, plan_segments
+from qms_time import DAY_MS, TIME_COLUMN, TimeWindow
+
+logger = logging.getLogger(__name__)
+
+SKETCH_TABLE = 'qms_sketches'
+WATERMARK_TABLE = 'qms_sketch_watermarks'
+# Days whose folded rows changed since their digest was built
+DIRTY_TABLE = 'qms_sketch_dirty_days'
+# Update/delete triggers: qms_sketch_update_<table> and qms_sketch_delete_<table>
+MAINTENANCE_TRIGGER_PREFIX = 'qms_sketch_'
+
+# Measures with a distribution worth reporting; expressions come from ROLLUP_SOURCES
+SKETCH_MEASURES: Dict[str, List[str]] = {
+    'quality_gate_results': ['score'],
+    'code_coverage_results': ['line_coverage', 'branch_coverage'],
+    'code_review_results': ['review_time_hours']
+}
+
+DEFAULT_COMPRESSION = 100
+
+# Callable that runs a query and yields (columns, rows) chunks, e.g. DataSource.iter_chunks
+StreamRows = Callable[[str, Sequence[object]], Iterator[Tuple[List[str], List[Tuple]]]]
+
+_HEADER = struct.Struct('<3d')
+
+
+class TDigest:
+    """Merging t-digest (Dunning & Ertl) with the arcsine scale function.
+
+    Holds at most about ``compression`` centroids whatever the number of
+    values added, with the smallest centroids at the tails so extreme
+    percentiles stay accurate. Exact minimum and maximum are kept alongside.
+    """
+
+    def __init__(self, compression: float = DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self._means: List[float] = []
+        self._weights: List[float] = []
+        self._buffer: List[Tuple[float, float]] = []
+        self._buffer_limit = int(compression) * 5
+
+    def add(self, value: float, weight: float = 1.0) -> None:
+        """Add a value (NaN is ignored)"""
+        if value != value:
+            return
+        self._buffer.append((value, weight))
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if len(self._buffer) >= self._buffer_limit:
+            self._compress()
+
+    def merge(self, other: 'TDigest') -> None:
+        """Fold another digest into this one"""
+        if other.min is None:
+            return
+        other._compress()
+        self._buffer.extend(zip(other._means, other._weights))
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self._compress()
+
+    @property
+    def count(self) -> float:
+        return sum(self._weights) + sum(weight for _, weight in self._buffer)
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _q(self, k: float) -> float:
+        if k >= self.compression / 4:
+            return 1.0
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def _compress(self) -> None:
+        if not self._buffer:
+            return
+        centroids = sorted(list(zip(self._means, self._weights)) + self._buffer)
+        self._buffer = []
+        total = sum(weight for _, weight in centroids)
+
+        means: List[float] = []
+        weights: List[float] = []
+        mean, weight = centroids[0]
+        weight_so_far = 0.0
+        weight_limit = total * self._q(self._k(0.0) + 1)
+        for next_mean, next_weight in centroids[1:]:
+            if weight_so_far + weight + next_weight <= weight_limit:
+                weight += next_weight
+                mean += (next_mean - mean) * next_weight / weight
+                continue
+            means.append(mean)
+            weights.append(weight)
+            weight_so_far += weight
+            weight_limit = total * self._q(self._k(weight_so_far / total) + 1)
+            mean, weight = next_mean, next_weight
+        means.append(mean)
+        weights.append(weight)
+
+        self._means, self._weights = means, weights
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated value at quantile ``q`` (0..1), or None when empty"""
+        self._compress()
+        if not self._means:
+            return None
+        if len(self._means) == 1 or q <= 0:
+            return self.min if q <= 0 else self._means[0]
+        if q >= 1:
+            return self.max
+
+        total = sum(self._weights)
+        target = q * total
+
+        # Interpolate between centroid centres; the extremes anchor the tails
+        if target < self._weights[0] / 2:
+            return self.min + (self._means[0] - self.min) * target / (self._weights[0] / 2)
+
+        cumulative = self._weights[0] / 2
+        for index in range(1, len(self._means)):
+            step = (self._weights[index - 1] + self._weights[index]) / 2
+            if target < cumulative + step:
+                fraction = (target - cumulative) / step
+                return self._means[index - 1] + (self._means[index] - self._means[index - 1]) * fraction
+            cumulative += step
+
+        tail = self._weights[-1] / 2
+        return self._means[-1] + (self.max - self._means[-1]) * min(1.0, (target - cumulative) / tail)
+
+    def to_bytes(self) -> bytes:
+        """Compact little-endian encoding: compression, min, max, then (mean, weight) pairs"""
+        self._compress()
+        pairs = [value for centroid in zip(self._means, self._weights) for value in centroid]
+        header = _HEADER.pack(self.compression, math.nan if self.min is None else self.min,
+                              math.nan if self.max is None else self.max)
+        return header + struct.pack(f'<{len(pairs)}d', *pairs)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'TDigest':
+        compression, low, high = _HEADER.unpack_from(data)
+        digest = cls(compression)
+        pairs = struct.unpack_from(f'<{(len(data) - _HEADER.size) // 8}d', data, _HEADER.size)
+        digest._means = list(pairs[0::2])
+        digest._weights = list(pairs[1::2])
+        if digest._means:
+            digest.min, digest.max = low, high
+        return digest
+
+
+def create_sketch_schema(conn: sqlite3.Connection) -> None:
+    """Create the sketch and watermark tables; safe to run repeatedly"""
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SKETCH_TABLE} (
+            source_table TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            bucket_start INTEGER NOT NULL,
+            value_count INTEGER NOT NULL,
+            digest BLOB NOT NULL,
+            PRIMARY KEY (source_table, metric, bucket_start)
+        ) WITHOUT ROWID
+    """)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (
+            source_table TEXT PRIMARY KEY,
+            last_rowid INTEGER NOT NULL
+        )
+    """)
+
+
+def _value_columns(table: str) -> str:
+    return ', '.join(ROLLUP_SOURCES[table].measures[metric].format(row='') for metric in SKETCH_MEASURES[table])
+
+
+def _day_sql(row: str = '') -> str:
+    return f"{row}{TIME_COLUMN} - {row}{TIME_COLUMN} % {DAY_MS}"
+
+
+def _maintenance_trigger_sql(table: str, event: str) -> str:
+    """Build the AFTER UPDATE or AFTER DELETE trigger that marks a folded row's days dirty"""
+    folded = f"OLD.rowid <= COALESCE((SELECT last_rowid FROM {WATERMARK_TABLE} WHERE source_table = '{table}'), 0)"
+    # Deleting archived rows leaves their digests alone, as with the rollups
+    live = f"OLD.{TIME_COLUMN} >= COALESCE((SELECT archived_before FROM {ARCHIVE_MARK_TABLE}), 0)"
+    mark = (f"INSERT OR IGNORE INTO {DIRTY_TABLE} (source_table, bucket_start) "
+            f"SELECT '{table}', {{day}} WHERE {{day}} IS NOT NULL;")
+    if event == 'delete':
+        when = f"{folded} AND {live}"
+        body = mark.format(day=_day_sql('OLD.'))
+    else:
+        # Only changes the digests see; e.g. the epoch fill trigger's update is skipped
+        expressions = ['{row}' + TIME_COLUMN] + [ROLLUP_SOURCES[table].measures[metric]
+                                                for metric in SKETCH_MEASURES[table]]
+        changed = ' OR '.join(f"{expression.format(row='OLD.')} IS NOT {expression.format(row='NEW.')}"
+                              for expression in expressions)
+        when = f"{folded} AND ({changed})"
+        body = mark.format(day=_day_sql('OLD.')) + mark.format(day=_day_sql('NEW.'))
+    return f"""
+        CREATE TRIGGER {MAINTENANCE_TRIGGER_PREFIX}{event}_{table}
+        AFTER {event.upper()} ON {table}
+        WHEN {when}
+        BEGIN
+            {body}
+        END
+    """
+
+
+def install_sketch_maintenance(conn: sqlite3.Connection) -> None:
+    """Dirty-day table plus the update and delete triggers of every sketched table; safe to run repeatedly"""
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DIRTY_TABLE} (
+            source_table TEXT NOT NULL,
+            bucket_start INTEGER NOT NULL,
+            PRIMARY KEY (source_table, bucket_start)
+        ) WITHOUT ROWID
+    """)
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for table in SKETCH_MEASURES:
+        if table not in existing:
+            continue
+        for event in ('update', 'delete'):
+            conn.execute(f"DROP TRIGGER IF EXISTS {MAINTENANCE_TRIGGER_PREFIX}{event}_{table}")
+            conn.execute(_maintenance_trigger_sql(table, event))
+
+
+def _rebuild_dirty_days(conn: sqlite3.Connection, table: str, last_rowid: int, compression: float) -> int:
+    """Recompute the digests of the table's dirty days from its folded raw rows; returns the days rebuilt"""
+    days = [row[0] for row in conn.execute(f"""
+        SELECT bucket_start FROM {DIRTY_TABLE}
+        WHERE source_table = ? AND bucket_start >= COALESCE((SELECT archived_before FROM {ARCHIVE_MARK_TABLE}), 0)
+    """, (table,))]
+    metrics = SKETCH_MEASURES[table]
+    for day in days:
+        digests = {metric: TDigest(compression) for metric in metrics}
+        for values in conn.execute(f"""
+            SELECT {_value_columns(table)} FROM {table}
+            WHERE rowid <= ? AND {TIME_COLUMN} >= ? AND {TIME_COLUMN} < ?
+        """, (last_rowid, day, day + DAY_MS)):
+            for metric, value in zip(metrics, values):
+                if value is not None:
+                    digests[metric].add(float(value))
+        conn.execute(f"DELETE FROM {SKETCH_TABLE} WHERE source_table = ? AND bucket_start = ?", (table, day))
+        conn.executemany(
+            f"INSERT INTO {SKETCH_TABLE} (source_table, metric, bucket_start, value_count, digest) "
+            f"VALUES (?, ?, ?, ?, ?)",
+            [(table, metric, day, int(digest.count), digest.to_bytes())
+             for metric, digest in digests.items() if digest.count]
+        )
+    # Partly archived days are dropped too: their digests are the best left
+    conn.execute(f"DELETE FROM {DIRTY_TABLE} WHERE source_table = ?", (table,))
+    return len(days)
+
+
+def refresh_sketches(conn: sqlite3.Connection, tables: Optional[Sequence[str]] = None,
+                     chunk_rows: int = 50000, compression: float = DEFAULT_COMPRESSION) -> Dict[str, int]:
+    """Fold rows inserted since each table's watermark into their daily digests.
+
+    Days marked dirty by updates and deletes are rebuilt first. Runs in the
+    caller's transaction; memory is bounded by the number of days touched,
+    not the number of rows. Returns the number of rows folded per table.
+    """
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    folded = {}
+    for table in tables or list(SKETCH_MEASURES):
+        if table not in existing:
+            continue
+        metrics = SKETCH_MEASURES[table]
+        row = conn.execute(f"SELECT last_rowid FROM {WATERMARK_TABLE} WHERE source_table = ?", (table,)).fetchone()
+        last_rowid = row[0] if row else 0
+        if DIRTY_TABLE in existing:
+            rebuilt = _rebuild_dirty_days(conn, table, last_rowid, compression)
+            if rebuilt:
+                logger.debug(f"Rebuilt {rebuilt} changed {table} daily sketches")
+        high_rowid = conn.execute(f"SELECT MAX(rowid) FROM {table}").fetchone()[0] or 0
+        if high_rowid <= last_rowid:
+            # Record the watermark even when there is nothing to fold (e.g. an empty
+            # table), so readers use the sketches instead of streaming raw rows
+            conn.execute(
+                f"INSERT OR IGNORE INTO {WATERMARK_TABLE} (source_table, last_rowid) VALUES (?, ?)",
+                (table, last_rowid)
+            )
+            folded[table] = 0
+            continue
+
+        digests: Dict[Tuple[str, int], TDigest] = {}
+        cursor = conn.execute(f"""
+            SELECT {TIME_COLUMN} - {TIME_COLUMN} % {DAY_MS}, {_value_columns(table)}
+            FROM {table}
+            WHERE rowid > ? AND rowid <= ? AND {TIME_COLUMN} IS NOT NULL
+        """, (last_rowid, high_rowid))
+        count = 0
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            for day, *values in rows:
+                for metric, value in zip(metrics, values):
+                    if value is None:
+                        continue
+                    digest = digests.get((metric, day))
+                    if digest is None:
+                        digest = digests[(metric, day)] = _stored_digest(conn, table, metric, day, compression)
+                    digest.add(float(value))
+            count += len(rows)
+
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {SKETCH_TABLE} (source_table, metric, bucket_start, value_count, digest) "
+            f"VALUES (?, ?, ?, ?, ?)",
+            [(table, metric, day, int(digest.count), digest.to_bytes()) for (metric, day), digest in digests.items()]
+        )
+        conn.execute(
+            f"INSERT OR REPLACE INTO {WATERMARK_TABLE} (source_table, last_rowid) VALUES (?, ?)",
+            (table, high_rowid)
+        )
+        folded[table] = count
+        logger.debug(f"Folded {count} {table} rows into {len(digests)} daily sketches")
+
+    return folded
+
+
+def _stored_digest(conn: sqlite3.Connection, table: str, metric: str, day: int, compression: float) -> TDigest:
+    row = conn.execute(
+        f"SELECT digest FROM {SKETCH_TABLE} WHERE source_table = ? AND metric = ? AND bucket_start = ?",
+        (table, metric, day)
+    ).fetchone()
+    return TDigest.from_bytes(row[0]) if row else TDigest(compression)
+
+
+def clamp_sketch_watermark(conn: sqlite3.Connection, table: str) -> None:
+    """Lower a table's watermark to its highest remaining rowid after deletes.
+
+    SQLite hands out ``MAX(rowid) + 1`` to new rows, so once the newest rows
+    are deleted their rowids are reused; rows below the watermark would then
+    never be folded.
+    """
+    conn.execute(f"""
+        UPDATE {WATERMARK_TABLE}
+        SET last_rowid = MIN(last_rowid, (SELECT COALESCE(MAX(rowid), 0) FROM {table}))
+        WHERE source_table = ?
+    """, (table,))
+
+
+def rebuild_sketches(conn: sqlite3.Connection, tables: Optional[Sequence[str]] = None) -> Dict[str, int]:
+    """Recompute every digest from the raw rows currently in the database"""
+    for table in tables or list(SKETCH_MEASURES):
+        conn.execute(f"DELETE FROM {SKETCH_TABLE} WHERE source_table = ?", (table,))
+        conn.execute(f"DELETE FROM {WATERMARK_TABLE} WHERE source_table = ?", (table,))
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (DIRTY_TABLE,)).fetchone():
+            conn.execute(f"DELETE FROM {DIRTY_TABLE} WHERE source_table = ?", (table,))
+    return refresh_sketches(conn, tables)
+
+
+def installed_sketches(fetch: FetchRows) -> Dict[str, int]:
+    """Watermark (last folded rowid) of every table with maintained sketches"""
+    rows = fetch("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", (WATERMARK_TABLE,))
+    if not rows:
+        return {}
+    return dict(fetch(f"SELECT source_table, last_rowid FROM {WATERMARK_TABLE}", ()))
+
+
+def _stream_into(digests: Dict[str, TDigest], stream: StreamRows, table: str, query: str,
+                 params: Sequence[object]) -> None:
+    for _, rows in stream(query, params):
+        for values in rows:
+            for metric, value in zip(SKETCH_MEASURES[table], values):
+                if value is not None:
+                    digests[metric].add(float(value))
+
+
+def _dirty_days(fetch: FetchRows, table: str, window: TimeWindow) -> List[int]:
+    """Rebuildable dirty days of ``table`` in the window (see ``_rebuild_dirty_days``)"""
+    if not fetch("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", (DIRTY_TABLE,)):
+        return []
+    return [row[0] for row in fetch(f"""
+        SELECT bucket_start FROM {DIRTY_TABLE}
+        WHERE source_table = ? AND bucket_start >= ? AND bucket_start < ?
+          AND bucket_start >= COALESCE((SELECT archived_before FROM {ARCHIVE_MARK_TABLE}), 0)
+        ORDER BY bucket_start
+    """, (table, window.start_ms, window.end_ms))]
+
+
+def _split_dirty_days(segments: List[Tuple[str, int, int]], dirty: List[int]) -> List[Tuple[str, int, int]]:
+    """Cut dirty days out of the 'day' segments as 'raw' ones"""
+    if not dirty:
+        return segments
+    split = []
+    for kind, lo, hi in segments:
+        if kind == 'raw':
+            split.append((kind, lo, hi))
+            continue
+        start = lo
+        for day in dirty:
+            if lo <= day < hi:
+                if day > start:
+                    split.append(('day', start, day))
+                split.append(('raw', day, day + DAY_MS))
+                start = day + DAY_MS
+        if start < hi:
+            split.append(('day', start, hi))
+    return split
+
+
+def read_digests(fetch: FetchRows, stream: StreamRows, table: str, window: TimeWindow,
+                 watermark: Optional[int] = None) -> Dict[str, TDigest]:
+    """Merged digest per sketched metric of ``table`` over a time window.
+
+    With a ``watermark`` (see ``installed_sketches``) whole days come from the
+    stored digests plus any rows past the watermark, and only the partial
+    edge days and days changed since their digest was built are read raw;
+    without one every row in the window is streamed.
+    """
+    digests = {metric: TDigest() for metric in SKETCH_MEASURES[table]}
+    columns = _value_columns(table)
+
+    if watermark is None:
+        segments = [('raw', window.start_ms, window.end_ms)]
+    else:
+        segments = _split_dirty_days(plan_segments(window.start_ms, window.end_ms, (('day', DAY_MS),)),
+                                     _dirty_days(fetch, table, window))
+
+    for kind, lo, hi in segments:
+        if kind == 'raw':
+            where, params = TimeWindow(lo, hi).sql()
+            _stream_into(digests, stream, table, f"SELECT {columns} FROM {table} WHERE {where}", params)
+            continue
+
+        for metric, data in fetch(f"""
+            SELECT metric, digest FROM {SKETCH_TABLE}
+            WHERE source_table = ? AND bucket_start >= ? AND bucket_start < ?
+        """, (table, lo, hi)):
+            if metric in digests:
+                digests[metric].merge(TDigest.from_bytes(data))
+
+        # Rows not yet folded; the unary + keeps SQLite on the rowid range rather than the time index
+        _stream_into(digests, stream, table, f"""
+            SELECT {columns} FROM {table}
+            WHERE rowid > ? AND +{TIME_COLUMN} >= ? AND +{TIME_COLUMN} < ?
+        """, (watermark, lo, hi))
+
+    return digests
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='QMS quantile sketch maintenance')
+    parser.add_argument('command', choices=['refresh', 'rebuild'],
+                        help='refresh folds rows added since the last run; rebuild recomputes every sketch')
+    parser.add_argument('--config', '-c', help='Path to QMS configuration file')
+    parser.add_argument('--db', help='Path to QMS database file (overrides the configuration)')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Verbose output')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    # qms_migrations imports this module
+    from qms_migrations import database_path
+
+    try:
+        with sqlite3.connect(args.db or database_path(args.config), timeout=30) as conn:
+            create_sketch_schema(conn)
+            folded = (rebuild_sketches if args.command == 'rebuild' else refresh_sketches)(conn)
+        logger.info(f"Sketch {args.command} complete: {sum(folded.values())} rows folded")
+    except Exception as e:
+        logger.error(f"Sketch {args.command} failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
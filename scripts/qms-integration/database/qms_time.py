@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+QMS Time Windows
+Integer epoch-millisecond time handling shared by every reporter and monitor query.
+
+Result rows carry an indexed ``created_at_ms`` column (UTC epoch milliseconds)
+next to the legacy ``created_at`` text. Queries never compare ``created_at``
+directly; they express their range with a ``TimeWindow`` and bind integers.
+"""
+
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+HOUR_MS = 60 * 60 * 1000
+DAY_MS = 24 * HOUR_MS
+
+TIME_COLUMN = 'created_at_ms'
+
+
+def epoch_ms_sql(column: str) -> str:
+    """SQL expression converting a SQLite date/time text column to UTC epoch milliseconds"""
+    return f"CAST(ROUND((julianday({column}) - 2440587.5) * 86400000) AS INTEGER)"
+
+
+def now_ms() -> int:
+    """Current time in UTC epoch milliseconds"""
+    return time.time_ns() // 1_000_000
+
+
+def to_epoch_ms(moment: datetime) -> int:
+    """Convert a datetime to epoch milliseconds; naive values are local time"""
+    return int(moment.timestamp() * 1000)
+
+
+def from_epoch_ms(epoch_ms: int) -> datetime:
+    """Naive local datetime for an epoch-millisecond value"""
+    return datetime.fromtimestamp(epoch_ms / 1000)
+
+
+def utc_from_epoch_ms(epoch_ms: int) -> datetime:
+    """Naive UTC datetime for an epoch-millisecond value (e.g. a day bucket start)"""
+    return datetime.fromtimestamp(epoch_ms / 1000, tz=timezone.utc).replace(tzinfo=None)
+
+
+@dataclass(frozen=True)
+class TimeWindow:
+    """Half-open [start_ms, end_ms) range in UTC epoch milliseconds"""
+    start_ms: int
+    end_ms: int
+
+    @classmethod
+    def last(cls, days: float = 0, hours: float = 0, end_ms: Optional[int] = None) -> 'TimeWindow':
+        """Window covering the given span up to and including ``end_ms`` (default: now)"""
+        end_ms = now_ms() if end_ms is None else end_ms
+        span_ms = int(timedelta(days=days, hours=hours).total_seconds() * 1000)
+        return cls(end_ms - span_ms, end_ms + 1)
+
+    @classmethod
+    def between(cls, start: datetime, end: datetime) -> 'TimeWindow':
+        """Window from ``start`` up to and including ``end``"""
+        return cls(to_epoch_ms(start), to_epoch_ms(end) + 1)
+
+    def aligned(self, size_ms: int) -> 'TimeWindow':
+        """Same window with its start moved back to a bucket boundary of ``size_ms``"""
+        return TimeWindow(self.start_ms - self.start_ms % size_ms, self.end_ms)
+
+    def snapped(self, size_ms: int) -> 'TimeWindow':
+        """Same span with the end moved back to the last multiple of ``size_ms``.
+
+        Repeated ``last(...)`` windows taken within one ``size_ms`` period then
+        produce identical query parameters, and the window never reaches past
+        the time it was taken.
+        """
+        offset = self.end_ms % size_ms
+        return TimeWindow(self.start_ms - offset, self.end_ms - offset)
+
+    def sql(self, column: str = TIME_COLUMN) -> Tuple[str, Tuple[int, int]]:
+        """WHERE-clause fragment and parameters selecting rows inside the window"""
+        return f"{column} >= ? AND {column} < ?", (self.start_ms, self.end_ms)
+
+    @property
+    def start(self) -> datetime:
+        return from_epoch_ms(self.start_ms)
+
+    @property
+    def end(self) -> datetime:
+        return from_epoch_ms(self.end_ms - 1)
@@ -10,23 +10,29 @@ import json
 import yaml
 import argparse
 import logging
-import sqlite3
 import asyncio
 import aiohttp
 import time
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Callable, Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from enum import Enum
 import smtplib
-from email.mime.text import MimeText
-from email.mime.multipart import MimeMultipart
-import requests
-import psutil
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
 import threading
 from concurrent.futures import ThreadPoolExecutor
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'database'))
+from qms_connections import ConnectionPool, get_pool
+from qms_migrations import outdated_schema_message
+from qms_time import TimeWindow
+from qms_resources import DEFAULT_SAMPLER_OPTIONS, ResourceSampler
+from qms_alert_queue import AlertDeliveryError, AlertDispatcher
+from qms_alert_engine import AlertEngine
+from qms_smtp import SMTPConnection
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -75,10 +81,19 @@ class QMSMonitor:
         self.config_path = config_path or self._find_config()
         self.config = self._load_config()
         self.monitoring_config = self.config.get('monitoring', {})
+        self._check_schema()
         self.alerts = []
         self.health_checks = []
         self.running = False
         self.alert_handlers = []
+        self.alert_channels: Dict[str, Callable[[Alert], Any]] = {}
+        self._alert_dispatcher: Optional[AlertDispatcher] = None
+        self.alert_engine = AlertEngine(self.monitoring_config.get('alerting'))
+        self._http_session: Optional[aiohttp.ClientSession] = None
+        self._http_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._resource_sampler: Optional[ResourceSampler] = None
+        self._smtp: Optional[SMTPConnection] = None
+        self._smtp_lock = threading.Lock()
         self._setup_alert_handlers()
         
     def _find_config(self) -> str:
@@ -107,21 +122,103 @@ class QMSMonitor:
             logger.error(f"Failed to load QMS config: {e}")
             sys.exit(1)
     
+    def _check_schema(self) -> None:
+        """Exit if the database predates the schema the health checks query"""
+        db_path = self.config.get('database', {}).get('path', './qms.db')
+        if not os.path.exists(db_path):
+            return
+        try:
+            version = self._get_pool(db_path).execute("PRAGMA user_version")[1][0][0]
+        except Exception as e:
+            logger.error(f"Failed to read the database schema version: {e}")
+            sys.exit(1)
+        message = outdated_schema_message(version)
+        if message:
+            logger.error(message)
+            sys.exit(1)
+    
     def _setup_alert_handlers(self):
-        """Setup alert notification handlers"""
+        """Setup alert notification handlers.
+        
+        Handlers run inline when an alert is created; remote channels are
+        delivered in the background through the alert queue.
+        """
         integrations = self.config.get('integrations', {})
         
-        # Email handler
+        # Email channel
         if integrations.get('email', {}).get('enabled'):
-            self.alert_handlers.append(self._send_email_alert)
+            self.alert_channels['email'] = self._send_email_alert
         
-        # Slack handler  
+        # Slack channel
         if integrations.get('slack', {}).get('enabled'):
-            self.alert_handlers.append(self._send_slack_alert)
+            self.alert_channels['slack'] = self._send_slack_alert
         
         # Console handler (always enabled)
         self.alert_handlers.append(self._log_alert)
     
+    def _get_alert_dispatcher(self) -> AlertDispatcher:
+        """Alert queue and delivery workers for the remote channels (tuned by monitoring.alert_queue)"""
+        if self._alert_dispatcher is None:
+            self._alert_dispatcher = AlertDispatcher(self.alert_channels, self.monitoring_config.get('alert_queue'))
+        return self._alert_dispatcher
+    
+    def _get_pool(self, db_path: str) -> ConnectionPool:
+        """Read-only connection pool reused across monitor cycles (tuned by database.pool)"""
+        return get_pool(db_path, self.config.get('database', {}).get('pool'))
+    
+    def _get_http_session(self) -> aiohttp.ClientSession:
+        """HTTP session reused across monitor cycles (tuned by monitoring.http).
+        
+        One keep-alive connector for the monitor's lifetime, so probes after
+        the first reuse open connections and cached DNS answers and their
+        latency reflects the service rather than connection setup. Call
+        ``close`` on shutdown.
+        """
+        loop = asyncio.get_running_loop()
+        # A session is bound to the loop it was created on; asyncio.run() calls each get a new one
+        session = self._http_session
+        if session is None or session.closed or self._http_loop is not loop:
+            http_config = self.monitoring_config.get('http', {})
+            connector = aiohttp.TCPConnector(
+                limit=int(http_config.get('max_connections', 10)),
+                limit_per_host=int(http_config.get('max_connections_per_host', 2)),
+                ttl_dns_cache=int(http_config.get('dns_cache_seconds', 300)),
+                keepalive_timeout=float(http_config.get('keepalive_seconds', 75))
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=float(http_config.get('timeout_seconds', 10)),
+                connect=float(http_config.get('connect_timeout_seconds', 5))
+            )
+            self._http_session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self._http_loop = loop
+        return self._http_session
+    
+    def _get_resource_sampler(self) -> ResourceSampler:
+        """Background resource sampler, started on first use (tuned by monitoring.resources)"""
+        if self._resource_sampler is None:
+            self._resource_sampler = ResourceSampler.from_config(self.monitoring_config.get('resources'))
+        if not self._resource_sampler.running:
+            self._resource_sampler.start()
+        return self._resource_sampler
+    
+    async def _close_loop_resources(self):
+        """Flush queued alerts and close the HTTP session, both bound to the running event loop"""
+        if self._alert_dispatcher is not None:
+            await self._alert_dispatcher.close()
+        if self._http_session is not None and not self._http_session.closed:
+            await self._http_session.close()
+        self._http_session = None
+        self._http_loop = None
+    
+    async def close(self):
+        """Flush queued alerts, close the SMTP connection, the HTTP session and its pooled connections
+        and stop the resource sampler"""
+        await self._close_loop_resources()
+        if self._smtp is not None:
+            await asyncio.to_thread(self._smtp.close)
+        if self._resource_sampler is not None:
+            self._resource_sampler.stop()
+    
     async def check_database_health(self) -> HealthCheck:
         """Check database connectivity and performance"""
         start_time = time.time()
@@ -141,7 +238,7 @@ class QMSMonitor:
                 )
             
             # Test database connection
-            with sqlite3.connect(db_path, timeout=5) as conn:
+            with self._get_pool(db_path).connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table'")
                 table_count = cursor.fetchone()[0]
@@ -154,10 +251,11 @@ class QMSMonitor:
                 """)
                 
                 if cursor.fetchone():
-                    cursor.execute("""
+                    where, params = TimeWindow.last(hours=1).sql()
+                    cursor.execute(f"""
                         SELECT COUNT(*) FROM quality_gate_results 
-                        WHERE created_at >= datetime('now', '-1 hour')
-                    """)
+                        WHERE {where}
+                    """, params)
                     recent_records = cursor.fetchone()[0]
                 else:
                     recent_records = 0
@@ -211,28 +309,27 @@ class QMSMonitor:
             port = api_config.get('port', 3000)
             url = f"http://{host}:{port}/health"
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=10) as response:
-                    response_time = (time.time() - start_time) * 1000
-                    
-                    if response.status == 200:
-                        data = await response.json()
-                        return HealthCheck(
-                            name="api",
-                            status=MonitorStatus.HEALTHY,
-                            timestamp=datetime.now(),
-                            response_time_ms=response_time,
-                            details=data
-                        )
-                    else:
-                        return HealthCheck(
-                            name="api",
-                            status=MonitorStatus.UNHEALTHY,
-                            timestamp=datetime.now(),
-                            response_time_ms=response_time,
-                            details={"status_code": response.status},
-                            error=f"API returned status {response.status}"
-                        )
+            async with self._get_http_session().get(url) as response:
+                response_time = (time.time() - start_time) * 1000
+                
+                if response.status == 200:
+                    data = await response.json()
+                    return HealthCheck(
+                        name="api",
+                        status=MonitorStatus.HEALTHY,
+                        timestamp=datetime.now(),
+                        response_time_ms=response_time,
+                        details=data
+                    )
+                else:
+                    return HealthCheck(
+                        name="api",
+                        status=MonitorStatus.UNHEALTHY,
+                        timestamp=datetime.now(),
+                        response_time_ms=response_time,
+                        details={"status_code": response.status},
+                        error=f"API returned status {response.status}"
+                    )
                         
         except asyncio.TimeoutError:
             return HealthCheck(
@@ -272,31 +369,30 @@ class QMSMonitor:
             port = dashboard_config.get('port', 8080)
             url = f"http://{host}:{port}/"
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=10) as response:
-                    response_time = (time.time() - start_time) * 1000
-                    
-                    if response.status == 200:
-                        content = await response.text()
-                        return HealthCheck(
-                            name="dashboard",
-                            status=MonitorStatus.HEALTHY,
-                            timestamp=datetime.now(),
-                            response_time_ms=response_time,
-                            details={
-                                "status_code": response.status,
-                                "content_length": len(content)
-                            }
-                        )
-                    else:
-                        return HealthCheck(
-                            name="dashboard",
-                            status=MonitorStatus.UNHEALTHY,
-                            timestamp=datetime.now(),
-                            response_time_ms=response_time,
-                            details={"status_code": response.status},
-                            error=f"Dashboard returned status {response.status}"
-                        )
+            async with self._get_http_session().get(url) as response:
+                response_time = (time.time() - start_time) * 1000
+                
+                if response.status == 200:
+                    content = await response.text()
+                    return HealthCheck(
+                        name="dashboard",
+                        status=MonitorStatus.HEALTHY,
+                        timestamp=datetime.now(),
+                        response_time_ms=response_time,
+                        details={
+                            "status_code": response.status,
+                            "content_length": len(content)
+                        }
+                    )
+                else:
+                    return HealthCheck(
+                        name="dashboard",
+                        status=MonitorStatus.UNHEALTHY,
+                        timestamp=datetime.now(),
+                        response_time_ms=response_time,
+                        details={"status_code": response.status},
+                        error=f"Dashboard returned status {response.status}"
+                    )
                         
         except Exception as e:
             return HealthCheck(
@@ -309,11 +405,25 @@ class QMSMonitor:
             )
     
     def check_system_resources(self) -> HealthCheck:
-        """Check system resource usage"""
+        """Check system resource usage averaged over the sampler's recent window"""
+        start_time = time.time()
         try:
-            cpu_percent = psutil.cpu_percent(interval=1)
-            memory = psutil.virtual_memory()
-            disk = psutil.disk_usage('/')
+            sampler = self._get_resource_sampler()
+            window_seconds = float(self.monitoring_config.get('resources', {}).get(
+                'window_seconds', DEFAULT_SAMPLER_OPTIONS['window_seconds']
+            ))
+            usage = sampler.window(window_seconds)
+            if usage is None:
+                return HealthCheck(
+                    name="system_resources",
+                    status=MonitorStatus.UNKNOWN,
+                    timestamp=datetime.now(),
+                    response_time_ms=(time.time() - start_time) * 1000,
+                    details={"message": f"No resource samples yet (first one after {sampler.interval:g}s)"}
+                )
+            cpu_percent = usage['cpu_percent']['avg']
+            memory_percent = usage['memory_percent']['avg']
+            disk_percent = usage['disk_percent']['max']
             
             # Determine status based on thresholds
             status = MonitorStatus.HEALTHY
@@ -323,28 +433,37 @@ class QMSMonitor:
                 status = MonitorStatus.WARNING
                 issues.append(f"High CPU usage: {cpu_percent}%")
             
-            if memory.percent > 85:
+            if memory_percent > 85:
                 status = MonitorStatus.WARNING
-                issues.append(f"High memory usage: {memory.percent}%")
+                issues.append(f"High memory usage: {memory_percent}%")
             
-            if disk.percent > 90:
+            if disk_percent > 90:
                 status = MonitorStatus.WARNING
-                issues.append(f"High disk usage: {disk.percent}%")
+                issues.append(f"High disk usage: {disk_percent}%")
             
-            if cpu_percent > 95 or memory.percent > 95 or disk.percent > 95:
+            if cpu_percent > 95 or memory_percent > 95 or disk_percent > 95:
                 status = MonitorStatus.UNHEALTHY
             
             return HealthCheck(
                 name="system_resources",
                 status=status,
                 timestamp=datetime.now(),
-                response_time_ms=0,
+                response_time_ms=(time.time() - start_time) * 1000,
                 details={
                     "cpu_percent": cpu_percent,
-                    "memory_percent": memory.percent,
-                    "memory_available_gb": round(memory.available / (1024**3), 2),
-                    "disk_percent": disk.percent,
-                    "disk_free_gb": round(disk.free / (1024**3), 2),
+                    "cpu_percent_max": usage['cpu_percent']['max'],
+                    "memory_percent": memory_percent,
+                    "memory_percent_max": usage['memory_percent']['max'],
+                    "memory_available_gb": round(usage['memory_available'] / (1024**3), 2),
+                    "disk_percent": disk_percent,
+                    "disk_free_gb": round(usage['disk_free'] / (1024**3), 2),
+                    "disk_read_bps": usage['disk_read_bps'],
+                    "disk_write_bps": usage['disk_write_bps'],
+                    "net_sent_bps": usage['net_sent_bps'],
+                    "net_recv_bps": usage['net_recv_bps'],
+                    "window_seconds": usage['window_seconds'],
+                    "samples": usage['samples'],
+                    "sampler": sampler.overhead(),
                     "issues": issues
                 },
                 error="; ".join(issues) if issues else None
@@ -375,19 +494,20 @@ class QMSMonitor:
                     details={"message": "Database not available"}
                 )
             
-            with sqlite3.connect(db_path) as conn:
+            with self._get_pool(db_path).connection() as conn:
                 cursor = conn.cursor()
                 
                 # Check quality gates in last hour
-                cursor.execute("""
+                where, params = TimeWindow.last(hours=1).sql()
+                cursor.execute(f"""
                     SELECT 
                         status,
                         COUNT(*) as count,
                         AVG(score) as avg_score
                     FROM quality_gate_results 
-                    WHERE created_at >= datetime('now', '-1 hour')
+                    WHERE {where}
                     GROUP BY status
-                """)
+                """, params)
                 
                 results = cursor.fetchall()
                 
@@ -439,14 +559,17 @@ class QMSMonitor:
     
     async def run_health_checks(self) -> List[HealthCheck]:
         """Run all health checks concurrently"""
-        checks = await asyncio.gather(
+        # Resource usage is read from the background sampler's buffer without blocking, after
+        # the other checks so that on a first run the sampler has had their duration to warm up
+        self._get_resource_sampler()
+        database, api, dashboard, quality_gates = await asyncio.gather(
             self.check_database_health(),
             self.check_api_health(),
             self.check_dashboard_health(),
-            asyncio.to_thread(self.check_system_resources),
             self.check_quality_gate_performance(),
             return_exceptions=True
         )
+        checks = [database, api, dashboard, self.check_system_resources(), quality_gates]
         
         # Filter out exceptions and return valid health checks
         valid_checks = []
@@ -459,14 +582,15 @@ class QMSMonitor:
         return valid_checks
     
     def create_alert(self, level: AlertLevel, source: str, message: str, 
-                    details: Optional[Dict[str, Any]] = None) -> Alert:
+                    details: Optional[Dict[str, Any]] = None, resolved: bool = False) -> Alert:
         """Create and process a new alert"""
         alert = Alert(
             timestamp=datetime.now(),
             level=level,
             source=source,
             message=message,
-            details=details or {}
+            details=details or {},
+            resolved=resolved
         )
         
         self.alerts.append(alert)
@@ -478,8 +602,29 @@ class QMSMonitor:
             except Exception as e:
                 logger.error(f"Alert handler failed: {e}")
         
+        if self.alert_channels:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                # Outside the monitor's event loop there is nothing to hand the alert to
+                asyncio.run(self._deliver_alert_now(alert))
+            else:
+                self._get_alert_dispatcher().submit(alert)
+        
         return alert
     
+    async def _deliver_alert_now(self, alert: Alert):
+        """Deliver one alert to every channel and wait for it (for callers without an event loop).
+        
+        Only what belongs to this short-lived loop is torn down; the SMTP
+        connection and the resource sampler stay up for the next alert.
+        """
+        dispatcher = self._get_alert_dispatcher()
+        try:
+            dispatcher.submit(alert)
+        finally:
+            await self._close_loop_resources()
+    
     def _log_alert(self, alert: Alert):
         """Log alert to console"""
         level_colors = {
@@ -492,116 +637,159 @@ class QMSMonitor:
         color = level_colors.get(alert.level, '')
         reset = '\033[0m'
         
-        print(f"{color}[{alert.level.value.upper()}] {alert.timestamp.strftime('%Y-%m-%d %H:%M:%S')}{reset}")
+        print(f"{color}[{self._alert_label(alert)}] {alert.timestamp.strftime('%Y-%m-%d %H:%M:%S')}{reset}")
         print(f"Source: {alert.source}")
         print(f"Message: {alert.message}")
         if alert.details:
             print(f"Details: {json.dumps(alert.details, indent=2)}")
         print()
     
-    def _send_email_alert(self, alert: Alert):
-        """Send alert via email"""
-        try:
-            email_config = self.config.get('integrations', {}).get('email', {})
-            
-            smtp_server = email_config.get('smtp_server')
-            smtp_port = email_config.get('smtp_port', 587)
-            username = email_config.get('username')
-            password = os.environ.get('QMS_EMAIL_PASSWORD')
-            
-            if not all([smtp_server, username, password]):
-                logger.warning("Email configuration incomplete, skipping email alert")
-                return
-            
-            msg = MimeMultipart()
-            msg['From'] = username
-            msg['To'] = email_config.get('alerts_to', username)
-            msg['Subject'] = f"QMS Alert: {alert.level.value.upper()} - {alert.source}"
-            
-            body = f"""
-QMS Alert Notification
-
-Level: {alert.level.value.upper()}
+    @staticmethod
+    def _alert_label(alert: Alert) -> str:
+        return 'RESOLVED' if alert.resolved else alert.level.value.upper()
+    
+    @staticmethod
+    def _highest_level(alerts: List[Alert]) -> AlertLevel:
+        return max((alert.level for alert in alerts), key=list(AlertLevel).index)
+    
+    def _get_smtp_connection(self) -> Optional[SMTPConnection]:
+        """SMTP connection kept open while alerts keep arriving (None if email is not fully configured)"""
+        with self._smtp_lock:
+            if self._smtp is None:
+                email_config = self.config.get('integrations', {}).get('email', {})
+                smtp_server = email_config.get('smtp_server')
+                username = email_config.get('username')
+                password = os.environ.get('QMS_EMAIL_PASSWORD')
+                if not all([smtp_server, username, password]):
+                    return None
+                self._smtp = SMTPConnection(
+                    smtp_server, int(email_config.get('smtp_port', 587)), username, password,
+                    starttls=email_config.get('starttls', True), timeout=30,
+                    idle_seconds=float(email_config.get('keepalive_seconds', 60))
+                )
+            return self._smtp
+    
+    def _send_email_alert(self, alerts: List[Alert]):
+        """Send alerts via email, one message per batch (blocking; run on a worker thread by the alert queue)"""
+        email_config = self.config.get('integrations', {}).get('email', {})
+        smtp = self._get_smtp_connection()
+        
+        if smtp is None:
+            logger.warning("Email configuration incomplete, skipping email alert")
+            return
+        
+        msg = MIMEMultipart()
+        msg['From'] = smtp.username
+        msg['To'] = email_config.get('alerts_to', smtp.username)
+        
+        sections = [f"""Level: {self._alert_label(alert)}
 Source: {alert.source}
 Timestamp: {alert.timestamp}
 Message: {alert.message}
 
 Details:
 {json.dumps(alert.details, indent=2)}
-"""
-            
-            msg.attach(MimeText(body, 'plain'))
-            
-            server = smtplib.SMTP(smtp_server, smtp_port)
-            server.starttls()
-            server.login(username, password)
-            text = msg.as_string()
-            server.sendmail(username, msg['To'], text)
-            server.quit()
-            
-        except Exception as e:
-            logger.error(f"Failed to send email alert: {e}")
-    
-    def _send_slack_alert(self, alert: Alert):
-        """Send alert via Slack"""
+""" for alert in alerts]
+        
+        if len(alerts) == 1:
+            msg['Subject'] = f"QMS Alert: {self._alert_label(alerts[0])} - {alerts[0].source}"
+            body = f"\nQMS Alert Notification\n\n{sections[0]}"
+        else:
+            sources = sorted({alert.source for alert in alerts})
+            more = f" and {len(sources) - 3} more" if len(sources) > 3 else ''
+            msg['Subject'] = (f"QMS Alert digest: {len(alerts)} alerts "
+                              f"({self._highest_level(alerts).value.upper()}) - {', '.join(sources[:3])}{more}")
+            body = (f"\nQMS Alert Digest\n\n{len(alerts)} alerts from {alerts[0].timestamp} "
+                    f"to {alerts[-1].timestamp}\n\n" + "\n---\n\n".join(sections))
+        
+        msg.attach(MIMEText(body, 'plain'))
+        
         try:
-            slack_config = self.config.get('integrations', {}).get('slack', {})
-            webhook_url = os.environ.get('QMS_SLACK_WEBHOOK') or slack_config.get('webhook_url')
-            
-            if not webhook_url:
-                logger.warning("Slack webhook not configured, skipping Slack alert")
-                return
-            
-            color_map = {
-                AlertLevel.INFO: '#36a64f',
-                AlertLevel.WARNING: '#ff9500',
-                AlertLevel.ERROR: '#ff0000',
-                AlertLevel.CRITICAL: '#8b0000'
-            }
-            
-            payload = {
-                "attachments": [
-                    {
-                        "color": color_map.get(alert.level, '#cccccc'),
-                        "title": f"QMS Alert: {alert.level.value.upper()}",
-                        "fields": [
-                            {"title": "Source", "value": alert.source, "short": True},
-                            {"title": "Time", "value": alert.timestamp.strftime('%Y-%m-%d %H:%M:%S'), "short": True},
-                            {"title": "Message", "value": alert.message, "short": False}
-                        ]
-                    }
-                ]
-            }
-            
-            if alert.details:
-                payload["attachments"][0]["fields"].append({
+            smtp.send(msg, smtp.username, msg['To'])
+        except (smtplib.SMTPAuthenticationError, smtplib.SMTPRecipientsRefused) as e:
+            # Retrying cannot fix bad credentials or addresses
+            raise AlertDeliveryError(f"Email rejected: {e}", retry=False) from e
+    
+    async def _send_slack_alert(self, alerts: List[Alert]):
+        """Send alerts via Slack over the monitor's shared HTTP session, one message per batch"""
+        slack_config = self.config.get('integrations', {}).get('slack', {})
+        webhook_url = os.environ.get('QMS_SLACK_WEBHOOK') or slack_config.get('webhook_url')
+        
+        if not webhook_url:
+            logger.warning("Slack webhook not configured, skipping Slack alert")
+            return
+        
+        color_map = {
+            AlertLevel.INFO: '#36a64f',
+            AlertLevel.WARNING: '#ff9500',
+            AlertLevel.ERROR: '#ff0000',
+            AlertLevel.CRITICAL: '#8b0000'
+        }
+        
+        attachments = []
+        for alert in alerts:
+            fields = [
+                {"title": "Source", "value": alert.source, "short": True},
+                {"title": "Time", "value": alert.timestamp.strftime('%Y-%m-%d %H:%M:%S'), "short": True},
+                {"title": "Message", "value": alert.message, "short": False}
+            ]
+            # Details make a digest unreadable; they stay in the console log and email
+            if alert.details and len(alerts) == 1:
+                fields.append({
                     "title": "Details",
                     "value": f"```{json.dumps(alert.details, indent=2)}```",
                     "short": False
                 })
-            
-            response = requests.post(webhook_url, json=payload, timeout=10)
-            response.raise_for_status()
-            
-        except Exception as e:
-            logger.error(f"Failed to send Slack alert: {e}")
+            attachments.append({
+                "color": color_map.get(alert.level, '#cccccc'),
+                "title": f"QMS Alert: {self._alert_label(alert)}",
+                "fields": fields
+            })
+        
+        payload: Dict[str, Any] = {"attachments": attachments}
+        if len(alerts) > 1:
+            payload["text"] = (f"QMS Alert digest: {len(alerts)} alerts "
+                               f"({self._highest_level(alerts).value.upper()})")
+        
+        async with self._get_http_session().post(webhook_url, json=payload) as response:
+            if response.status < 400:
+                return
+            text = await response.text()
+            if response.status == 429:
+                retry_after = response.headers.get('Retry-After', '')
+                raise AlertDeliveryError("Slack rate limited the webhook",
+                                         retry_after=float(retry_after) if retry_after.isdigit() else None)
+            # Other client errors (bad webhook, malformed payload) will not succeed on retry
+            raise AlertDeliveryError(f"Slack returned {response.status}: {text[:200]}",
+                                     retry=response.status >= 500)
     
     def analyze_health_checks(self, health_checks: List[HealthCheck]):
-        """Analyze health check results and generate alerts"""
+        """Analyze health check results and generate alerts.
+        
+        Results go through the alert engine (tuned by monitoring.alerting),
+        which only passes on alerts that start, change or resolve, so a
+        check that stays failing does not alert on every cycle.
+        """
         for check in health_checks:
+            if check.status == MonitorStatus.UNKNOWN:
+                # Disabled or not configured: neither a failure nor a recovery
+                continue
             if check.status == MonitorStatus.UNHEALTHY:
-                self.create_alert(
-                    AlertLevel.ERROR,
-                    check.name,
-                    f"Health check failed: {check.error or 'Unknown error'}",
-                    check.details
-                )
+                level = AlertLevel.ERROR
+                message = f"Health check failed: {check.error or 'Unknown error'}"
             elif check.status == MonitorStatus.WARNING:
+                level = AlertLevel.WARNING
+                message = f"Health check warning: {check.error or 'Performance degraded'}"
+            else:
+                level, message = None, ''
+            
+            for notification in self.alert_engine.observe(check.name, level and level.value, message, check.details):
                 self.create_alert(
-                    AlertLevel.WARNING,
-                    check.name,
-                    f"Health check warning: {check.error or 'Performance degraded'}",
-                    check.details
+                    AlertLevel(notification.level),
+                    notification.source,
+                    notification.message,
+                    notification.details,
+                    resolved=notification.resolved
                 )
     
     async def monitor_cycle(self):
@@ -660,6 +848,12 @@ Details:
         
         print(f"\nOverall Status: {overall}")
         print(f"Recent Alerts: {len([a for a in self.alerts if a.timestamp > datetime.now() - timedelta(hours=1)])}")
+        firing = self.alert_engine.firing()
+        if firing:
+            print("Firing: " + ', '.join(
+                f"{source} (flapping)" if state['flapping'] else f"{source} ({state['level']})"
+                for source, state in firing.items()
+            ))
     
     async def run_continuous_monitoring(self, interval: int = 60):
         """Run continuous monitoring"""
@@ -676,14 +870,19 @@ Details:
             logger.error(f"Continuous monitoring failed: {e}")
         finally:
             self.running = False
+            await self.close()
     
     def stop_monitoring(self):
         """Stop continuous monitoring"""
         self.running = False
     
-    async def run_single_check(self) -> Dict[str, Any]:
-        """Run a single monitoring cycle and return results"""
-        health_checks = await self.run_health_checks()
+    async def run_single_check(self, close: bool = True) -> Dict[str, Any]:
+        """Run a single monitoring cycle and return results (closing the HTTP session unless ``close`` is False)"""
+        try:
+            health_checks = await self.run_health_checks()
+        finally:
+            if close:
+                await self.close()
         self.health_checks = health_checks
         
         return {
@@ -744,6 +943,9 @@ def main():
             # Run continuous monitoring
             asyncio.run(monitor.run_continuous_monitoring(args.interval))
         
+    except KeyboardInterrupt:
+        # asyncio.run cancels the monitoring task, which closes the HTTP session on the way out
+        logger.info("Monitoring stopped by user")
     except Exception as e:
         logger.error(f"Monitoring failed: {e}")
         sys.exit(1)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+QMS Alert Engine
+Turns the monitor's per-cycle health check results into notifications.
+
+Without state, a check that stays WARNING raises an identical alert every
+cycle. The engine tracks each check instead:
+
+- hysteresis: a check must be bad for ``fire_after`` consecutive cycles
+  before it fires, and good for ``resolve_after`` before it resolves;
+- deduplication: while firing, a notification is only sent when the
+  alert's fingerprint (source, level and message with numbers masked)
+  changes, plus a reminder every ``repeat_interval_seconds``;
+- flap detection: a check whose status keeps changing within the last
+  ``flap_window`` cycles is marked flapping with a single notification
+  and stays quiet until it settles, then alerts or resolves as usual;
+- resolution: a check that fired gets exactly one "resolved" notification
+  when it recovers.
+"""
+
+import re
+import time
+import hashlib
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+# Defaults, overridable through the ``monitoring.alerting`` configuration section
+DEFAULT_ENGINE_OPTIONS: Dict[str, Any] = {
+    'fire_after': 2,
+    'resolve_after': 2,
+    'repeat_interval_seconds': 3600,
+    'flap_window': 10,
+    'flap_start_ratio': 0.5,
+    'flap_stop_ratio': 0.25
+}
+
+_NUMBERS = re.compile(r'\d+(?:\.\d+)?')
+
+
+def fingerprint(source: str, level: str, message: str) -> str:
+    """Identity of an alert for deduplication; numbers are masked so e.g. changing percentages match"""
+    return hashlib.sha1(f"{source}|{level}|{_NUMBERS.sub('#', message)}".encode()).hexdigest()[:16]
+
+
+@dataclass
+class Notification:
+    """An alert the engine decided to send"""
+    source: str
+    level: str
+    message: str
+    details: Dict[str, Any]
+    # 'firing', 'changed', 'reminder', 'flapping' or 'resolved'
+    reason: str
+    resolved: bool = False
+
+
+@dataclass
+class _CheckState:
+    firing: bool = False
+    flapping: bool = False
+    consecutive_bad: int = 0
+    consecutive_good: int = 0
+    level: Optional[str] = None
+    message: str = ''
+    # Fingerprint and time of the last notification sent while firing (None if none was sent)
+    notified: Optional[str] = None
+    notified_at: float = 0.0
+    history: Deque[bool] = field(default_factory=deque)
+
+
+class AlertEngine:
+    """Stateful per-check alerting with hysteresis, deduplication and flap suppression"""
+
+    def __init__(self, options: Optional[Dict[str, Any]] = None):
+        self.options = {**DEFAULT_ENGINE_OPTIONS, **{k: v for k, v in (options or {}).items() if v is not None}}
+        self._states: Dict[str, _CheckState] = {}
+
+    def _state(self, source: str) -> _CheckState:
+        if source not in self._states:
+            self._states[source] = _CheckState(history=deque(maxlen=max(2, int(self.options['flap_window']))))
+        return self._states[source]
+
+    @staticmethod
+    def _flap_ratio(history: Deque[bool]) -> float:
+        """Share of consecutive observations whose good/bad status differs"""
+        if len(history) < 2:
+            return 0.0
+        observations = list(history)
+        changes = sum(previous != current for previous, current in zip(observations, observations[1:]))
+        return changes / (len(observations) - 1)
+
+    def observe(self, source: str, level: Optional[str], message: str = '',
+                details: Optional[Dict[str, Any]] = None, now: Optional[float] = None) -> List[Notification]:
+        """Record one check result (``level`` None when healthy); returns the notifications to send"""
+        now = time.monotonic() if now is None else now
+        details = details or {}
+        state = self._state(source)
+        bad = level is not None
+        state.history.append(bad)
+        notifications: List[Notification] = []
+
+        if bad:
+            state.consecutive_bad += 1
+            state.consecutive_good = 0
+            state.level, state.message = level, message
+            if state.consecutive_bad >= int(self.options['fire_after']):
+                state.firing = True
+        else:
+            state.consecutive_good += 1
+            state.consecutive_bad = 0
+
+        # Flap detection has its own hysteresis: start and stop thresholds differ
+        ratio = self._flap_ratio(state.history)
+        if not state.flapping and len(state.history) == state.history.maxlen \
+                and ratio >= float(self.options['flap_start_ratio']):
+            # Counts as firing with the flap notice as its last notification, so settling
+            # leads to either the real alert ('changed') or one 'resolved'
+            state.flapping, state.firing = True, True
+            state.notified, state.notified_at = fingerprint(source, 'flapping', ''), now
+            notifications.append(Notification(
+                source, 'warning', f"{source} is flapping ({ratio:.0%} status changes); "
+                                   f"alerts suppressed until it settles",
+                {'flap_ratio': round(ratio, 2), 'last_message': state.message}, 'flapping'
+            ))
+        elif state.flapping and ratio <= float(self.options['flap_stop_ratio']):
+            state.flapping = False
+        if state.flapping:
+            return notifications
+
+        if state.firing and not bad and state.consecutive_good >= int(self.options['resolve_after']):
+            if state.notified is not None:
+                notifications.append(Notification(
+                    source, 'info', f"Resolved: {state.message}", details, 'resolved', resolved=True
+                ))
+            state.firing, state.notified, state.level = False, None, None
+        elif state.firing and bad:
+            current = fingerprint(source, level, message)
+            if state.notified is None:
+                reason = 'firing'
+            elif current != state.notified:
+                reason = 'changed'
+            elif now - state.notified_at >= float(self.options['repeat_interval_seconds']):
+                reason = 'reminder'
+            else:
+                reason = None
+            if reason:
+                notifications.append(Notification(source, level, message, details, reason))
+                state.notified, state.notified_at = current, now
+
+        return notifications
+
+    def firing(self) -> Dict[str, Dict[str, Any]]:
+        """Checks currently firing or flapping, with their level and message"""
+        return {
+            source: {'level': state.level, 'message': state.message, 'flapping': state.flapping}
+            for source, state in self._states.items() if state.firing or state.flapping
+        }
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+QMS Alert Queue
+Asynchronous delivery of monitor alerts to notification channels.
+
+Every channel (email, Slack, ...) has its own bounded queue drained by its
+own worker tasks, so a slow or failing channel delays neither the monitor
+cycle that raised the alert nor the other channels. Failed deliveries are
+retried with exponential backoff and full jitter. A per-channel token
+bucket caps the delivery rate, so an alert storm is spread out (and, once
+the queue fills, trimmed) instead of tripping the receiving service's own
+limits. When a queue is full the channel's drop policy decides which alert
+is discarded, and the producer never waits.
+
+In digest mode (``digest_seconds`` > 0) a worker collects the alerts that
+arrive within that window after the first one and hands them to the sender
+as one batch, so an incident produces one email or Slack message per window
+rather than one per alert.
+"""
+
+import time
+import random
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable through the ``monitoring.alert_queue`` configuration section
+# (and per channel under ``monitoring.alert_queue.channels.<name>``)
+DEFAULT_QUEUE_OPTIONS: Dict[str, Any] = {
+    'max_size': 100,
+    'workers': 1,
+    'drop_policy': 'drop_oldest',
+    'max_attempts': 5,
+    'backoff_base_seconds': 1.0,
+    'backoff_max_seconds': 60.0,
+    'flush_timeout_seconds': 10.0,
+    # Token bucket: sustained deliveries per minute (0 disables) and how many may go out back to back
+    'rate_per_minute': 20,
+    'rate_burst': 5,
+    # Digest window after the first alert (0 sends each alert on its own) and its size cap
+    'digest_seconds': 0,
+    'digest_max_alerts': 50
+}
+
+DROP_POLICIES = ('drop_oldest', 'drop_newest')
+
+# A channel sender, given a batch of alerts (one unless the channel is in digest mode):
+# a coroutine function, or a blocking function run on a worker thread
+Sender = Callable[[List[Any]], Union[None, Awaitable[None]]]
+
+
+class AlertDeliveryError(Exception):
+    """A failed delivery; ``retry=False`` gives up at once, ``retry_after`` overrides the backoff"""
+
+    def __init__(self, message: str, retry: bool = True, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry = retry
+        self.retry_after = retry_after
+
+
+@dataclass
+class ChannelStats:
+    """Delivery counters for one channel"""
+    queued: int = 0
+    delivered: int = 0
+    retries: int = 0
+    failed: int = 0
+    dropped: int = 0
+    throttled: int = 0
+
+
+class TokenBucket:
+    """Token bucket rate limiter; ``reserve`` books a token and says how long to wait for it"""
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def reserve(self) -> float:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        # Going negative books a future token, so concurrent workers queue up behind each other
+        self._tokens -= 1
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+@dataclass
+class _Channel:
+    name: str
+    send: Sender
+    options: Dict[str, Any]
+    queue: asyncio.Queue
+    bucket: Optional[TokenBucket] = None
+    # Set by close() so workers send a partly collected digest instead of waiting out the window
+    flush: asyncio.Event = field(default_factory=asyncio.Event)
+    workers: List[asyncio.Task] = field(default_factory=list)
+    stats: ChannelStats = field(default_factory=ChannelStats)
+
+
+def backoff_delay(attempt: int, base: float, maximum: float) -> float:
+    """Full-jitter exponential backoff before retry number ``attempt`` (1-based)"""
+    return random.uniform(0, min(maximum, base * 2 ** (attempt - 1)))
+
+
+class AlertDispatcher:
+    """Per-channel bounded queues and retrying worker tasks on the running event loop"""
+
+    def __init__(self, senders: Dict[str, Sender], options: Optional[Dict[str, Any]] = None):
+        options = dict(options or {})
+        overrides = options.pop('channels', None) or {}
+        self._channels: Dict[str, _Channel] = {}
+        for name, send in senders.items():
+            channel_options = {**DEFAULT_QUEUE_OPTIONS, **options, **(overrides.get(name) or {})}
+            if channel_options['drop_policy'] not in DROP_POLICIES:
+                raise ValueError(f"Unknown drop policy for {name}: {channel_options['drop_policy']}")
+            rate = float(channel_options['rate_per_minute'] or 0) / 60
+            self._channels[name] = _Channel(
+                name, send, channel_options, asyncio.Queue(maxsize=max(1, int(channel_options['max_size']))),
+                TokenBucket(rate, float(channel_options['rate_burst'])) if rate > 0 else None
+            )
+
+    @property
+    def channels(self) -> List[str]:
+        return list(self._channels)
+
+    def _start_workers(self, channel: _Channel) -> None:
+        channel.workers = [task for task in channel.workers if not task.done()]
+        for index in range(len(channel.workers), max(1, int(channel.options['workers']))):
+            channel.workers.append(asyncio.create_task(self._work(channel), name=f"qms-alert-{channel.name}-{index}"))
+
+    def submit(self, alert: Any) -> bool:
+        """Queue ``alert`` on every channel without waiting; returns False if any channel dropped an alert.
+
+        Must be called from the event loop the workers run on.
+        """
+        accepted = True
+        for channel in self._channels.values():
+            self._start_workers(channel)
+            if channel.queue.full():
+                accepted = False
+                channel.stats.dropped += 1
+                if channel.options['drop_policy'] == 'drop_newest':
+                    logger.warning(f"{channel.name} alert queue full; dropping new alert from {alert.source}")
+                    continue
+                dropped = channel.queue.get_nowait()
+                channel.queue.task_done()
+                logger.warning(f"{channel.name} alert queue full; dropping oldest alert from {dropped.source}")
+            channel.queue.put_nowait(alert)
+            channel.stats.queued += 1
+        return accepted
+
+    async def _deliver(self, channel: _Channel, batch: List[Any]) -> None:
+        if asyncio.iscoroutinefunction(channel.send):
+            await channel.send(batch)
+        else:
+            await asyncio.to_thread(channel.send, batch)
+
+    async def _collect(self, channel: _Channel, batch: List[Any]) -> None:
+        """Add alerts arriving within the channel's digest window to ``batch``"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + float(channel.options['digest_seconds'])
+        limit = max(1, int(channel.options['digest_max_alerts']))
+        while len(batch) < limit and not channel.flush.is_set():
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            getter = asyncio.ensure_future(channel.queue.get())
+            flushing = asyncio.ensure_future(channel.flush.wait())
+            try:
+                await asyncio.wait({getter, flushing}, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                flushing.cancel()
+                if not getter.done():
+                    getter.cancel()
+            if getter.done() and not getter.cancelled():
+                batch.append(getter.result())
+        # Whatever is already queued goes out with this batch
+        while len(batch) < limit and not channel.queue.empty():
+            batch.append(channel.queue.get_nowait())
+
+    async def _work(self, channel: _Channel) -> None:
+        options = channel.options
+        while True:
+            batch = [await channel.queue.get()]
+            try:
+                if float(options['digest_seconds']) > 0:
+                    await self._collect(channel, batch)
+                for attempt in range(1, int(options['max_attempts']) + 1):
+                    delay = channel.bucket.reserve() if channel.bucket else 0.0
+                    if delay:
+                        channel.stats.throttled += 1
+                        await asyncio.sleep(delay)
+                    try:
+                        await self._deliver(channel, batch)
+                        channel.stats.delivered += len(batch)
+                        break
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        retry = getattr(e, 'retry', True) and attempt < int(options['max_attempts'])
+                        if not retry:
+                            channel.stats.failed += len(batch)
+                            logger.error(f"Failed to send {len(batch)} {channel.name} alert(s) "
+                                         f"after {attempt} attempt(s): {e}")
+                            break
+                        delay = getattr(e, 'retry_after', None) or backoff_delay(
+                            attempt, float(options['backoff_base_seconds']), float(options['backoff_max_seconds'])
+                        )
+                        channel.stats.retries += 1
+                        logger.warning(f"{channel.name} alert delivery failed ({e}); retrying in {delay:.1f}s")
+                        await asyncio.sleep(delay)
+            finally:
+                for _ in batch:
+                    channel.queue.task_done()
+
+    async def close(self) -> None:
+        """Deliver what is queued (up to each channel's flush timeout), then stop the workers"""
+        for channel in self._channels.values():
+            channel.flush.set()
+        for channel in self._channels.values():
+            # join() also covers an alert a worker is still delivering
+            if not channel.workers and channel.queue.empty():
+                continue
+            self._start_workers(channel)
+            try:
+                await asyncio.wait_for(channel.queue.join(), float(channel.options['flush_timeout_seconds']))
+            except asyncio.TimeoutError:
+                logger.warning(f"Gave up flushing {channel.queue.qsize()} queued {channel.name} alert(s)")
+
+        workers = [task for channel in self._channels.values() for task in channel.workers]
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        for channel in self._channels.values():
+            if channel.stats.queued:
+                stats = channel.stats
+                logger.info(f"{channel.name} alerts: {stats.delivered} delivered, {stats.failed} failed, "
+                            f"{stats.dropped} dropped, {stats.retries} retries, {stats.throttled} throttled")
+            channel.workers = []
+            # Anything left belongs to a loop that is going away
+            channel.queue = asyncio.Queue(maxsize=channel.queue.maxsize)
+            channel.flush = asyncio.Event()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {name: {**vars(channel.stats), 'pending': channel.queue.qsize()}
+                for name, channel in self._channels.items()}
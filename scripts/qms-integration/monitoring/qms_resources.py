@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+QMS Resource Sampler
+Background sampling of CPU, memory, disk and network counters for the monitor.
+
+A daemon thread reads the counters every ``interval`` seconds into a
+fixed-size ring buffer, so health checks get windowed averages and maxima
+instantly instead of blocking on ``psutil.cpu_percent(interval=1)`` for one
+instantaneous reading. The sampler measures its own CPU time and stretches
+the interval when needed to stay within ``cpu_budget_percent`` of one core.
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable through the ``monitoring.resources`` configuration section
+DEFAULT_SAMPLER_OPTIONS: Dict[str, Any] = {
+    'sample_interval_seconds': 1.0,
+    'buffer_seconds': 900,
+    'window_seconds': 60,
+    'disk_path': '/',
+    'cpu_budget_percent': 1.0
+}
+
+
+class ResourceSample(NamedTuple):
+    """One reading; rates are per second since the previous reading"""
+    timestamp: float
+    cpu_percent: float
+    memory_percent: float
+    memory_available: int
+    disk_percent: float
+    disk_free: int
+    disk_read_bps: float
+    disk_write_bps: float
+    net_sent_bps: float
+    net_recv_bps: float
+
+
+# Sample fields summarised as average and maximum over a window
+WINDOWED_FIELDS = ('cpu_percent', 'memory_percent', 'disk_percent',
+                   'disk_read_bps', 'disk_write_bps', 'net_sent_bps', 'net_recv_bps')
+
+
+class ResourceSampler:
+    """Samples system counters on a background thread into a ring buffer"""
+
+    def __init__(self, interval: float = 1.0, buffer_seconds: float = 900, disk_path: str = '/',
+                 cpu_budget_percent: float = 1.0):
+        self.interval = interval
+        self.disk_path = disk_path
+        self.cpu_budget_percent = cpu_budget_percent
+        self.samples: Deque[ResourceSample] = deque(maxlen=max(1, int(buffer_seconds / interval)))
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._previous: Optional[Dict[str, Any]] = None
+        # Sampling cost: CPU seconds spent in sample() and the wall time it was spread over
+        self._cpu_seconds = 0.0
+        self._started_at = 0.0
+        self._sample_cost = 0.0
+        self._effective_interval = interval
+
+    @classmethod
+    def from_config(cls, options: Optional[Dict[str, Any]] = None) -> 'ResourceSampler':
+        options = {**DEFAULT_SAMPLER_OPTIONS, **{k: v for k, v in (options or {}).items() if v is not None}}
+        return cls(float(options['sample_interval_seconds']), float(options['buffer_seconds']),
+                   options['disk_path'], float(options['cpu_budget_percent']))
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start sampling; the first sample's CPU and rate readings cover the time since this call"""
+        if self.running:
+            return
+        self._stop.clear()
+        self._started_at = time.monotonic()
+        self._previous = self._read_counters()
+        self._thread = threading.Thread(target=self._run, name='qms-resource-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _read_counters(self) -> Dict[str, Any]:
+        return {
+            'timestamp': time.monotonic(),
+            # Non-blocking: utilisation since the previous call
+            'cpu_percent': psutil.cpu_percent(interval=None),
+            'disk_io': psutil.disk_io_counters(),
+            'net_io': psutil.net_io_counters()
+        }
+
+    def sample(self) -> ResourceSample:
+        """Take one reading now and append it to the buffer"""
+        cpu_start = time.thread_time()
+        counters = self._read_counters()
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+
+        with self._lock:
+            previous, self._previous = self._previous, counters
+            elapsed = max(counters['timestamp'] - previous['timestamp'], 1e-6) if previous else None
+
+            def rate(group: str, field: str) -> float:
+                # Counters can be unavailable (e.g. no block devices in a container)
+                if elapsed is None or counters[group] is None or previous[group] is None:
+                    return 0.0
+                return max(getattr(counters[group], field) - getattr(previous[group], field), 0) / elapsed
+
+            reading = ResourceSample(
+                timestamp=counters['timestamp'],
+                cpu_percent=counters['cpu_percent'],
+                memory_percent=memory.percent,
+                memory_available=memory.available,
+                disk_percent=disk.percent,
+                disk_free=disk.free,
+                disk_read_bps=rate('disk_io', 'read_bytes'),
+                disk_write_bps=rate('disk_io', 'write_bytes'),
+                net_sent_bps=rate('net_io', 'bytes_sent'),
+                net_recv_bps=rate('net_io', 'bytes_recv')
+            )
+            self.samples.append(reading)
+
+            cost = time.thread_time() - cpu_start
+            self._cpu_seconds += cost
+            self._sample_cost = cost if not self._sample_cost else 0.8 * self._sample_cost + 0.2 * cost
+        return reading
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._effective_interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning(f"Resource sample failed: {e}")
+                continue
+
+            # Stretch the interval if sampling this often would exceed the CPU budget
+            budget_interval = self._sample_cost / (self.cpu_budget_percent / 100)
+            interval = max(self.interval, budget_interval)
+            if interval != self._effective_interval:
+                logger.debug(f"Resource sampling interval {self._effective_interval:.2f}s -> {interval:.2f}s "
+                             f"({self._sample_cost * 1000:.2f} ms CPU per sample)")
+                self._effective_interval = interval
+
+    def _recent(self, seconds: float) -> List[ResourceSample]:
+        with self._lock:
+            samples = list(self.samples)
+        cutoff = time.monotonic() - seconds
+        return [reading for reading in samples if reading.timestamp >= cutoff]
+
+    def window(self, seconds: float) -> Optional[Dict[str, Any]]:
+        """Averages and maxima over the last ``seconds``, plus the latest free memory and disk.
+
+        Never waits for a reading: with no sample in the window the latest
+        one in the buffer is summarised instead, and right after ``start``
+        (before the first interval has passed, since a CPU reading over a few
+        milliseconds means nothing) there is none and None is returned.
+        """
+        recent = self._recent(seconds)
+        if not recent:
+            with self._lock:
+                recent = list(self.samples)[-1:]
+            if not recent:
+                return None
+
+        covered = time.monotonic() - self._started_at if self._started_at else 0.0
+        summary: Dict[str, Any] = {'samples': len(recent), 'window_seconds': round(min(seconds, covered), 1)}
+        for field in WINDOWED_FIELDS:
+            values = [getattr(reading, field) for reading in recent]
+            summary[field] = {'avg': round(sum(values) / len(values), 1), 'max': round(max(values), 1)}
+        summary['memory_available'] = recent[-1].memory_available
+        summary['disk_free'] = recent[-1].disk_free
+        return summary
+
+    def overhead(self) -> Dict[str, float]:
+        """The sampler's own cost: CPU per sample and CPU share of one core since ``start``"""
+        elapsed = max(time.monotonic() - self._started_at, 1e-6) if self._started_at else 0.0
+        return {
+            'sample_cpu_ms': round(self._sample_cost * 1000, 3),
+            'cpu_percent': round(self._cpu_seconds / elapsed * 100, 3) if elapsed else 0.0,
+            'interval_seconds': round(self._effective_interval, 3)
+        }
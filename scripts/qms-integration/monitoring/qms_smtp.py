@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+QMS SMTP Connection
+A persistent, authenticated SMTP connection for alert email.
+
+Connecting, STARTTLS and login cost several round trips and a TLS
+handshake per message. While alerts keep arriving the connection is kept
+open and reused; after ``idle_seconds`` without a message it is replaced
+on the next send, since servers drop idle clients on their own schedule.
+A connection the server has already closed is detected on use and
+reopened once.
+"""
+
+import time
+import logging
+import smtplib
+import threading
+from email.message import Message
+from typing import List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPConnection:
+    """One reusable SMTP session, safe to share between alert worker threads"""
+
+    def __init__(self, host: str, port: int = 587, username: Optional[str] = None,
+                 password: Optional[str] = None, starttls: bool = True, timeout: float = 30,
+                 idle_seconds: float = 60):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.idle_seconds = idle_seconds
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+        self.connects = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                smtp.starttls()
+            if self.username and self.password:
+                smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        self.connects += 1
+        return smtp
+
+    def _disconnect(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except smtplib.SMTPException:
+            pass
+        except OSError:
+            pass
+        finally:
+            self._smtp.close()
+            self._smtp = None
+
+    def send(self, message: Message, from_addr: str, to_addrs: Union[str, List[str]]) -> None:
+        """Send ``message``, reusing the open connection when there is one"""
+        with self._lock:
+            if self._smtp is not None and time.monotonic() - self._last_used > self.idle_seconds:
+                self._disconnect()
+            reused = self._smtp is not None
+            if self._smtp is None:
+                self._smtp = self._connect()
+            try:
+                self._smtp.sendmail(from_addr, to_addrs, message.as_string())
+            except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                self._disconnect()
+                if not reused:
+                    raise
+                # The server closed the idle connection before we noticed
+                logger.debug(f"SMTP connection to {self.host} was closed ({e}); reconnecting")
+                self._smtp = self._connect()
+                self._smtp.sendmail(from_addr, to_addrs, message.as_string())
+            except smtplib.SMTPResponseException as e:
+                # A 421 means the server is closing the session; anything else leaves it usable
+                if e.smtp_code == 421:
+                    self._disconnect()
+                raise
+            self._last_used = time.monotonic()
+
+    def close(self) -> None:
+        with self._lock:
+            self._disconnect()
@@ -10,27 +10,34 @@ import json
 import yaml
 import argparse
 import logging
-import sqlite3
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Tuple
-from datetime import datetime, timedelta
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import seaborn as sns
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-import jinja2
-from jinja2 import Environment, FileSystemLoader
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Any, Sequence, Tuple
+from datetime import datetime
 import base64
-import io
+import hashlib
 import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'database'))
+from qms_datasources import DataSource, create_data_source, table_info_schema
+from qms_migrations import outdated_schema_message
+from qms_rollups import ROLLUP_SOURCES, Aggregate, combine, installed_rollups, read_series, read_window
+from qms_sketches import SKETCH_MEASURES, TDigest, installed_sketches, read_digests
+from qms_time import TIME_COLUMN, TimeWindow, to_epoch_ms, utc_from_epoch_ms
+from qms_charts import ChartJob, data_uri, render_charts
+from qms_chart_cache import ChartCache
+from qms_query_cache import QueryCache
+from qms_export import EXPORT_COMPRESSIONS, EXPORT_FORMATS, export_filename, write_export
+from qms_profiler import StageProfiler
+
+# pandas, matplotlib/seaborn and jinja2 are imported where they are used so that
+# formats which never plot or template (e.g. --format json) don't pay for them
+if TYPE_CHECKING:
+    import jinja2
+    import pandas as pd
 
 # Configure logging
 logging.basicConfig(
@@ -39,6 +46,60 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+REPORT_FORMATS = ['html', 'json']
+
+# Percentiles reported for every sketched measure
+PERCENTILES = (50, 95, 99)
+
+# (table, grain) -> aggregates; grain None is the whole window, 'day' a per-day series
+# and 'quantiles' the window's per-metric digests
+AggregateKey = Tuple[str, Optional[str]]
+
+# Aggregate reads behind each metric section and chart
+SECTION_READS: Dict[str, List[AggregateKey]] = {
+    'quality_gates': [('quality_gate_results', None)],
+    'code_coverage': [('code_coverage_results', None)],
+    'security_issues': [('security_scan_results', None)],
+    'code_review': [('code_review_results', None)],
+    'distributions': [(table, 'quantiles') for table in SKETCH_MEASURES]
+}
+CHART_READS: Dict[str, List[AggregateKey]] = {
+    'quality_gates_trend': [('quality_gate_results', 'day')],
+    'coverage_trend': [('code_coverage_results', 'day')],
+    'quality_gates_distribution': SECTION_READS['quality_gates'],
+    'security_issues_by_severity': SECTION_READS['security_issues']
+}
+
+@dataclass(frozen=True)
+class ReportPlan:
+    """The metric sections and charts a report type shows; nothing else is queried or rendered"""
+    sections: Tuple[str, ...]
+    charts: Tuple[str, ...] = ()
+    
+    def reads(self, with_charts: bool = True) -> List[AggregateKey]:
+        """Aggregate reads the plan needs, in a stable order"""
+        keys = [key for section in self.sections for key in SECTION_READS[section]]
+        if with_charts:
+            keys += [key for chart in self.charts for key in CHART_READS[chart]]
+        return list(dict.fromkeys(keys))
+
+REPORT_PLANS: Dict[str, ReportPlan] = {
+    'comprehensive': ReportPlan(
+        sections=tuple(SECTION_READS),
+        charts=tuple(CHART_READS)
+    ),
+    'summary': ReportPlan(
+        sections=('quality_gates', 'code_coverage', 'security_issues', 'code_review'),
+        charts=('quality_gates_distribution', 'security_issues_by_severity')
+    ),
+    # Headline numbers only: a few rollup lookups, no raw scans and no charts
+    'executive': ReportPlan(
+        sections=('quality_gates', 'code_coverage', 'security_issues')
+    )
+}
+
+REPORT_TYPES = list(REPORT_PLANS)
+
 class Colors:
     """ANSI color codes for terminal output"""
     GREEN = '\033[92m'
@@ -48,16 +109,43 @@ class Colors:
     BOLD = '\033[1m'
     ENDC = '\033[0m'
 
+def _round(value: Optional[float], digits: int) -> Optional[float]:
+    """Round a possibly missing aggregate value"""
+    return round(value, digits) if value is not None else None
+
+def _nan_if_missing(value: Optional[float]) -> float:
+    """Chart value for a possibly missing aggregate; NaN plots as a gap"""
+    return float('nan') if value is None else value
+
+def _dimension_order(item: Tuple[Tuple[Optional[str], str], Aggregate]) -> Tuple[bool, str]:
+    """Sort key matching SQL GROUP BY order (NULL first) for (dimension, metric) aggregates"""
+    (dimension, _), _ = item
+    return (dimension is not None, dimension or '')
+
 class QMSReporter:
     """Main QMS reporting class"""
     
-    def __init__(self, config_path: Optional[str] = None, data_source: Optional[str] = None):
-        self.config_path = config_path or self._find_config()
-        self.config = self._load_config()
+    def __init__(self, config_path: Optional[str] = None, data_source: Optional[str] = None,
+                 profiler: Optional[StageProfiler] = None):
+        # Stage timings are always collected; pass a profiler with trace_memory=True for peak memory
+        self.profiler = profiler or StageProfiler()
+        with self.profiler.stage('config'):
+            self.config_path = config_path or self._find_config()
+            self.config = self._load_config()
         self.data_source = data_source or self._get_data_source()
+        self.backend: DataSource = create_data_source(self.config.get('database', {}), self.data_source)
+        self._check_schema()
         self.output_dir = Path(self.config.get('reporting', {}).get('output_dir', './reports'))
         self.template_dir = Path(__file__).parent / 'templates'
-        self._setup_matplotlib()
+        self.cache_dir = Path(self.config.get('reporting', {}).get('cache_dir', self.output_dir / '.cache'))
+        # 'assets' writes charts as files next to the report, 'inline' embeds them for single-file reports
+        self.chart_mode = self.config.get('reporting', {}).get('chart_mode', 'assets')
+        self._rollup_tables: Optional[List[str]] = None
+        self._sketch_watermarks: Optional[Dict[str, int]] = None
+        self._chart_cache: Optional[ChartCache] = None
+        self._query_cache: Optional[QueryCache] = None
+        self._template_env: Optional['jinja2.Environment'] = None
+        self.stage_timings: Dict[str, float] = {}
         
     def _find_config(self) -> str:
         """Find QMS configuration file"""
@@ -85,55 +173,201 @@ class QMSReporter:
             logger.error(f"Failed to load QMS config: {e}")
             sys.exit(1)
     
+    def _check_schema(self) -> None:
+        """Exit if the SQLite database predates the schema the report queries need"""
+        if not self.backend.supports_rollups or not self.backend.exists():
+            return
+        try:
+            version = self.backend.execute("PRAGMA user_version")[1][0][0]
+        except Exception as e:
+            logger.error(f"Failed to read the database schema version: {e}")
+            sys.exit(1)
+        message = outdated_schema_message(version)
+        if message:
+            logger.error(message)
+            sys.exit(1)
+    
     def _get_data_source(self) -> str:
-        """Get data source path"""
-        db_config = self.config.get('database', {})
-        if db_config.get('type') == 'sqlite':
-            return db_config.get('path', './qms.db')
-        else:
-            logger.warning("Non-SQLite databases not yet supported for reporting")
-            return './qms.db'
-    
-    def _setup_matplotlib(self):
-        """Configure matplotlib for better plots"""
-        plt.style.use('seaborn-v0_8')
-        sns.set_palette("husl")
-        
-        # Configure matplotlib params
-        plt.rcParams.update({
-            'figure.figsize': (12, 8),
-            'font.size': 10,
-            'axes.titlesize': 14,
-            'axes.labelsize': 12,
-            'xtick.labelsize': 10,
-            'ytick.labelsize': 10,
-            'legend.fontsize': 10,
-            'figure.titlesize': 16
-        })
-    
-    def _execute_query(self, query: str, params: Optional[Tuple] = None) -> pd.DataFrame:
+        """Get data source path (SQLite/DuckDB file or Parquet directory, per database.type)"""
+        return self.config.get('database', {}).get('path', './qms.db')
+    
+    def _execute_query(self, query: str, params: Optional[Tuple] = None) -> 'pd.DataFrame':
         """Execute SQL query and return DataFrame"""
+        import pandas as pd
+        
         try:
-            if not os.path.exists(self.data_source):
+            if not self.backend.exists():
                 logger.warning(f"Database not found at {self.data_source}, returning empty DataFrame")
                 return pd.DataFrame()
             
-            with sqlite3.connect(self.data_source) as conn:
-                df = pd.read_sql_query(query, conn, params=params or ())
-            return df
+            columns, rows = self._run_query(query, params or ())
+            return pd.DataFrame.from_records(rows, columns=columns)
         except Exception as e:
             logger.error(f"Database query failed: {e}")
             return pd.DataFrame()
     
-    def collect_quality_metrics(self, days: int = 30) -> Dict[str, Any]:
-        """Collect quality metrics from the database"""
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
+    def _fetch_rows(self, query: str, params: Sequence[Any] = ()) -> List[Tuple]:
+        """Execute SQL query and return the raw result rows"""
+        try:
+            if not self.backend.exists():
+                logger.warning(f"Database not found at {self.data_source}, returning no rows")
+                return []
+            
+            return self._run_query(query, params)[1]
+        except Exception as e:
+            logger.error(f"Database query failed: {e}")
+            return []
+    
+    def _get_query_cache(self) -> Optional[QueryCache]:
+        """Persistent query-result cache, unless disabled in reporting.query_cache"""
+        cache_config = self.config.get('reporting', {}).get('query_cache', {})
+        if not cache_config.get('enabled', True):
+            return None
+        
+        if self._query_cache is None:
+            self._query_cache = QueryCache(
+                Path(cache_config.get('path', self.cache_dir / 'queries.db')),
+                max_bytes=int(cache_config.get('max_size_mb', 64)) * 1024 * 1024
+            )
+        return self._query_cache
+    
+    def _run_query(self, query: str, params: Sequence[Any] = ()) -> Tuple[List[str], List[Tuple]]:
+        """Execute SQL query through the query cache, returning column names and rows"""
+        cache = self._get_query_cache()
+        identity = self.backend.identity() if cache else None
+        if identity:
+            cached = cache.get(query, params, identity)
+            if cached is not None:
+                return cached
+        
+        columns, rows = self.backend.execute(query, params)
+        
+        # Only store results that no write could have raced with
+        if identity and self.backend.identity() == identity:
+            cache.put(query, params, identity, columns, rows)
+        return columns, rows
+    
+    def _uses_rollups(self, table: str) -> bool:
+        """Whether the table's aggregates can be read from the rollup buckets"""
+        if self._rollup_tables is None:
+            # Columnar backends scan raw rows; only SQLite maintains rollups
+            if not self.backend.supports_rollups:
+                self._rollup_tables = []
+                return False
+            
+            self._rollup_tables = installed_rollups(self._fetch_rows)
+            if len(self._rollup_tables) < 4:
+                logger.info("Rollups not installed for every result table; missing ones are scanned raw "
+                            "(run database/qms_migrations.py to enable them)")
+        return table in self._rollup_tables
+    
+    def _stream_rows(self, query: str, params: Sequence[Any] = ()) -> Iterable[Tuple[List[str], List[Tuple]]]:
+        """Stream a query's rows in chunks, bypassing the query cache"""
+        return self.backend.iter_chunks(query, params)
+    
+    def _sketch_watermark(self, table: str) -> Optional[int]:
+        """Watermark of the table's daily quantile sketches, or None if it has none"""
+        if self._sketch_watermarks is None:
+            self._sketch_watermarks = installed_sketches(self._fetch_rows) if self.backend.supports_rollups else {}
+        return self._sketch_watermarks.get(table)
+    
+    def _window_digests(self, table: str, window: TimeWindow) -> Dict[str, TDigest]:
+        """Merged quantile digests of the table's sketched measures over a time window"""
+        if not self.backend.exists():
+            return {}
+        try:
+            return read_digests(self._fetch_rows, self._stream_rows, table, window, self._sketch_watermark(table))
+        except Exception as e:
+            logger.error(f"Percentile query failed: {e}")
+            return {}
+    
+    def _aggregate_window(self, table: str, window: TimeWindow) -> Dict[Tuple[Optional[str], str], Aggregate]:
+        """Aggregate a result table over a time window, preferring rollups"""
+        return read_window(self._fetch_rows, table, window, self._uses_rollups(table))
+    
+    def _aggregate_series(self, table: str, grain: str,
+                          window: TimeWindow) -> Dict[int, Dict[Tuple[Optional[str], str], Aggregate]]:
+        """Per-bucket aggregates of a result table, preferring rollups"""
+        return read_series(self._fetch_rows, table, grain, window, self._uses_rollups(table))
+    
+    def _report_window(self, days: int) -> TimeWindow:
+        """The last ``days`` days, ending on a reporting.window_resolution_seconds boundary.
+        
+        Snapping the end back keeps query parameters, and so query-cache keys,
+        identical for runs within the same resolution period; results from
+        the current, unfinished period appear in the next period's reports.
+        """
+        resolution = float(self.config.get('reporting', {}).get('window_resolution_seconds', 60))
+        window = TimeWindow.last(days=days)
+        return window.snapped(int(resolution * 1000)) if resolution > 0 else window
+    
+    def _query_workers(self) -> int:
+        """Threads for concurrent aggregate queries (reporting.query_workers, default: pool size capped at CPU count)"""
+        pool_size = int(self.config.get('database', {}).get('pool', {}).get('max_connections', 4))
+        workers = self.config.get('reporting', {}).get('query_workers') or min(pool_size, os.cpu_count() or 1)
+        return max(1, int(workers))
+    
+    def _profiled_read(self, name: str, parent: Optional[str], read: Callable[[], Any]) -> Any:
+        with self.profiler.stage(name, parent):
+            return read()
+    
+    def read_aggregates(self, window: TimeWindow,
+                        keys: Optional[Iterable[AggregateKey]] = None) -> Dict[AggregateKey, Any]:
+        """Run a report's independent aggregate reads concurrently.
+        
+        ``keys`` are the reads to perform (see ``ReportPlan.reads``; default:
+        every metric section). The whole plan is built up front and executed
+        on a bounded thread pool; every read borrows its own connection from
+        the data source, so on a WAL database they proceed as parallel readers
+        and the wall time approaches that of the slowest query. Each read is
+        profiled as a ``query:TABLE:GRAIN`` stage under the caller's stage.
+        """
+        if keys is None:
+            keys = REPORT_PLANS['comprehensive'].reads(with_charts=False)
+        
+        plan: Dict[AggregateKey, Callable[[], Any]] = {}
+        for table, grain in keys:
+            if grain is None:
+                read = partial(self._aggregate_window, table, window)
+            elif grain == 'quantiles':
+                read = partial(self._window_digests, table, window)
+            else:
+                read = partial(self._aggregate_series, table, grain, window)
+            plan[(table, grain)] = partial(
+                self._profiled_read, f"query:{table}:{grain or 'window'}", self.profiler.current_path(), read
+            )
+        if not plan:
+            return {}
+        
+        # Settle lazily created state before the workers race to create it
+        self._uses_rollups(next(iter(plan))[0])
+        if any(grain == 'quantiles' for _, grain in plan):
+            self._sketch_watermark(next(iter(plan))[0])
+        self._get_query_cache()
+        
+        workers = min(self._query_workers(), len(plan))
+        if workers <= 1:
+            return {key: read() for key, read in plan.items()}
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='qms-query') as executor:
+            futures = {key: executor.submit(read) for key, read in plan.items()}
+            return {key: future.result() for key, future in futures.items()}
+    
+    def collect_quality_metrics(self, days: int = 30, window: Optional[TimeWindow] = None,
+                                aggregates: Optional[Dict[AggregateKey, Any]] = None) -> Dict[str, Any]:
+        """Collect quality metrics from the database.
+        
+        ``aggregates`` are results of ``read_aggregates`` if already read;
+        sections whose reads are missing from them are left empty.
+        """
+        window = window or self._report_window(days)
+        if aggregates is None:
+            aggregates = self.read_aggregates(window)
         
         metrics = {
             'period': {
-                'start_date': start_date.isoformat(),
-                'end_date': end_date.isoformat(),
+                'start_date': window.start.isoformat(),
+                'end_date': window.end.isoformat(),
                 'days': days
             },
             'quality_gates': {},
@@ -141,503 +375,249 @@ class QMSReporter:
             'security_issues': {},
             'code_review': {},
             'compliance': {},
+            'distributions': {},
             'trends': {}
         }
         
         # Quality Gates Summary
-        quality_gates_query = """
-        SELECT 
-            status,
-            COUNT(*) as count,
-            AVG(score) as avg_score
-        FROM quality_gate_results 
-        WHERE created_at >= ? AND created_at <= ?
-        GROUP BY status
-        """
-        
-        qg_df = self._execute_query(quality_gates_query, (start_date, end_date))
-        if not qg_df.empty:
+        qg_aggregates = aggregates.get(('quality_gate_results', None), {})
+        by_status = [
+            {'status': status, 'count': aggregate.row_count, 'avg_score': aggregate.mean}
+            for (status, _), aggregate in sorted(qg_aggregates.items(), key=_dimension_order)
+        ]
+        if by_status:
+            total_runs = sum(item['count'] for item in by_status)
+            pass_count = sum(item['count'] for item in by_status if item['status'] == 'PASS')
+            status_scores = [item['avg_score'] for item in by_status if item['avg_score'] is not None]
             metrics['quality_gates'] = {
-                'total_runs': qg_df['count'].sum(),
-                'pass_rate': qg_df[qg_df['status'] == 'PASS']['count'].sum() / qg_df['count'].sum() * 100 if not qg_df.empty else 0,
-                'avg_score': qg_df['avg_score'].mean(),
-                'by_status': qg_df.to_dict('records')
+                'total_runs': total_runs,
+                'pass_rate': pass_count / total_runs * 100,
+                'avg_score': sum(status_scores) / len(status_scores) if status_scores else None,
+                'by_status': by_status
             }
         
         # Code Coverage Metrics
-        coverage_query = """
-        SELECT 
-            AVG(line_coverage) as avg_line_coverage,
-            AVG(branch_coverage) as avg_branch_coverage,
-            MIN(line_coverage) as min_line_coverage,
-            MAX(line_coverage) as max_line_coverage
-        FROM code_coverage_results 
-        WHERE created_at >= ? AND created_at <= ?
-        """
-        
-        coverage_df = self._execute_query(coverage_query, (start_date, end_date))
-        if not coverage_df.empty and not coverage_df.iloc[0].isna().all():
-            row = coverage_df.iloc[0]
+        coverage_aggregates = aggregates.get(('code_coverage_results', None), {})
+        line_coverage = coverage_aggregates.get((None, 'line_coverage'), Aggregate())
+        branch_coverage = coverage_aggregates.get((None, 'branch_coverage'), Aggregate())
+        if line_coverage.value_count or branch_coverage.value_count:
             metrics['code_coverage'] = {
-                'avg_line_coverage': round(row['avg_line_coverage'], 2),
-                'avg_branch_coverage': round(row['avg_branch_coverage'], 2),
-                'min_line_coverage': round(row['min_line_coverage'], 2),
-                'max_line_coverage': round(row['max_line_coverage'], 2)
+                'avg_line_coverage': _round(line_coverage.mean, 2),
+                'avg_branch_coverage': _round(branch_coverage.mean, 2),
+                'min_line_coverage': _round(line_coverage.value_min, 2),
+                'max_line_coverage': _round(line_coverage.value_max, 2)
             }
         
         # Security Issues
-        security_query = """
-        SELECT 
-            severity,
-            COUNT(*) as count,
-            AVG(CASE WHEN status = 'RESOLVED' THEN 1 ELSE 0 END) as resolution_rate
-        FROM security_scan_results 
-        WHERE created_at >= ? AND created_at <= ?
-        GROUP BY severity
-        """
-        
-        security_df = self._execute_query(security_query, (start_date, end_date))
-        if not security_df.empty:
+        security_aggregates = aggregates.get(('security_scan_results', None), {})
+        by_severity = [
+            {'severity': severity, 'count': aggregate.row_count, 'resolution_rate': aggregate.mean}
+            for (severity, _), aggregate in sorted(security_aggregates.items(), key=_dimension_order)
+        ]
+        if by_severity:
             metrics['security_issues'] = {
-                'total_issues': security_df['count'].sum(),
-                'by_severity': security_df.to_dict('records'),
-                'avg_resolution_rate': security_df['resolution_rate'].mean() * 100
+                'total_issues': sum(item['count'] for item in by_severity),
+                'by_severity': by_severity,
+                'avg_resolution_rate': sum(item['resolution_rate'] for item in by_severity) / len(by_severity) * 100
             }
         
         # Code Review Metrics
-        review_query = """
-        SELECT 
-            AVG(review_time_hours) as avg_review_time,
-            AVG(comments_count) as avg_comments,
-            COUNT(*) as total_reviews,
-            AVG(CASE WHEN approved = 1 THEN 1 ELSE 0 END) as approval_rate
-        FROM code_review_results 
-        WHERE created_at >= ? AND created_at <= ?
-        """
-        
-        review_df = self._execute_query(review_query, (start_date, end_date))
-        if not review_df.empty and not review_df.iloc[0].isna().all():
-            row = review_df.iloc[0]
+        review_aggregates = aggregates.get(('code_review_results', None), {})
+        approvals = review_aggregates.get((None, 'approved'), Aggregate())
+        if approvals.row_count:
             metrics['code_review'] = {
-                'total_reviews': int(row['total_reviews']),
-                'avg_review_time': round(row['avg_review_time'], 2),
-                'avg_comments': round(row['avg_comments'], 1),
-                'approval_rate': round(row['approval_rate'] * 100, 1)
+                'total_reviews': approvals.row_count,
+                'avg_review_time': _round(review_aggregates[(None, 'review_time_hours')].mean, 2),
+                'avg_comments': _round(review_aggregates[(None, 'comments_count')].mean, 1),
+                'approval_rate': round(approvals.mean * 100, 1)
             }
         
+        # Tail percentiles from the merged daily sketches
+        for table in SKETCH_MEASURES:
+            for metric, digest in aggregates.get((table, 'quantiles'), {}).items():
+                if not digest.count:
+                    continue
+                distribution = {'count': int(digest.count)}
+                for percentile in PERCENTILES:
+                    distribution[f"p{percentile}"] = _round(digest.quantile(percentile / 100), 2)
+                distribution['max'] = _round(digest.max, 2)
+                metrics['distributions'][metric] = distribution
+        
         return metrics
     
-    def generate_trend_charts(self, metrics: Dict[str, Any], days: int = 30) -> Dict[str, str]:
-        """Generate trend charts and return base64 encoded images"""
-        charts = {}
+    def _chart_workers(self) -> int:
+        """Worker processes for chart rendering (reporting.chart_workers, default: CPU count)"""
+        return int(self.config.get('reporting', {}).get('chart_workers') or os.cpu_count() or 1)
+    
+    def _chart_options(self) -> Dict[str, Any]:
+        """Render options for chart jobs (reporting.chart_format and reporting.chart_dpi)"""
+        reporting_config = self.config.get('reporting', {})
+        image_format = reporting_config.get('chart_format', 'png')
+        if image_format not in ('png', 'svg'):
+            raise ValueError(f"Unsupported chart format: {image_format}")
+        
+        # Linked assets are sized for the report's 1200px column; inline keeps print resolution
+        default_dpi = 300 if self.chart_mode == 'inline' else 100
+        return {'format': image_format, 'dpi': int(reporting_config.get('chart_dpi', default_dpi))}
+    
+    def _get_chart_cache(self) -> Optional[ChartCache]:
+        """On-disk chart cache under the output directory, unless disabled in reporting.chart_cache"""
+        cache_config = self.config.get('reporting', {}).get('chart_cache', {})
+        if not cache_config.get('enabled', True):
+            return None
+        
+        if self._chart_cache is None:
+            self._chart_cache = ChartCache(
+                Path(cache_config.get('directory', self.cache_dir / 'charts')),
+                max_bytes=int(cache_config.get('max_size_mb', 256)) * 1024 * 1024,
+                max_age_days=float(cache_config.get('max_age_days', 30))
+            )
+        return self._chart_cache
+    
+    def _trend_chart_jobs(self, days: int = 30,
+                          aggregates: Optional[Dict[AggregateKey, Any]] = None) -> List[ChartJob]:
+        """Build the trend chart jobs from daily aggregates"""
+        jobs = []
+        
+        # Trends cover whole UTC days, starting at midnight `days` days ago
+        if aggregates is None:
+            aggregates = self.read_aggregates(self._report_window(days), [
+                key for chart in ('quality_gates_trend', 'coverage_trend') for key in CHART_READS[chart]
+            ])
         
         # Quality Gates Trend
-        trend_query = """
-        SELECT 
-            DATE(created_at) as date,
-            AVG(score) as avg_score,
-            COUNT(*) as total_runs,
-            AVG(CASE WHEN status = 'PASS' THEN 1 ELSE 0 END) as pass_rate
-        FROM quality_gate_results 
-        WHERE created_at >= date('now', '-{} days')
-        GROUP BY DATE(created_at)
-        ORDER BY date
-        """.format(days)
-        
-        trend_df = self._execute_query(trend_query)
-        
-        if not trend_df.empty:
-            # Quality Gates Score Trend
-            fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10))
-            
-            # Convert date strings to datetime
-            trend_df['date'] = pd.to_datetime(trend_df['date'])
-            
-            # Score trend
-            ax1.plot(trend_df['date'], trend_df['avg_score'], marker='o', linewidth=2)
-            ax1.set_title('Quality Gate Score Trend', fontsize=14, fontweight='bold')
-            ax1.set_ylabel('Average Score')
-            ax1.grid(True, alpha=0.3)
-            ax1.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
-            
-            # Pass rate trend
-            ax2.plot(trend_df['date'], trend_df['pass_rate'] * 100, marker='s', color='green', linewidth=2)
-            ax2.set_title('Quality Gate Pass Rate Trend', fontsize=14, fontweight='bold')
-            ax2.set_ylabel('Pass Rate (%)')
-            ax2.set_xlabel('Date')
-            ax2.grid(True, alpha=0.3)
-            ax2.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
-            
-            plt.tight_layout()
-            
-            # Save to base64
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-            buffer.seek(0)
-            charts['quality_gates_trend'] = base64.b64encode(buffer.getvalue()).decode()
-            plt.close()
+        trend = {'date': [], 'avg_score': [], 'pass_rate': []}
+        for bucket, day in sorted(aggregates.get(('quality_gate_results', 'day'), {}).items()):
+            scores = combine(day, 'score')
+            passes = day.get(('PASS', 'score'), Aggregate())
+            trend['date'].append(utc_from_epoch_ms(bucket))
+            trend['avg_score'].append(_nan_if_missing(scores.mean))
+            trend['pass_rate'].append(passes.row_count / scores.row_count)
+        
+        if trend['date']:
+            jobs.append(ChartJob('quality_gates_trend', 'quality_gates_trend', trend, self._chart_options()))
         
         # Code Coverage Trend
-        coverage_trend_query = """
-        SELECT 
-            DATE(created_at) as date,
-            AVG(line_coverage) as avg_line_coverage,
-            AVG(branch_coverage) as avg_branch_coverage
-        FROM code_coverage_results 
-        WHERE created_at >= date('now', '-{} days')
-        GROUP BY DATE(created_at)
-        ORDER BY date
-        """.format(days)
-        
-        coverage_trend_df = self._execute_query(coverage_trend_query)
-        
-        if not coverage_trend_df.empty:
-            fig, ax = plt.subplots(figsize=(12, 6))
-            
-            coverage_trend_df['date'] = pd.to_datetime(coverage_trend_df['date'])
-            
-            ax.plot(coverage_trend_df['date'], coverage_trend_df['avg_line_coverage'], 
-                   marker='o', label='Line Coverage', linewidth=2)
-            ax.plot(coverage_trend_df['date'], coverage_trend_df['avg_branch_coverage'], 
-                   marker='s', label='Branch Coverage', linewidth=2)
-            
-            ax.set_title('Code Coverage Trend', fontsize=14, fontweight='bold')
-            ax.set_ylabel('Coverage (%)')
-            ax.set_xlabel('Date')
-            ax.legend()
-            ax.grid(True, alpha=0.3)
-            ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
-            
-            plt.tight_layout()
-            
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-            buffer.seek(0)
-            charts['coverage_trend'] = base64.b64encode(buffer.getvalue()).decode()
-            plt.close()
+        coverage_trend = {'date': [], 'avg_line_coverage': [], 'avg_branch_coverage': []}
+        for bucket, day in sorted(aggregates.get(('code_coverage_results', 'day'), {}).items()):
+            coverage_trend['date'].append(utc_from_epoch_ms(bucket))
+            coverage_trend['avg_line_coverage'].append(_nan_if_missing(day[(None, 'line_coverage')].mean))
+            coverage_trend['avg_branch_coverage'].append(_nan_if_missing(day[(None, 'branch_coverage')].mean))
+        
+        if coverage_trend['date']:
+            jobs.append(ChartJob('coverage_trend', 'coverage_trend', coverage_trend, self._chart_options()))
         
-        return charts
+        return jobs
     
-    def generate_summary_charts(self, metrics: Dict[str, Any]) -> Dict[str, str]:
-        """Generate summary charts"""
-        charts = {}
+    def _summary_chart_jobs(self, metrics: Dict[str, Any]) -> List[ChartJob]:
+        """Build the summary chart jobs from collected metrics"""
+        jobs = []
         
         # Quality Gates Status Distribution
         if 'quality_gates' in metrics and 'by_status' in metrics['quality_gates']:
-            fig, ax = plt.subplots(figsize=(8, 6))
-            
-            statuses = [item['status'] for item in metrics['quality_gates']['by_status']]
-            counts = [item['count'] for item in metrics['quality_gates']['by_status']]
-            colors_map = {'PASS': 'green', 'FAIL': 'red', 'WARNING': 'orange'}
-            chart_colors = [colors_map.get(status, 'blue') for status in statuses]
-            
-            wedges, texts, autotexts = ax.pie(counts, labels=statuses, colors=chart_colors, 
-                                            autopct='%1.1f%%', startangle=90)
-            ax.set_title('Quality Gates Status Distribution', fontsize=14, fontweight='bold')
-            
-            plt.tight_layout()
-            
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-            buffer.seek(0)
-            charts['quality_gates_distribution'] = base64.b64encode(buffer.getvalue()).decode()
-            plt.close()
+            by_status = metrics['quality_gates']['by_status']
+            jobs.append(ChartJob('quality_gates_distribution', 'status_distribution', {
+                'status': [item['status'] for item in by_status],
+                'count': [item['count'] for item in by_status]
+            }, self._chart_options()))
         
         # Security Issues by Severity
         if 'security_issues' in metrics and 'by_severity' in metrics['security_issues']:
-            fig, ax = plt.subplots(figsize=(10, 6))
-            
-            severities = [item['severity'] for item in metrics['security_issues']['by_severity']]
-            counts = [item['count'] for item in metrics['security_issues']['by_severity']]
-            
-            bars = ax.bar(severities, counts, color=['red', 'orange', 'yellow', 'blue'])
-            ax.set_title('Security Issues by Severity', fontsize=14, fontweight='bold')
-            ax.set_ylabel('Number of Issues')
-            ax.set_xlabel('Severity')
-            
-            # Add value labels on bars
-            for bar in bars:
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height,
-                       f'{int(height)}', ha='center', va='bottom')
-            
-            plt.tight_layout()
-            
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-            buffer.seek(0)
-            charts['security_issues_by_severity'] = base64.b64encode(buffer.getvalue()).decode()
-            plt.close()
+            by_severity = metrics['security_issues']['by_severity']
+            jobs.append(ChartJob('security_issues_by_severity', 'severity_bars', {
+                'severity': [item['severity'] for item in by_severity],
+                'count': [item['count'] for item in by_severity]
+            }, self._chart_options()))
         
-        return charts
+        return jobs
+    
+    def _render_chart_jobs(self, jobs: List[ChartJob]) -> Dict[str, bytes]:
+        """Render chart jobs through the chart cache and worker pool"""
+        timings: Dict[str, Tuple[float, float]] = {}
+        images = render_charts(jobs, self._chart_workers(), self._get_chart_cache(), timings)
+        for name, (wall_ms, cpu_ms) in timings.items():
+            self.profiler.record(f"chart:{name}", wall_ms, cpu_ms)
+        return images
+    
+    def generate_trend_charts(self, metrics: Dict[str, Any], days: int = 30) -> Dict[str, str]:
+        """Generate trend charts and return base64 encoded images"""
+        images = self._render_chart_jobs(self._trend_chart_jobs(days))
+        return {name: base64.b64encode(image).decode() for name, image in images.items()}
+    
+    def generate_summary_charts(self, metrics: Dict[str, Any]) -> Dict[str, str]:
+        """Generate summary charts"""
+        images = self._render_chart_jobs(self._summary_chart_jobs(metrics))
+        return {name: base64.b64encode(image).decode() for name, image in images.items()}
+    
+    def _write_chart_assets(self, images: Dict[str, bytes], report_dir: Path) -> Dict[str, str]:
+        """Write charts under content-hashed names in the shared assets directory.
+        
+        Returns each chart's URL relative to ``report_dir``; reports with
+        identical charts reference the same file.
+        """
+        image_format = self._chart_options()['format']
+        assets_dir = self.output_dir / 'assets'
+        assets_dir.mkdir(parents=True, exist_ok=True)
+        
+        sources = {}
+        for name, image in images.items():
+            asset_path = assets_dir / f"{hashlib.sha256(image).hexdigest()[:16]}.{image_format}"
+            if not asset_path.exists():
+                fd, tmp_path = tempfile.mkstemp(dir=assets_dir, suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(image)
+                # mkstemp creates 0600 files; assets must be readable wherever reports are served
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, asset_path)
+            sources[name] = Path(os.path.relpath(asset_path, report_dir)).as_posix()
+        
+        return sources
+    
+    def chart_sources(self, images: Dict[str, bytes], report_path: Path) -> Dict[str, str]:
+        """Image ``src`` values for rendered charts, per the configured chart mode"""
+        if self.chart_mode == 'inline':
+            image_format = self._chart_options()['format']
+            return {name: data_uri(image, image_format) for name, image in images.items()}
+        if self.chart_mode == 'assets':
+            return self._write_chart_assets(images, report_path.parent)
+        raise ValueError(f"Unsupported chart mode: {self.chart_mode}")
+    
+    def _get_template_environment(self) -> 'jinja2.Environment':
+        """Jinja environment over the templates directory, with compiled templates cached on disk"""
+        if self._template_env is None:
+            import jinja2
+            
+            bytecode_dir = self.cache_dir / 'templates'
+            bytecode_dir.mkdir(parents=True, exist_ok=True)
+            self._template_env = jinja2.Environment(
+                loader=jinja2.FileSystemLoader(str(self.template_dir)),
+                bytecode_cache=jinja2.FileSystemBytecodeCache(str(bytecode_dir)),
+                autoescape=jinja2.select_autoescape(['html'])
+            )
+        return self._template_env
+    
+    def _html_context(self, metrics: Dict[str, Any], charts: Dict[str, str],
+                      report_type: str) -> Dict[str, Any]:
+        """Template variables for the HTML report"""
+        return {
+            'metrics': metrics,
+            'charts': charts,
+            'report_type': report_type,
+            'generation_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
     
     def generate_html_report(self, metrics: Dict[str, Any], charts: Dict[str, str], 
                            report_type: str = 'comprehensive') -> str:
-        """Generate HTML report"""
-        
-        # Create template
-        html_template = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>QMS {{ report_type.title() }} Report</title>
-    <style>
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            margin: 0;
-            padding: 20px;
-            background-color: #f5f5f5;
-            color: #333;
-        }
-        .container {
-            max-width: 1200px;
-            margin: 0 auto;
-            background: white;
-            padding: 30px;
-            border-radius: 10px;
-            box-shadow: 0 0 20px rgba(0,0,0,0.1);
-        }
-        .header {
-            text-align: center;
-            border-bottom: 3px solid #007bff;
-            padding-bottom: 20px;
-            margin-bottom: 30px;
-        }
-        .header h1 {
-            color: #007bff;
-            margin: 0;
-            font-size: 2.5em;
-        }
-        .header p {
-            color: #666;
-            margin: 10px 0 0 0;
-            font-size: 1.1em;
-        }
-        .metrics-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-            gap: 20px;
-            margin-bottom: 30px;
-        }
-        .metric-card {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 20px;
-            border-radius: 10px;
-            text-align: center;
-        }
-        .metric-card h3 {
-            margin: 0 0 10px 0;
-            font-size: 1.2em;
-        }
-        .metric-card .value {
-            font-size: 2.5em;
-            font-weight: bold;
-            margin: 10px 0;
-        }
-        .metric-card .unit {
-            font-size: 0.9em;
-            opacity: 0.8;
-        }
-        .section {
-            margin-bottom: 40px;
-        }
-        .section h2 {
-            color: #007bff;
-            border-bottom: 2px solid #007bff;
-            padding-bottom: 10px;
-            margin-bottom: 20px;
-        }
-        .chart-container {
-            text-align: center;
-            margin: 20px 0;
-            background: #f9f9f9;
-            padding: 20px;
-            border-radius: 10px;
-        }
-        .chart-container img {
-            max-width: 100%;
-            height: auto;
-            border-radius: 5px;
-        }
-        .table {
-            width: 100%;
-            border-collapse: collapse;
-            margin: 20px 0;
-        }
-        .table th, .table td {
-            border: 1px solid #ddd;
-            padding: 12px;
-            text-align: left;
-        }
-        .table th {
-            background-color: #007bff;
-            color: white;
-        }
-        .table tr:nth-child(even) {
-            background-color: #f2f2f2;
-        }
-        .status-pass { color: #28a745; font-weight: bold; }
-        .status-fail { color: #dc3545; font-weight: bold; }
-        .status-warning { color: #ffc107; font-weight: bold; }
-        .footer {
-            text-align: center;
-            margin-top: 40px;
-            padding-top: 20px;
-            border-top: 1px solid #ddd;
-            color: #666;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>QMS {{ report_type.title() }} Report</h1>
-            <p>Generated on {{ generation_time }}</p>
-            <p>Period: {{ metrics.period.start_date[:10] }} to {{ metrics.period.end_date[:10] }} ({{ metrics.period.days }} days)</p>
-        </div>
-
-        <!-- Key Metrics -->
-        <div class="section">
-            <h2>📊 Key Metrics</h2>
-            <div class="metrics-grid">
-                {% if metrics.quality_gates %}
-                <div class="metric-card">
-                    <h3>Quality Gate Pass Rate</h3>
-                    <div class="value">{{ "%.1f"|format(metrics.quality_gates.pass_rate) }}</div>
-                    <div class="unit">%</div>
-                </div>
-                <div class="metric-card">
-                    <h3>Total QG Runs</h3>
-                    <div class="value">{{ metrics.quality_gates.total_runs }}</div>
-                    <div class="unit">runs</div>
-                </div>
-                {% endif %}
-                
-                {% if metrics.code_coverage %}
-                <div class="metric-card">
-                    <h3>Avg Line Coverage</h3>
-                    <div class="value">{{ metrics.code_coverage.avg_line_coverage }}</div>
-                    <div class="unit">%</div>
-                </div>
-                {% endif %}
-                
-                {% if metrics.security_issues %}
-                <div class="metric-card">
-                    <h3>Security Issues</h3>
-                    <div class="value">{{ metrics.security_issues.total_issues }}</div>
-                    <div class="unit">issues</div>
-                </div>
-                {% endif %}
-            </div>
-        </div>
-
-        <!-- Charts Section -->
-        {% if charts %}
-        <div class="section">
-            <h2>📈 Trends & Analysis</h2>
-            
-            {% if charts.quality_gates_trend %}
-            <div class="chart-container">
-                <h3>Quality Gates Trend</h3>
-                <img src="data:image/png;base64,{{ charts.quality_gates_trend }}" alt="Quality Gates Trend">
-            </div>
-            {% endif %}
-            
-            {% if charts.coverage_trend %}
-            <div class="chart-container">
-                <h3>Code Coverage Trend</h3>
-                <img src="data:image/png;base64,{{ charts.coverage_trend }}" alt="Coverage Trend">
-            </div>
-            {% endif %}
-            
-            {% if charts.quality_gates_distribution %}
-            <div class="chart-container">
-                <h3>Quality Gates Status Distribution</h3>
-                <img src="data:image/png;base64,{{ charts.quality_gates_distribution }}" alt="QG Distribution">
-            </div>
-            {% endif %}
-            
-            {% if charts.security_issues_by_severity %}
-            <div class="chart-container">
-                <h3>Security Issues by Severity</h3>
-                <img src="data:image/png;base64,{{ charts.security_issues_by_severity }}" alt="Security Issues">
-            </div>
-            {% endif %}
-        </div>
-        {% endif %}
-
-        <!-- Detailed Metrics -->
-        <div class="section">
-            <h2>📋 Detailed Metrics</h2>
-            
-            {% if metrics.quality_gates and metrics.quality_gates.by_status %}
-            <h3>Quality Gates by Status</h3>
-            <table class="table">
-                <thead>
-                    <tr>
-                        <th>Status</th>
-                        <th>Count</th>
-                        <th>Percentage</th>
-                        <th>Avg Score</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {% for item in metrics.quality_gates.by_status %}
-                    <tr>
-                        <td class="status-{{ item.status.lower() }}">{{ item.status }}</td>
-                        <td>{{ item.count }}</td>
-                        <td>{{ "%.1f"|format((item.count / metrics.quality_gates.total_runs) * 100) }}%</td>
-                        <td>{{ "%.2f"|format(item.avg_score) }}</td>
-                    </tr>
-                    {% endfor %}
-                </tbody>
-            </table>
-            {% endif %}
-
-            {% if metrics.security_issues and metrics.security_issues.by_severity %}
-            <h3>Security Issues by Severity</h3>
-            <table class="table">
-                <thead>
-                    <tr>
-                        <th>Severity</th>
-                        <th>Count</th>
-                        <th>Resolution Rate</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {% for item in metrics.security_issues.by_severity %}
-                    <tr>
-                        <td>{{ item.severity }}</td>
-                        <td>{{ item.count }}</td>
-                        <td>{{ "%.1f"|format(item.resolution_rate * 100) }}%</td>
-                    </tr>
-                    {% endfor %}
-                </tbody>
-            </table>
-            {% endif %}
-        </div>
-
-        <div class="footer">
-            <p>Generated by QMS Reporter v1.0</p>
-        </div>
-    </div>
-</body>
-</html>
-        """
-        
-        # Render template
-        template = jinja2.Template(html_template)
-        html_content = template.render(
-            metrics=metrics,
-            charts=charts,
-            report_type=report_type,
-            generation_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        )
-        
-        return html_content
+        """Generate HTML report; ``charts`` maps chart names to image ``src`` values"""
+        template = self._get_template_environment().get_template('report.html')
+        return template.render(self._html_context(metrics, charts, report_type))
+    
+    def write_html_report(self, metrics: Dict[str, Any], charts: Dict[str, str], filename: str,
+                          report_type: str = 'comprehensive') -> str:
+        """Stream the HTML report into the output directory chunk by chunk"""
+        template = self._get_template_environment().get_template('report.html')
+        chunks = template.generate(self._html_context(metrics, charts, report_type))
+        return self._write_report_stream(chunks, filename)
     
     def generate_json_report(self, metrics: Dict[str, Any]) -> str:
         """Generate JSON report"""
@@ -667,56 +647,208 @@ class QMSReporter:
         
         return str(file_path)
     
+    def _write_report_stream(self, chunks: Iterable[str], filename: str) -> str:
+        """Write a report from an iterable of text chunks without holding it in memory.
+        
+        Rendering and writing interleave, so the time spent producing chunks
+        and writing them is accumulated and profiled as 'render' and 'save'.
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        
+        file_path = self.output_dir / filename
+        spent = {'render': [0.0, 0.0], 'save': [0.0, 0.0]}
+        chunks = iter(chunks)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            while True:
+                start, cpu_start = time.perf_counter(), time.thread_time()
+                chunk = next(chunks, None)
+                rendered, cpu_rendered = time.perf_counter(), time.thread_time()
+                spent['render'][0] += rendered - start
+                spent['render'][1] += cpu_rendered - cpu_start
+                if chunk is None:
+                    break
+                f.write(chunk)
+                spent['save'][0] += time.perf_counter() - rendered
+                spent['save'][1] += time.thread_time() - cpu_rendered
+        
+        for stage, (wall, cpu) in spent.items():
+            self.profiler.record(stage, wall * 1000, cpu * 1000)
+        return str(file_path)
+    
+    @staticmethod
+    def _plan_metrics(metrics: Dict[str, Any], plan: ReportPlan) -> Dict[str, Any]:
+        """The collected metrics with sections outside the report's plan removed"""
+        return {
+            key: value for key, value in metrics.items() if key not in SECTION_READS or key in plan.sections
+        }
+    
     def generate_report(self, report_type: str = 'comprehensive', 
                        output_format: str = 'html', 
                        days: int = 30,
                        output_file: Optional[str] = None) -> str:
         """Generate complete QMS report"""
+        target = (report_type, output_format)
+        reports = self.generate_reports([target], days, {target: output_file} if output_file else None)
+        return reports[target]
+    
+    def generate_reports(self, targets: Sequence[Tuple[str, str]], days: int = 30,
+                         output_files: Optional[Dict[Tuple[str, str], str]] = None) -> Dict[Tuple[str, str], str]:
+        """Generate several (report type, format) reports from one metrics and chart pass.
         
-        logger.info(f"Generating {report_type} report in {output_format} format...")
+        Every stage is recorded by ``self.profiler``; the top-level wall times
+        are logged and kept in ``self.stage_timings``.
+        """
+        output_files = output_files or {}
+        for report_type, output_format in targets:
+            if report_type not in REPORT_PLANS:
+                raise ValueError(f"Unsupported report type: {report_type}")
+            if output_format not in ('html', 'json'):
+                raise ValueError(f"Unsupported output format: {output_format}")
+        
+        first_record = len(self.profiler.records)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        
+        # Plan the union of what the requested reports show; charts only appear in HTML
+        reads: List[AggregateKey] = []
+        charts: List[str] = []
+        for report_type, output_format in targets:
+            plan = REPORT_PLANS[report_type]
+            reads += plan.reads(with_charts=output_format == 'html')
+            if output_format == 'html':
+                charts += plan.charts
+        charts = list(dict.fromkeys(charts))
         
-        # Collect metrics
         logger.info("Collecting quality metrics...")
-        metrics = self.collect_quality_metrics(days)
-        
-        # Generate charts
-        logger.info("Generating charts...")
-        trend_charts = self.generate_trend_charts(metrics, days)
-        summary_charts = self.generate_summary_charts(metrics)
-        charts = {**trend_charts, **summary_charts}
-        
-        # Generate report content
-        if output_format == 'html':
-            content = self.generate_html_report(metrics, charts, report_type)
-            if not output_file:
-                output_file = f"qms_report_{report_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
-        
-        elif output_format == 'json':
-            content = self.generate_json_report(metrics)
-            if not output_file:
-                output_file = f"qms_report_{report_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        
-        else:
-            raise ValueError(f"Unsupported output format: {output_format}")
-        
-        # Save report
-        report_path = self.save_report(content, output_file, output_format)
-        logger.info(f"Report saved to: {report_path}")
-        
-        return report_path
+        with self.profiler.stage('metrics'):
+            window = self._report_window(days)
+            aggregates = self.read_aggregates(window, list(dict.fromkeys(reads)))
+            metrics = self.collect_quality_metrics(days, window, aggregates)
+        
+        # Charts are rendered once, together in one pool
+        images: Dict[str, bytes] = {}
+        if charts:
+            logger.info("Generating charts...")
+            with self.profiler.stage('charts'):
+                jobs = self._trend_chart_jobs(days, aggregates) + self._summary_chart_jobs(metrics)
+                images = self._render_chart_jobs([job for job in jobs if job.name in charts])
+        
+        reports = {}
+        chart_sources: Dict[Path, Dict[str, str]] = {}
+        for report_type, output_format in targets:
+            logger.info(f"Generating {report_type} report in {output_format} format...")
+            output_file = output_files.get((report_type, output_format)) or \
+                f"qms_report_{report_type}_{timestamp}.{output_format}"
+            
+            # Generate report content
+            plan = REPORT_PLANS[report_type]
+            with self.profiler.stage(f"{report_type}.{output_format}"):
+                report_metrics = self._plan_metrics(metrics, plan)
+                if output_format == 'html':
+                    report_dir = (self.output_dir / output_file).parent
+                    if report_dir not in chart_sources:
+                        with self.profiler.stage('assets'):
+                            chart_sources[report_dir] = self.chart_sources(images, self.output_dir / output_file)
+                    report_charts = {
+                        name: source for name, source in chart_sources[report_dir].items() if name in plan.charts
+                    }
+                    report_path = self.write_html_report(report_metrics, report_charts, output_file, report_type)
+                
+                else:
+                    with self.profiler.stage('render'):
+                        content = self.generate_json_report(report_metrics)
+                    with self.profiler.stage('save'):
+                        report_path = self.save_report(content, output_file, output_format)
+            
+            logger.info(f"Report saved to: {report_path}")
+            reports[(report_type, output_format)] = report_path
+        
+        records = self.profiler.records[first_record:]
+        self.stage_timings = {record.name: record.wall_ms / 1000 for record in records if '/' not in record.name}
+        logger.info("Stage timings: " + self.profiler.log_line(records))
+        if self._query_cache is not None:
+            cache = self._query_cache
+            logger.info(f"Query cache: {cache.hits} hits, {cache.misses} misses "
+                        f"({cache.hit_rate * 100:.0f}% hit rate)")
+        return reports
+    
+    def export_results(self, table: str, export_format: str = 'csv', window: Optional[TimeWindow] = None,
+                       compression: Optional[str] = None, output_file: Optional[str] = None,
+                       chunk_rows: Optional[int] = None) -> Tuple[str, int]:
+        """Stream a result table's raw rows to CSV, NDJSON or Parquet; returns (path, row count).
+        
+        Rows are read from the data source and written reporting.export.chunk_rows
+        at a time, bypassing the query cache, so memory use does not grow with
+        the size of the export.
+        """
+        if table not in ROLLUP_SOURCES:
+            raise ValueError(f"Unknown result table: {table}")
+        if not self.backend.exists():
+            raise FileNotFoundError(f"Database not found at {self.data_source}")
+        
+        export_config = self.config.get('reporting', {}).get('export', {})
+        chunk_rows = chunk_rows or int(export_config.get('chunk_rows', 50000))
+        if compression is None and export_format == 'parquet':
+            compression = export_config.get('parquet_compression', 'zstd')
+        
+        _, table_info = self.backend.execute(f"PRAGMA table_info({table})")
+        columns = [info[1] for info in table_info]
+        schema = table_info_schema(table_info) if export_format == 'parquet' else None
+        
+        query = f"SELECT {', '.join(columns)} FROM {table}"
+        params: Tuple = ()
+        if window is not None:
+            where, params = window.sql()
+            query += f" WHERE {where}"
+        query += f" ORDER BY {TIME_COLUMN}"
+        
+        file_path = self.output_dir / (output_file or export_filename(
+            table, export_format, compression, datetime.now().strftime('%Y%m%d_%H%M%S')
+        ))
+        stage_start = time.perf_counter()
+        with self.profiler.stage(f"export:{table}"):
+            count = write_export(self.backend.iter_chunks(query, params, chunk_rows), file_path,
+                                 export_format, columns, compression, schema)
+        logger.info(f"Exported {count} rows from {table} to {file_path} "
+                    f"in {time.perf_counter() - stage_start:.1f} s")
+        return str(file_path), count
 
 def main():
     """Main function"""
     parser = argparse.ArgumentParser(description='QMS Report Generator')
     parser.add_argument('--config', '-c', help='Path to QMS configuration file')
-    parser.add_argument('--type', choices=['comprehensive', 'summary', 'executive'], 
+    parser.add_argument('--type', choices=REPORT_TYPES, 
                        default='comprehensive', help='Report type')
-    parser.add_argument('--format', choices=['html', 'json'], 
+    parser.add_argument('--format', choices=REPORT_FORMATS, 
                        default='html', help='Output format')
     parser.add_argument('--days', type=int, default=30, 
                        help='Number of days to include in the report')
     parser.add_argument('--output', '-o', help='Output filename')
-    parser.add_argument('--data-source', help='Path to QMS database file')
+    parser.add_argument('--target', action='append', metavar='TYPE:FORMAT',
+                       help='Report to generate in one batch, e.g. summary:json (repeatable; '
+                            'overrides --type and --format)')
+    parser.add_argument('--chart-mode', choices=['assets', 'inline'],
+                       help='Write charts as shared asset files or embed them in the HTML')
+    parser.add_argument('--data-source', help='Path to QMS database file (or Parquet directory)')
+    parser.add_argument('--export', choices=list(ROLLUP_SOURCES), metavar='TABLE',
+                       help='Export raw rows of a result table instead of generating a report '
+                            f"({', '.join(ROLLUP_SOURCES)})")
+    parser.add_argument('--export-format', choices=EXPORT_FORMATS, default='csv',
+                       help='File format for --export')
+    parser.add_argument('--compression', choices=sorted({codec for codecs in EXPORT_COMPRESSIONS.values()
+                                                         for codec in codecs if codec}),
+                       help='Compress the export (gzip/bz2/xz for CSV and NDJSON; '
+                            'snappy/gzip/zstd for Parquet, default zstd)')
+    parser.add_argument('--since', type=datetime.fromisoformat,
+                       help='Export rows created at or after this ISO date/time (overrides --days)')
+    parser.add_argument('--until', type=datetime.fromisoformat,
+                       help='Export rows created before this ISO date/time (default: now)')
+    parser.add_argument('--chunk-rows', type=int, help='Rows read and written per chunk during --export')
+    parser.add_argument('--profile', metavar='FILE',
+                       help='Write per-stage wall time, CPU time and peak memory to FILE as JSON')
+    parser.add_argument('--profile-speedscope', metavar='FILE',
+                       help='Write the stage timeline as a speedscope profile (https://www.speedscope.app)')
+    parser.add_argument('--profile-cprofile', metavar='FILE',
+                       help='Write cProfile stats of the main thread to FILE (view with pstats or snakeviz)')
     parser.add_argument('--verbose', '-v', action='store_true', help='Verbose output')
     
     args = parser.parse_args()
@@ -724,24 +856,64 @@ def main():
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
     
+    # Memory tracing slows allocation-heavy stages, so it is only on when the JSON profile asks for it
+    profiler = StageProfiler(trace_memory=bool(args.profile), cprofile=bool(args.profile_cprofile))
     try:
-        reporter = QMSReporter(args.config, args.data_source)
-        report_path = reporter.generate_report(
-            report_type=args.type,
-            output_format=args.format,
-            days=args.days,
-            output_file=args.output
-        )
-        
-        print(f"{Colors.GREEN}✓ Report generated successfully!{Colors.ENDC}")
-        print(f"Location: {report_path}")
-        
-        if args.format == 'html':
+        reporter = QMSReporter(args.config, args.data_source, profiler)
+        if args.chart_mode:
+            reporter.chart_mode = args.chart_mode
+        
+        if args.export:
+            if args.compression not in EXPORT_COMPRESSIONS[args.export_format]:
+                parser.error(f"--compression {args.compression} is not supported for {args.export_format}")
+            until_ms = to_epoch_ms(args.until or datetime.now())
+            since_ms = to_epoch_ms(args.since) if args.since else until_ms - args.days * 86400 * 1000
+            export_path, count = reporter.export_results(
+                args.export, args.export_format, TimeWindow(since_ms, until_ms),
+                args.compression, args.output, args.chunk_rows
+            )
+            print(f"{Colors.GREEN}✓ Exported {count} rows{Colors.ENDC}")
+            print(f"Location: {export_path}")
+            return
+        
+        if args.target:
+            targets = []
+            for target in args.target:
+                report_type, _, output_format = target.partition(':')
+                if report_type not in REPORT_TYPES or output_format not in REPORT_FORMATS:
+                    parser.error(f"invalid --target {target!r}: expected TYPE:FORMAT with TYPE in "
+                                 f"{', '.join(REPORT_TYPES)} and FORMAT in {', '.join(REPORT_FORMATS)}")
+                targets.append((report_type, output_format))
+            if args.output and len(targets) > 1:
+                parser.error("--output can only be used with a single report")
+        else:
+            targets = [(args.type, args.format)]
+        
+        output_files = {targets[0]: args.output} if args.output else None
+        reports = reporter.generate_reports(targets, args.days, output_files)
+        
+        print(f"{Colors.GREEN}✓ {'Report' if len(reports) == 1 else f'{len(reports)} reports'} "
+              f"generated successfully!{Colors.ENDC}")
+        for report_path in reports.values():
+            print(f"Location: {report_path}")
+        
+        if any(output_format == 'html' for _, output_format in reports):
             print(f"{Colors.BLUE}💡 Open the HTML file in your browser to view the report{Colors.ENDC}")
         
     except Exception as e:
         logger.error(f"Report generation failed: {e}")
         sys.exit(1)
+    finally:
+        _write_profiles(profiler, args)
+
+def _write_profiles(profiler: StageProfiler, args: argparse.Namespace) -> None:
+    """Write the profiles requested on the command line"""
+    for path, write in ((args.profile, profiler.write_json),
+                        (args.profile_speedscope, profiler.write_speedscope),
+                        (args.profile_cprofile, profiler.write_cprofile)):
+        if path:
+            write(Path(path))
+            logger.info(f"Profile written to: {path}")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
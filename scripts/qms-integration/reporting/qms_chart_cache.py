@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+QMS Chart Cache
+Content-addressed on-disk cache for rendered report charts.
+
+A chart's key is a hash of everything that determines its pixels: the
+renderer kind, the plotted series, the render options and the renderer and
+Matplotlib versions. Unchanged charts then cost a hash plus a file read
+instead of a Matplotlib render.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import time
+from importlib import metadata
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump when a renderer's drawing code changes so stale images are not reused
+RENDERER_VERSION = 1
+
+
+def _matplotlib_version() -> str:
+    try:
+        return metadata.version('matplotlib')
+    except metadata.PackageNotFoundError:
+        return 'unknown'
+
+
+class ChartCache:
+    """Chart images stored as <sha256>.<ext> files, evicted by age and total size"""
+
+    def __init__(self, directory: Path, max_bytes: int = 256 * 1024 * 1024, max_age_days: float = 30):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._versions = {'renderer': RENDERER_VERSION, 'matplotlib': _matplotlib_version()}
+
+    def key(self, job) -> str:
+        """Hash of the chart spec and the data it plots"""
+        payload = json.dumps({
+            'kind': job.kind,
+            'data': job.data,
+            'options': job.options,
+            'versions': self._versions
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str, extension: str) -> Path:
+        return self.directory / f"{key}.{extension}"
+
+    def get(self, key: str, extension: str = 'png') -> Optional[bytes]:
+        """Cached image bytes, or None on a miss"""
+        path = self._path(key, extension)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            self.misses += 1
+            return None
+
+        # Refresh the access time used for size-based eviction
+        os.utime(path)
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes, extension: str = 'png') -> None:
+        """Store image bytes atomically"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key, extension))
+        except OSError as e:
+            logger.warning(f"Failed to write chart cache entry: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def evict(self) -> int:
+        """Drop expired entries, then least recently used ones above the size cap"""
+        if not self.directory.exists():
+            return 0
+
+        now = time.time()
+        entries = []
+        removed = 0
+        for path in self.directory.iterdir():
+            if not path.is_file():
+                continue
+            try:
+                stat = path.stat()
+                if now - stat.st_mtime > self.max_age_seconds:
+                    path.unlink()
+                    removed += 1
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+            except OSError:
+                continue
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                removed += 1
+                total -= size
+            except OSError:
+                continue
+
+        if removed:
+            logger.debug(f"Evicted {removed} chart cache entries")
+        return removed
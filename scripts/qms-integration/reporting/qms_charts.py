@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+QMS Charts
+Self-contained chart jobs for the QMS reporter.
+
+Each ``ChartJob`` carries only plain, picklable data and is rendered onto its
+own ``matplotlib.figure.Figure`` without touching pyplot's global state, so
+jobs can be rendered in worker processes and still produce exactly the same
+bytes as a serial run.
+"""
+
+import io
+import os
+import base64
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from qms_chart_cache import ChartCache
+
+logger = logging.getLogger(__name__)
+
+STYLE = 'seaborn-v0_8'
+PALETTE = 'husl'
+
+RC_PARAMS = {
+    'figure.figsize': (12, 8),
+    'font.size': 10,
+    'axes.titlesize': 14,
+    'axes.labelsize': 12,
+    'xtick.labelsize': 10,
+    'ytick.labelsize': 10,
+    'legend.fontsize': 10,
+    'figure.titlesize': 16,
+    # Fixed SVG element ids so identical charts produce identical files
+    'svg.hashsalt': 'qms'
+}
+
+# Per-format savefig metadata with the version/date stamps removed, for reproducible bytes
+SAVE_METADATA = {
+    'png': {'Software': None},
+    'svg': {'Creator': None, 'Date': None}
+}
+
+MIME_TYPES = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+
+@dataclass(frozen=True)
+class ChartJob:
+    """One chart to render: a renderer kind plus the series it plots"""
+    name: str
+    kind: str
+    data: Dict[str, Sequence[Any]]
+    options: Dict[str, Any] = field(default_factory=dict)
+
+
+def _style_rc() -> Dict[str, Any]:
+    """Report rcParams, including the seaborn palette as a colour cycle"""
+    import seaborn as sns
+    from cycler import cycler
+
+    return {**RC_PARAMS, 'axes.prop_cycle': cycler(color=sns.color_palette(PALETTE))}
+
+
+def _draw_quality_gates_trend(fig, data: Dict[str, Sequence[Any]]) -> None:
+    import matplotlib.dates as mdates
+
+    ax1, ax2 = fig.subplots(2, 1)
+
+    # Score trend
+    ax1.plot(data['date'], data['avg_score'], marker='o', linewidth=2)
+    ax1.set_title('Quality Gate Score Trend', fontsize=14, fontweight='bold')
+    ax1.set_ylabel('Average Score')
+    ax1.grid(True, alpha=0.3)
+    ax1.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
+
+    # Pass rate trend
+    ax2.plot(data['date'], [rate * 100 for rate in data['pass_rate']], marker='s', color='green', linewidth=2)
+    ax2.set_title('Quality Gate Pass Rate Trend', fontsize=14, fontweight='bold')
+    ax2.set_ylabel('Pass Rate (%)')
+    ax2.set_xlabel('Date')
+    ax2.grid(True, alpha=0.3)
+    ax2.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
+
+
+def _draw_coverage_trend(fig, data: Dict[str, Sequence[Any]]) -> None:
+    import matplotlib.dates as mdates
+
+    ax = fig.subplots()
+    ax.plot(data['date'], data['avg_line_coverage'], marker='o', label='Line Coverage', linewidth=2)
+    ax.plot(data['date'], data['avg_branch_coverage'], marker='s', label='Branch Coverage', linewidth=2)
+
+    ax.set_title('Code Coverage Trend', fontsize=14, fontweight='bold')
+    ax.set_ylabel('Coverage (%)')
+    ax.set_xlabel('Date')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
+
+
+def _draw_status_distribution(fig, data: Dict[str, Sequence[Any]]) -> None:
+    ax = fig.subplots()
+    colors_map = {'PASS': 'green', 'FAIL': 'red', 'WARNING': 'orange'}
+    chart_colors = [colors_map.get(status, 'blue') for status in data['status']]
+
+    ax.pie(data['count'], labels=data['status'], colors=chart_colors, autopct='%1.1f%%', startangle=90)
+    ax.set_title('Quality Gates Status Distribution', fontsize=14, fontweight='bold')
+
+
+def _draw_severity_bars(fig, data: Dict[str, Sequence[Any]]) -> None:
+    ax = fig.subplots()
+    bars = ax.bar(data['severity'], data['count'], color=['red', 'orange', 'yellow', 'blue'])
+    ax.set_title('Security Issues by Severity', fontsize=14, fontweight='bold')
+    ax.set_ylabel('Number of Issues')
+    ax.set_xlabel('Severity')
+
+    # Add value labels on bars
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width() / 2., height, f'{int(height)}', ha='center', va='bottom')
+
+
+# kind -> (figure size, draw function)
+RENDERERS: Dict[str, Tuple[Tuple[float, float], Callable]] = {
+    'quality_gates_trend': ((12, 10), _draw_quality_gates_trend),
+    'coverage_trend': ((12, 6), _draw_coverage_trend),
+    'status_distribution': ((8, 6), _draw_status_distribution),
+    'severity_bars': ((10, 6), _draw_severity_bars)
+}
+
+
+def render_chart(job: ChartJob) -> bytes:
+    """Render a chart job to PNG or SVG bytes using only object-oriented Matplotlib"""
+    import matplotlib.style
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    figsize, draw = RENDERERS[job.kind]
+    with matplotlib.style.context([STYLE, _style_rc()]):
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        draw(fig, job.data)
+        fig.tight_layout()
+
+        image_format = job.options.get('format', 'png')
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=image_format, dpi=job.options.get('dpi', 300), bbox_inches='tight',
+                    metadata=SAVE_METADATA[image_format])
+    return buffer.getvalue()
+
+
+def _render_chart_timed(job: ChartJob) -> Tuple[bytes, float, float]:
+    """``render_chart`` plus its wall and CPU time in milliseconds, measured where it runs"""
+    start, cpu_start = time.perf_counter(), time.process_time()
+    image = render_chart(job)
+    return image, (time.perf_counter() - start) * 1000, (time.process_time() - cpu_start) * 1000
+
+
+def render_charts(jobs: Sequence[ChartJob], max_workers: Optional[int] = None,
+                  cache: Optional[ChartCache] = None,
+                  timings: Optional[Dict[str, Tuple[float, float]]] = None) -> Dict[str, bytes]:
+    """Render jobs, in parallel when worthwhile, returning image bytes in job order.
+
+    With a ``cache``, jobs whose spec and data were rendered before are read
+    back from disk and only the misses are rendered. ``timings``, if given,
+    receives the (wall ms, CPU ms) each rendered chart took in its worker.
+    """
+    if not jobs:
+        return {}
+
+    images: Dict[str, bytes] = {}
+    keys: Dict[str, str] = {}
+    pending: List[ChartJob] = []
+    for job in jobs:
+        if cache is not None:
+            keys[job.name] = cache.key(job)
+            cached = cache.get(keys[job.name], job.options.get('format', 'png'))
+            if cached is not None:
+                images[job.name] = cached
+                continue
+        pending.append(job)
+
+    workers = min(max_workers or os.cpu_count() or 1, len(pending))
+    if workers <= 1:
+        rendered = [_render_chart_timed(job) for job in pending]
+    else:
+        logger.debug(f"Rendering {len(pending)} charts on {workers} worker processes")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rendered = list(executor.map(_render_chart_timed, pending))
+
+    for job, (image, wall_ms, cpu_ms) in zip(pending, rendered):
+        images[job.name] = image
+        if timings is not None:
+            timings[job.name] = (wall_ms, cpu_ms)
+        if cache is not None:
+            cache.put(keys[job.name], image, job.options.get('format', 'png'))
+
+    if cache is not None:
+        logger.debug(f"Chart cache: {len(jobs) - len(pending)} hits, {len(pending)} rendered")
+        cache.evict()
+
+    return {job.name: images[job.name] for job in jobs}
+
+
+def data_uri(image: bytes, image_format: str = 'png') -> str:
+    """Inline ``data:`` URI for a rendered chart"""
+    return f"data:{MIME_TYPES[image_format]};base64,{base64.b64encode(image).decode()}"
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+QMS Stage Profiler
+Wall time, CPU time and peak memory per named stage of a report run.
+
+Stages are context managers and nest: a stage opened inside another is
+recorded as ``parent/child``. Worker threads pass the parent path explicitly
+(see ``current_path``). CPU time on the main thread is the process's,
+including reaped child processes such as the chart pool, so it covers work a
+stage hands to its pools. On other threads it is the thread's own. Peak
+memory comes from ``tracemalloc`` and is only measured with
+``trace_memory=True``, for main-thread stages.
+
+Where the ``resource`` module is unavailable (Windows), main-thread CPU time
+excludes child processes and the run's max RSS is left out.
+
+The records can be written as JSON, as a speedscope timeline
+(https://www.speedscope.app) or, with ``cprofile=True``, as a cProfile dump
+of the main thread.
+"""
+
+import sys
+import json
+import time
+import statistics
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+@dataclass
+class StageRecord:
+    """One completed stage"""
+    name: str
+    wall_ms: float
+    cpu_ms: float
+    thread: str
+    # Offset from the profiler's start; None for stages measured elsewhere (see ``record``)
+    start_ms: Optional[float] = None
+    peak_memory_bytes: Optional[int] = None
+
+
+@dataclass
+class _OpenStage:
+    path: str
+    start: float
+    cpu_start: float
+    memory_start: int = 0
+    memory_peak: int = 0
+
+
+def _process_cpu() -> float:
+    """CPU seconds of this process and its reaped children"""
+    if resource is None:
+        return time.process_time()
+    cpu = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        cpu += usage.ru_utime + usage.ru_stime
+    return cpu
+
+
+def _max_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+class StageProfiler:
+    """Collects ``StageRecord``s from ``stage`` blocks on any thread"""
+
+    def __init__(self, trace_memory: bool = False, cprofile: bool = False):
+        self.trace_memory = trace_memory
+        self.records: List[StageRecord] = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._main_thread = threading.main_thread()
+        self._cprofile = None
+
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if cprofile:
+            import cProfile
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def _stack(self) -> List[_OpenStage]:
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def current_path(self) -> Optional[str]:
+        """Path of the innermost open stage on this thread, for stages opened on worker threads"""
+        stack = self._stack()
+        return stack[-1].path if stack else None
+
+    @contextmanager
+    def stage(self, name: str, parent: Optional[str] = None) -> Iterator[None]:
+        """Measure the enclosed block as stage ``name`` (under ``parent`` or the enclosing stage)"""
+        stack = self._stack()
+        parent = parent or (stack[-1].path if stack else None)
+        on_main = threading.current_thread() is self._main_thread
+        measure_memory = self.trace_memory and on_main and tracemalloc.is_tracing()
+
+        if measure_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].memory_peak = max(stack[-1].memory_peak, peak)
+            tracemalloc.reset_peak()
+        else:
+            current = 0
+
+        opened = _OpenStage(
+            path=f"{parent}/{name}" if parent else name,
+            start=time.perf_counter(),
+            cpu_start=_process_cpu() if on_main else time.thread_time(),
+            memory_start=current,
+            memory_peak=current
+        )
+        stack.append(opened)
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            cpu = (_process_cpu() if on_main else time.thread_time()) - opened.cpu_start
+            stack.pop()
+
+            peak_bytes = None
+            if measure_memory:
+                peak = max(opened.memory_peak, tracemalloc.get_traced_memory()[1])
+                peak_bytes = peak - opened.memory_start
+                # Keep the enclosing stage's peak intact across this stage's reset
+                if stack:
+                    stack[-1].memory_peak = max(stack[-1].memory_peak, peak)
+                tracemalloc.reset_peak()
+
+            with self._lock:
+                self.records.append(StageRecord(
+                    name=opened.path,
+                    wall_ms=(end - opened.start) * 1000,
+                    cpu_ms=cpu * 1000,
+                    thread=threading.current_thread().name,
+                    start_ms=(opened.start - self._origin) * 1000,
+                    peak_memory_bytes=peak_bytes
+                ))
+
+    def record(self, name: str, wall_ms: float, cpu_ms: float = 0.0, parent: Optional[str] = None) -> None:
+        """Add a stage measured elsewhere, e.g. inside a worker process"""
+        parent = parent or self.current_path()
+        with self._lock:
+            self.records.append(StageRecord(
+                name=f"{parent}/{name}" if parent else name,
+                wall_ms=wall_ms,
+                cpu_ms=cpu_ms,
+                thread=threading.current_thread().name
+            ))
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Per stage name: calls, total and median wall time, total CPU time and largest peak"""
+        grouped: Dict[str, List[StageRecord]] = {}
+        for record in self.records:
+            grouped.setdefault(record.name, []).append(record)
+
+        summary = {}
+        for name, records in grouped.items():
+            peaks = [record.peak_memory_bytes for record in records if record.peak_memory_bytes is not None]
+            summary[name] = {
+                'calls': len(records),
+                'wall_ms': round(sum(record.wall_ms for record in records), 3),
+                'median_wall_ms': round(statistics.median(record.wall_ms for record in records), 3),
+                'cpu_ms': round(sum(record.cpu_ms for record in records), 3),
+                'peak_memory_bytes': max(peaks) if peaks else None
+            }
+        return summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        max_rss = _max_rss_bytes()
+        return {
+            'generated_at': datetime.now().isoformat(),
+            'command': sys.argv,
+            'wall_ms': round((time.perf_counter() - self._origin) * 1000, 3),
+            **({'max_rss_bytes': max_rss} if max_rss is not None else {}),
+            'summary': self.summary(),
+            'stages': [
+                {key: round(value, 3) if isinstance(value, float) else value for key, value in asdict(record).items()}
+                for record in self.records
+            ]
+        }
+
+    def write_json(self, path: Path) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def write_speedscope(self, path: Path) -> None:
+        """Timed stages as one evented speedscope profile per thread"""
+        frames: List[Dict[str, str]] = []
+        frame_index: Dict[str, int] = {}
+        by_thread: Dict[str, List[StageRecord]] = {}
+        for record in self.records:
+            if record.start_ms is not None:
+                by_thread.setdefault(record.thread, []).append(record)
+            if record.name not in frame_index:
+                frame_index[record.name] = len(frames)
+                frames.append({'name': record.name})
+
+        profiles = []
+        for thread, records in by_thread.items():
+            events: List[Dict[str, Any]] = []
+            open_stages: List[StageRecord] = []
+            for record in sorted(records, key=lambda item: (item.start_ms, -item.wall_ms)):
+                while open_stages and open_stages[-1].start_ms + open_stages[-1].wall_ms <= record.start_ms:
+                    closed = open_stages.pop()
+                    events.append({'type': 'C', 'frame': frame_index[closed.name],
+                                   'at': closed.start_ms + closed.wall_ms})
+                events.append({'type': 'O', 'frame': frame_index[record.name], 'at': record.start_ms})
+                open_stages.append(record)
+            while open_stages:
+                closed = open_stages.pop()
+                events.append({'type': 'C', 'frame': frame_index[closed.name], 'at': closed.start_ms + closed.wall_ms})
+
+            profiles.append({
+                'type': 'evented',
+                'name': thread,
+                'unit': 'milliseconds',
+                'startValue': events[0]['at'],
+                'endValue': max(event['at'] for event in events),
+                'events': events
+            })
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                '$schema': 'https://www.speedscope.app/file-format-schema.json',
+                'name': ' '.join(Path(arg).name if index == 0 else arg for index, arg in enumerate(sys.argv)),
+                'exporter': 'qms_profiler',
+                'shared': {'frames': frames},
+                'profiles': profiles
+            }, f)
+
+    def write_cprofile(self, path: Path) -> None:
+        """Stop the cProfile session started with ``cprofile=True`` and dump its stats"""
+        if self._cprofile is None:
+            raise RuntimeError("cProfile was not enabled for this profiler")
+        self._cprofile.disable()
+        self._cprofile.dump_stats(str(path))
+
+    def log_line(self, records: Optional[List[StageRecord]] = None) -> str:
+        """One-line 'stage N ms' listing of top-level stages"""
+        records = self.records if records is None else records
+        return ", ".join(f"{record.name} {record.wall_ms:.0f} ms" for record in records if '/' not in record.name)
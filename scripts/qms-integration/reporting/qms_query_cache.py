@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+QMS Query Cache
+Persistent cache of reporter query results, stored in its own SQLite file.
+
+Entries are keyed on the SQL text and parameters and are only served while
+the data source's identity token (see ``DataSource.identity``) still matches
+the one they were stored under, so any committed write invalidates every
+entry.
+"""
+
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+QueryResult = Tuple[List[str], List[Tuple]]
+
+
+class QueryCache:
+    """Query results cached by (SQL, parameters), evicted least recently used above a size cap.
+
+    One connection is shared by all threads of the reporter's query pool and
+    serialised with a lock; cache lookups are small next to the queries.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = 64 * 1024 * 1024):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), isolation_level=None, timeout=5,
+                                         check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS query_cache (
+                    query_hash TEXT PRIMARY KEY,
+                    identity TEXT NOT NULL,
+                    payload BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_query_cache_last_used ON query_cache (last_used)")
+        return self._conn
+
+    @staticmethod
+    def _hash(sql: str, params: Sequence[Any]) -> str:
+        payload = json.dumps([sql, list(params)], default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, sql: str, params: Sequence[Any], identity: str) -> Optional[QueryResult]:
+        """Cached (columns, rows) for the query, or None on a miss"""
+        query_hash = self._hash(sql, params)
+        with self._lock:
+            try:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT payload FROM query_cache WHERE query_hash = ? AND identity = ?", (query_hash, identity)
+                ).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE query_cache SET last_used = ? WHERE query_hash = ?",
+                                 (time.time(), query_hash))
+            except sqlite3.Error as e:
+                logger.debug(f"Query cache lookup failed: {e}")
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        payload = json.loads(row[0])
+        return payload['columns'], [tuple(values) for values in payload['rows']]
+
+    def put(self, sql: str, params: Sequence[Any], identity: str, columns: List[str], rows: List[Tuple]) -> None:
+        """Store a query result, replacing any entry for the same query under an older identity"""
+        try:
+            payload = json.dumps({'columns': columns, 'rows': rows}).encode('utf-8')
+        except (TypeError, ValueError):
+            # e.g. BLOB columns; such results are simply not cached
+            return
+        if len(payload) > self.max_bytes:
+            return
+
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO query_cache (query_hash, identity, payload, size, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (self._hash(sql, params), identity, payload, len(payload), time.time())
+                )
+                self._evict(conn)
+            except sqlite3.Error as e:
+                logger.debug(f"Query cache store failed: {e}")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drop least recently used entries until the cache fits under the size cap"""
+        total = conn.execute("SELECT TOTAL(size) FROM query_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        expired = []
+        for query_hash, size in conn.execute("SELECT query_hash, size FROM query_cache ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            expired.append((query_hash,))
+            total -= size
+        conn.executemany("DELETE FROM query_cache WHERE query_hash = ?", expired)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
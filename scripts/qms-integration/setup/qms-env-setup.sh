@@ -18,6 +18,7 @@ QMS_VERSION="${QMS_VERSION:-latest}"
 QMS_CONFIG_DIR="${QMS_CONFIG_DIR:-$HOME/.qms}"
 QMS_DASHBOARD_PORT="${QMS_DASHBOARD_PORT:-8080}"
 QMS_API_PORT="${QMS_API_PORT:-3000}"
+QMS_SCRIPTS_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
 
 # Logging function
 log() {
@@ -175,6 +176,8 @@ openpyxl>=3.1.0
 python-dotenv>=1.0.0
 colorama>=0.4.6
 tabulate>=0.9.0
+duckdb>=0.10.0
+pyarrow>=14.0.0
 EOF
         log "INFO" "✓ Created requirements.txt"
     fi
@@ -220,8 +223,18 @@ api:
   rate_limit: 1000
   
 database:
+  # Reporting can also read a DuckDB file ("duckdb") or month-partitioned Parquet
+  # directory ("parquet") exported with database/qms_datasources.py
   type: "sqlite"
   path: "${QMS_CONFIG_DIR}/data/qms.db"
+  # Raw rows older than reporting.retention_days are moved here by
+  # "qms retention"; readable as a "parquet" data source
+  archive_dir: "${QMS_CONFIG_DIR}/data/archive"
+  pool:
+    max_connections: 4
+    mmap_size_mb: 256
+    cache_size_mb: 32
+    statement_cache_size: 256
   
 logging:
   level: "info"
@@ -251,6 +264,8 @@ integrations:
     smtp_port: 587
     username: ""
     password: ""  # Set via QMS_EMAIL_PASSWORD environment variable
+    starttls: true
+    keepalive_seconds: 60  # reuse the SMTP connection while alerts arrive within this gap
     
 notifications:
   channels:
@@ -259,13 +274,67 @@ notifications:
   
 reporting:
   output_dir: "${QMS_CONFIG_DIR}/reports"
+  cache_dir: "${QMS_CONFIG_DIR}/cache/reporting"
   formats:
     - html
     - json
   retention_days: 30
+  chart_mode: assets
+  chart_format: svg
+  chart_cache:
+    enabled: true
+    max_size_mb: 256
+    max_age_days: 30
+  query_cache:
+    enabled: true
+    max_size_mb: 64
+  window_resolution_seconds: 60
+  # Raw row exports (qms report --export TABLE --export-format csv|ndjson|parquet)
+  export:
+    chunk_rows: 50000
+    parquet_compression: zstd
   
 monitoring:
   health_check_interval: 30
+  # Keep-alive HTTP session shared by the API and dashboard probes
+  http:
+    timeout_seconds: 10
+    connect_timeout_seconds: 5
+    max_connections: 10
+    max_connections_per_host: 2
+    dns_cache_seconds: 300
+    keepalive_seconds: 75
+  # Background CPU/memory/disk/network sampler read by the system resource check
+  resources:
+    sample_interval_seconds: 1
+    buffer_seconds: 900
+    window_seconds: 60
+    disk_path: /
+    cpu_budget_percent: 1.0
+  # Background delivery of email/Slack alerts (per-channel overrides under channels.<name>)
+  alert_queue:
+    max_size: 100
+    workers: 1
+    drop_policy: drop_oldest  # or drop_newest
+    max_attempts: 5
+    backoff_base_seconds: 1
+    backoff_max_seconds: 60
+    flush_timeout_seconds: 10
+    rate_per_minute: 20  # token bucket per channel; 0 disables
+    rate_burst: 5
+    digest_seconds: 0  # > 0 batches alerts arriving within this window into one message
+    digest_max_alerts: 50
+    channels:
+      email:
+        rate_per_minute: 6
+        digest_seconds: 60
+  alerting:
+    fire_after: 2  # consecutive failing cycles before an alert fires
+    resolve_after: 2  # consecutive passing cycles before it resolves
+    repeat_interval_seconds: 3600
+    flap_window: 10  # cycles considered for flap detection
+    flap_start_ratio: 0.5
+    flap_stop_ratio: 0.25
   metrics_collection: true
   alert_thresholds:
     response_time: 5000
@@ -300,6 +369,15 @@ EOF
     fi
 }
 
+# Apply QMS database migrations
+migrate_database() {
+    log "INFO" "Applying QMS database migrations..."
+    
+    source "$QMS_CONFIG_DIR/venv/bin/activate"
+    python3 "$QMS_SCRIPTS_DIR/database/qms_migrations.py" --config "$QMS_CONFIG_DIR/config/qms-config.yaml"
+    log "INFO" "✓ QMS database schema is up to date"
+}
+
 # Create helper scripts
 create_helper_scripts() {
     log "INFO" "Creating helper scripts..."
@@ -335,11 +413,23 @@ case "$1" in
         ;;
     "report")
         echo "Generating QMS report..."
-        python3 "$QMS_DIR/../../../scripts/qms-integration/reporting/qms-reporter.py" "$@"
+        python3 "$QMS_DIR/../../../scripts/qms-integration/reporting/qms-reporter.py" "${@:2}"
+        ;;
+    "migrate")
+        echo "Migrating QMS database..."
+        python3 "$QMS_DIR/../../../scripts/qms-integration/database/qms_migrations.py" "${@:2}"
+        ;;
+    "sketches")
+        echo "Maintaining QMS quantile sketches..."
+        python3 "$QMS_DIR/../../../scripts/qms-integration/database/qms_sketches.py" "${@:2}"
+        ;;
+    "retention")
+        echo "Applying QMS retention..."
+        python3 "$QMS_DIR/../../../scripts/qms-integration/database/qms_retention.py" "${@:2}"
         ;;
     *)
         echo "QMS CLI Tool"
-        echo "Usage: $0 {start|stop|status|validate|report}"
+        echo "Usage: $0 {start|stop|status|validate|report|migrate|sketches|retention}"
         echo ""
         echo "Commands:"
         echo "  start      Start QMS services"
@@ -347,6 +437,11 @@ case "$1" in
         echo "  status     Check QMS status"
         echo "  validate   Run QMS validation"
         echo "  report     Generate QMS report"
+        echo "             (batch: report --target summary:html --target executive:json ...)"
+        echo "  migrate    Apply QMS database migrations (and refresh the quantile sketches)"
+        echo "  sketches   Fold new results into the quantile sketches: sketches refresh|rebuild"
+        echo "             (schedule e.g. hourly: 0 * * * * qms sketches refresh)"
+        echo "  retention  Archive expired rows to Parquet and delete expired reports"
         exit 1
         ;;
 esac
@@ -424,6 +519,7 @@ main() {
     install_node_deps
     install_python_deps
     create_config_files
+    migrate_database
     create_helper_scripts
     validate_installation
     print_summary
@@ -0,0 +1,50 @@
+"""Shared fixtures for the QMS integration script tests"""
+
+import sys
+import importlib.util
+from pathlib import Path
+
+import pytest
+import yaml
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+
+# The scripts import their sibling modules by name, as when run from their own directory
+for directory in ('database', 'reporting', 'monitoring'):
+    sys.path.insert(0, str(SCRIPTS_DIR / directory))
+
+
+def load_script(relative_path: str, module_name: str):
+    """Import a script whose file name is not importable (e.g. qms-reporter.py)"""
+    spec = importlib.util.spec_from_file_location(module_name, SCRIPTS_DIR / relative_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def migrated_db(tmp_path):
+    """Path of an empty database migrated to the latest schema"""
+    from qms_migrations import connect, migrate
+
+    db_path = tmp_path / 'qms.db'
+    conn = connect(str(db_path))
+    migrate(conn)
+    conn.close()
+    return db_path
+
+
+@pytest.fixture
+def reporter_config(tmp_path, migrated_db):
+    """Reporter configuration for ``migrated_db`` with the persistent caches off"""
+    config_path = tmp_path / 'qms-config.yaml'
+    with open(config_path, 'w') as f:
+        yaml.safe_dump({
+            'database': {'type': 'sqlite', 'path': str(migrated_db)},
+            'reporting': {
+                'output_dir': str(tmp_path / 'reports'),
+                'query_cache': {'enabled': False},
+                'chart_cache': {'enabled': False}
+            }
+        }, f)
+    return config_path
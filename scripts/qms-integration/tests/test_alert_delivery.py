@@ -0,0 +1,191 @@
+"""Alert delivery: the persistent SMTP connection and digest batching"""
+
+import asyncio
+import email
+import socketserver
+import threading
+from email.mime.text import MIMEText
+
+import pytest
+import yaml
+from aiohttp import web
+
+from conftest import load_script
+from qms_smtp import SMTPConnection
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Minimal local SMTP server: AUTH without checks, records each session and message"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, drop_after=None):
+        super().__init__(('127.0.0.1', 0), _SMTPSession)
+        self.drop_after = drop_after
+        self.connections = 0
+        self.logins = 0
+        self.messages = []
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+class _SMTPSession(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        sent = 0
+        self.reply('220 qms-test')
+        for raw in self.rfile:
+            command = raw.decode().strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250-qms-test')
+                self.reply('250 AUTH PLAIN LOGIN')
+            elif command.startswith('AUTH'):
+                server.logins += 1
+                self.reply('235 Authentication successful')
+            elif command.startswith(('MAIL', 'RCPT', 'RSET', 'NOOP')):
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = b''.join(iter(self.rfile.readline, b'.\r\n'))
+                server.messages.append(email.message_from_bytes(data))
+                self.reply('250 Queued')
+                sent += 1
+                if sent == server.drop_after:
+                    # Drop the session without a 421, as servers do with long-lived clients
+                    return
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+@pytest.fixture
+def smtp_server():
+    server = SMTPStandIn()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _message(subject):
+    message = MIMEText('body')
+    message['Subject'] = subject
+    return message
+
+
+def test_smtp_connection_is_reused_across_messages(smtp_server):
+    smtp = SMTPConnection('127.0.0.1', smtp_server.port, 'qms', 'secret', starttls=False)
+    for index in range(3):
+        smtp.send(_message(f"alert {index}"), 'qms@example.com', 'team@example.com')
+    smtp.close()
+
+    assert [message['Subject'] for message in smtp_server.messages] == ['alert 0', 'alert 1', 'alert 2']
+    assert smtp_server.connections == 1
+    assert smtp_server.logins == 1
+    assert smtp.connects == 1
+
+
+def test_smtp_connection_reconnects_after_the_server_drops_it(smtp_server):
+    smtp_server.drop_after = 2
+    smtp = SMTPConnection('127.0.0.1', smtp_server.port, 'qms', 'secret', starttls=False)
+    for index in range(3):
+        smtp.send(_message(f"alert {index}"), 'qms@example.com', 'team@example.com')
+    smtp.close()
+
+    assert len(smtp_server.messages) == 3
+    assert smtp_server.connections == 2
+    assert smtp.connects == 2
+
+
+async def _webhook(payloads):
+    async def receive(request):
+        payloads.append(await request.json())
+        return web.Response(text='ok')
+
+    app = web.Application()
+    app.router.add_post('/hook', receive)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    return runner, runner.addresses[0][1]
+
+
+def test_monitor_sends_one_digest_per_batch(tmp_path, smtp_server, monkeypatch):
+    monkeypatch.setenv('QMS_EMAIL_PASSWORD', 'secret')
+    monkeypatch.delenv('QMS_SLACK_WEBHOOK', raising=False)
+    module = load_script('monitoring/qms-monitor.py', 'qms_monitor')
+    payloads = []
+
+    async def run():
+        runner, port = await _webhook(payloads)
+        config_path = tmp_path / 'qms-config.yaml'
+        config_path.write_text(yaml.safe_dump({
+            'database': {'path': str(tmp_path / 'missing.db')},
+            'integrations': {
+                'email': {'enabled': True, 'smtp_server': '127.0.0.1', 'smtp_port': smtp_server.port,
+                          'username': 'qms@example.com', 'starttls': False},
+                'slack': {'enabled': True, 'webhook_url': f"http://127.0.0.1:{port}/hook"}
+            },
+            'monitoring': {'alert_queue': {'digest_seconds': 0.3, 'rate_per_minute': 0}}
+        }))
+        monitor = module.QMSMonitor(str(config_path))
+        try:
+            for source in ('api', 'dashboard', 'database'):
+                monitor.create_alert(module.AlertLevel.WARNING, source, f"{source} is slow")
+            await asyncio.sleep(0.6)
+            monitor.create_alert(module.AlertLevel.CRITICAL, 'api', 'api is down')
+            monitor.create_alert(module.AlertLevel.INFO, 'dashboard', 'dashboard recovered', resolved=True)
+        finally:
+            await monitor.close()
+            await runner.cleanup()
+
+    asyncio.run(run())
+
+    subjects = [message['Subject'] for message in smtp_server.messages]
+    assert subjects == [
+        'QMS Alert digest: 3 alerts (WARNING) - api, dashboard, database',
+        'QMS Alert digest: 2 alerts (CRITICAL) - api, dashboard'
+    ]
+    # Both digests went out over the one SMTP session
+    assert smtp_server.connections == 1
+
+    assert [len(payload['attachments']) for payload in payloads] == [3, 2]
+    assert [payload['text'] for payload in payloads] == [
+        'QMS Alert digest: 3 alerts (WARNING)', 'QMS Alert digest: 2 alerts (CRITICAL)'
+    ]
+
+
+def test_alerts_outside_an_event_loop_keep_the_smtp_connection(tmp_path, smtp_server, monkeypatch):
+    monkeypatch.setenv('QMS_EMAIL_PASSWORD', 'secret')
+    module = load_script('monitoring/qms-monitor.py', 'qms_monitor')
+    config_path = tmp_path / 'qms-config.yaml'
+    config_path.write_text(yaml.safe_dump({
+        'database': {'path': str(tmp_path / 'missing.db')},
+        'integrations': {
+            'email': {'enabled': True, 'smtp_server': '127.0.0.1', 'smtp_port': smtp_server.port,
+                      'username': 'qms@example.com', 'starttls': False}
+        },
+        'monitoring': {'alert_queue': {'rate_per_minute': 0}}
+    }))
+    monitor = module.QMSMonitor(str(config_path))
+    sampler = monitor._get_resource_sampler()
+
+    monitor.create_alert(module.AlertLevel.WARNING, 'api', 'api is slow')
+    monitor.create_alert(module.AlertLevel.CRITICAL, 'api', 'api is down')
+
+    assert len(smtp_server.messages) == 2
+    assert smtp_server.connections == 1
+    assert sampler.running
+    asyncio.run(monitor.close())
+    assert not sampler.running
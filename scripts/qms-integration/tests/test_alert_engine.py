@@ -0,0 +1,113 @@
+"""Alert engine state machine and the monitor's health-check analysis"""
+
+from datetime import datetime
+
+import yaml
+
+from conftest import load_script
+from qms_alert_engine import AlertEngine, fingerprint
+
+BAD = ('warning', 'High CPU usage: 85%')
+GOOD = (None, '')
+
+
+def _feed(engine, sequence, source='system_resources', start=0.0, step=60.0):
+    """Observe each (level, message) one cycle apart; returns (cycle, reason) per notification"""
+    sent = []
+    for cycle, (level, message) in enumerate(sequence):
+        for notification in engine.observe(source, level, message, now=start + cycle * step):
+            sent.append((cycle, notification.reason))
+    return sent
+
+
+def test_fires_only_after_consecutive_failures():
+    engine = AlertEngine()
+    assert _feed(engine, [BAD, GOOD, BAD, GOOD]) == []
+    assert _feed(AlertEngine(), [BAD, BAD, BAD]) == [(1, 'firing')]
+
+
+def test_repeated_identical_failures_are_deduplicated():
+    engine = AlertEngine({'repeat_interval_seconds': 600})
+    # Percentages are masked, so a changing reading is the same alert
+    sequence = [('warning', f"High CPU usage: {80 + cycle}%") for cycle in range(12)]
+    assert _feed(engine, sequence) == [(1, 'firing'), (11, 'reminder')]
+
+
+def test_a_different_failure_is_sent_as_a_change():
+    engine = AlertEngine()
+    sequence = [BAD, BAD, BAD, ('error', 'Disk full'), ('error', 'Disk full')]
+    assert _feed(engine, sequence) == [(1, 'firing'), (3, 'changed')]
+
+
+def test_recovery_sends_one_resolution():
+    engine = AlertEngine()
+    notifications = []
+    for cycle, (level, message) in enumerate([BAD, BAD, GOOD, GOOD, GOOD, GOOD]):
+        notifications += engine.observe('api', level, message, now=cycle * 60.0)
+
+    assert [notification.reason for notification in notifications] == ['firing', 'resolved']
+    assert notifications[1].resolved
+    assert notifications[1].message == f"Resolved: {BAD[1]}"
+    assert engine.firing() == {}
+
+
+def test_a_single_good_cycle_does_not_resolve():
+    engine = AlertEngine()
+    assert _feed(engine, [BAD, BAD, GOOD, BAD, BAD]) == [(1, 'firing')]
+    assert set(engine.firing()) == {'system_resources'}
+
+
+def test_unsent_failures_do_not_resolve():
+    engine = AlertEngine({'fire_after': 3})
+    assert _feed(engine, [BAD, BAD, GOOD, GOOD, GOOD]) == []
+
+
+def test_flapping_is_announced_once_and_suppressed():
+    engine = AlertEngine({'flap_window': 4})
+    flapping = [BAD, GOOD] * 5
+    assert _feed(engine, flapping) == [(3, 'flapping')]
+    assert engine.firing()['system_resources']['flapping']
+
+
+def test_flapping_that_settles_bad_sends_the_real_alert():
+    engine = AlertEngine({'flap_window': 4})
+    sent = _feed(engine, [BAD, GOOD] * 3 + [BAD] * 5)
+    assert [reason for _, reason in sent] == ['flapping', 'changed']
+    # The alert goes out once the history is steady again
+    assert sent[1][0] == 9
+
+
+def test_flapping_that_settles_good_resolves():
+    engine = AlertEngine({'flap_window': 4})
+    sent = _feed(engine, [BAD, GOOD] * 3 + [GOOD] * 5)
+    assert [reason for _, reason in sent] == ['flapping', 'resolved']
+    assert engine.firing() == {}
+
+
+def test_fingerprint_masks_numbers_only():
+    assert fingerprint('api', 'warning', 'took 120 ms') == fingerprint('api', 'warning', 'took 95.5 ms')
+    assert fingerprint('api', 'warning', 'took 120 ms') != fingerprint('api', 'error', 'took 120 ms')
+    assert fingerprint('api', 'warning', 'took 120 ms') != fingerprint('dashboard', 'warning', 'took 120 ms')
+
+
+def test_analysis_skips_unknown_checks_and_resolves(tmp_path):
+    config_path = tmp_path / 'qms-config.yaml'
+    config_path.write_text(yaml.safe_dump({'database': {'path': str(tmp_path / 'missing.db')}}))
+    module = load_script('monitoring/qms-monitor.py', 'qms_monitor')
+    monitor = module.QMSMonitor(str(config_path))
+
+    def check(status, error=None):
+        return module.HealthCheck(name='api', status=status, timestamp=datetime.now(),
+                                  response_time_ms=1.0, details={}, error=error)
+
+    status = module.MonitorStatus
+    for cycle in [check(status.UNHEALTHY, 'HTTP 503'), check(status.UNKNOWN),
+                  check(status.UNHEALTHY, 'HTTP 503'), check(status.UNHEALTHY, 'HTTP 503'),
+                  check(status.HEALTHY), check(status.UNKNOWN), check(status.HEALTHY)]:
+        monitor.analyze_health_checks([cycle])
+
+    # UNKNOWN neither breaks the run of failures nor counts towards recovery
+    assert [(alert.level, alert.message, alert.resolved) for alert in monitor.alerts] == [
+        (module.AlertLevel.ERROR, 'Health check failed: HTTP 503', False),
+        (module.AlertLevel.INFO, 'Resolved: Health check failed: HTTP 503', True)
+    ]
@@ -0,0 +1,142 @@
+"""Alert queue: retries, overflow policies and the per-channel rate limit"""
+
+import asyncio
+import random
+from types import SimpleNamespace
+
+import pytest
+
+import qms_alert_queue
+from qms_alert_queue import AlertDeliveryError, AlertDispatcher, TokenBucket, backoff_delay
+
+# Retries back off by milliseconds, and nothing is rate limited unless a test asks for it
+FAST = {'backoff_base_seconds': 0.001, 'backoff_max_seconds': 0.01, 'rate_per_minute': 0}
+
+
+def _alert(name):
+    return SimpleNamespace(source=name)
+
+
+class FlakySender:
+    """Fails the first ``failures`` calls with ``error``, then records each batch"""
+
+    def __init__(self, failures=0, error=None):
+        self.failures = failures
+        self.error = error or AlertDeliveryError('temporarily unavailable')
+        self.calls = 0
+        self.batches = []
+
+    async def send(self, batch):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        self.batches.append([alert.source for alert in batch])
+
+
+def _run(senders, options, alerts, settle=0.0):
+    """Submit ``alerts`` on a fresh loop, then flush; returns the dispatcher and each submit() result"""
+    async def run():
+        dispatcher = AlertDispatcher(senders, options)
+        accepted = [dispatcher.submit(_alert(name)) for name in alerts]
+        await asyncio.sleep(settle)
+        await dispatcher.close()
+        return dispatcher, accepted
+
+    return asyncio.run(run())
+
+
+def test_failed_deliveries_are_retried():
+    sender = FlakySender(failures=2)
+    dispatcher, _ = _run({'email': sender.send}, FAST, ['api'])
+    assert sender.batches == [['api']]
+    stats = dispatcher.stats()['email']
+    assert (stats['delivered'], stats['retries'], stats['failed']) == (1, 2, 0)
+
+
+def test_delivery_gives_up_after_max_attempts():
+    sender = FlakySender(failures=10)
+    dispatcher, _ = _run({'email': sender.send}, {**FAST, 'max_attempts': 3}, ['api'])
+    assert sender.calls == 3
+    stats = dispatcher.stats()['email']
+    assert (stats['delivered'], stats['retries'], stats['failed']) == (0, 2, 1)
+
+
+def test_non_retryable_errors_fail_at_once():
+    sender = FlakySender(failures=10, error=AlertDeliveryError('bad credentials', retry=False))
+    dispatcher, _ = _run({'email': sender.send}, FAST, ['api'])
+    assert sender.calls == 1
+    assert dispatcher.stats()['email']['failed'] == 1
+
+
+def test_retry_after_overrides_the_backoff(monkeypatch):
+    delays = []
+    sleep = asyncio.sleep
+
+    async def recording_sleep(delay, *args):
+        delays.append(delay)
+        await sleep(0)
+
+    monkeypatch.setattr(qms_alert_queue.asyncio, 'sleep', recording_sleep)
+    sender = FlakySender(failures=1, error=AlertDeliveryError('rate limited', retry_after=7.5))
+    _run({'slack': sender.send}, FAST, ['api'])
+    assert 7.5 in delays
+    assert sender.batches == [['api']]
+
+
+def test_backoff_is_jittered_and_capped():
+    random.seed(1)
+    for attempt in range(1, 10):
+        delays = [backoff_delay(attempt, 1.0, 8.0) for _ in range(200)]
+        ceiling = min(8.0, 2 ** (attempt - 1))
+        assert all(0 <= delay <= ceiling for delay in delays)
+        assert max(delays) > ceiling / 2
+
+
+def test_a_slow_channel_does_not_hold_up_the_others():
+    async def stuck(batch):
+        await asyncio.sleep(60)
+
+    fast = FlakySender()
+    dispatcher, _ = _run({'slack': stuck, 'email': fast.send},
+                         {**FAST, 'channels': {'slack': {'flush_timeout_seconds': 0.1}}}, ['api'], settle=0.1)
+    assert fast.batches == [['api']]
+    assert dispatcher.stats()['slack']['delivered'] == 0
+
+
+@pytest.mark.parametrize('policy, delivered', [
+    ('drop_oldest', [['b'], ['c']]),
+    ('drop_newest', [['a'], ['b']])
+])
+def test_full_queue_applies_the_drop_policy(policy, delivered):
+    sender = FlakySender()
+    dispatcher, accepted = _run({'email': sender.send}, {**FAST, 'max_size': 2, 'drop_policy': policy}, 'abc')
+    # Workers only start once submit() yields to the loop, so the third alert overflows
+    assert accepted == [True, True, False]
+    assert sender.batches == delivered
+    assert dispatcher.stats()['email']['dropped'] == 1
+
+
+def test_unknown_drop_policy_is_rejected():
+    with pytest.raises(ValueError):
+        AlertDispatcher({'email': FlakySender().send}, {'drop_policy': 'drop_random'})
+
+
+def test_token_bucket_allows_a_burst_then_paces(monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(qms_alert_queue, 'time', SimpleNamespace(monotonic=lambda: clock.now))
+
+    bucket = TokenBucket(rate_per_second=0.5, capacity=2)
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 2.0, 4.0]
+
+    # Booked tokens are paid back before the bucket refills
+    clock.now += 4.0
+    assert bucket.reserve() == 2.0
+    clock.now += 10.0
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 2.0]
+
+
+def test_rate_limit_throttles_deliveries():
+    sender = FlakySender()
+    dispatcher, _ = _run({'email': sender.send}, {**FAST, 'rate_per_minute': 6000, 'rate_burst': 1}, 'abc')
+    assert sender.batches == [['a'], ['b'], ['c']]
+    assert dispatcher.stats()['email']['throttled'] == 2
@@ -0,0 +1,79 @@
+"""Content-addressed chart cache: keys, renderer versioning and eviction"""
+
+import os
+import time
+
+import qms_chart_cache
+import qms_charts
+from qms_chart_cache import ChartCache
+from qms_charts import ChartJob, render_charts
+
+JOB = ChartJob('status', 'status_distribution', {'labels': ['PASS', 'FAIL'], 'values': [8, 2]})
+
+
+def _fake_renderer(monkeypatch):
+    """Replace the Matplotlib render with one that records each job it is asked to draw"""
+    rendered = []
+
+    def render(job):
+        rendered.append(job.name)
+        return f"image of {job.data}".encode(), 1.0, 1.0
+
+    monkeypatch.setattr(qms_charts, '_render_chart_timed', render)
+    return rendered
+
+
+def test_unchanged_charts_are_read_back(tmp_path, monkeypatch):
+    rendered = _fake_renderer(monkeypatch)
+    cache = ChartCache(tmp_path / 'charts')
+
+    first = render_charts([JOB], max_workers=1, cache=cache)
+    assert render_charts([JOB], max_workers=1, cache=cache) == first
+    assert rendered == ['status']
+
+    changed = ChartJob('status', 'status_distribution', {'labels': ['PASS', 'FAIL'], 'values': [7, 3]})
+    render_charts([changed], max_workers=1, cache=cache)
+    assert rendered == ['status', 'status']
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_renderer_version_bump_invalidates_charts(tmp_path, monkeypatch):
+    rendered = _fake_renderer(monkeypatch)
+    render_charts([JOB], max_workers=1, cache=ChartCache(tmp_path / 'charts'))
+
+    monkeypatch.setattr(qms_chart_cache, 'RENDERER_VERSION', qms_chart_cache.RENDERER_VERSION + 1)
+    bumped = ChartCache(tmp_path / 'charts')
+    render_charts([JOB], max_workers=1, cache=bumped)
+    assert rendered == ['status', 'status']
+    assert bumped.misses == 1
+
+
+def _put(cache, name, age_seconds, size=100):
+    key = cache.key(ChartJob(name, 'status_distribution', {'labels': [name], 'values': [1]}))
+    cache.put(key, b'x' * size)
+    stamp = time.time() - age_seconds
+    os.utime(cache.directory / f"{key}.png", (stamp, stamp))
+    return key
+
+
+def test_entries_older_than_the_age_limit_are_evicted(tmp_path):
+    cache = ChartCache(tmp_path / 'charts', max_age_days=1)
+    expired = _put(cache, 'old', 2 * 86400)
+    current = _put(cache, 'new', 3600)
+
+    assert cache.evict() == 1
+    assert cache.get(expired) is None
+    assert cache.get(current) is not None
+
+
+def test_least_recently_used_entries_are_evicted_over_the_size_cap(tmp_path):
+    cache = ChartCache(tmp_path / 'charts', max_bytes=250)
+    oldest = _put(cache, 'a', 300)
+    middle = _put(cache, 'b', 200)
+    newest = _put(cache, 'c', 100)
+    # A hit refreshes the entry, leaving 'b' the least recently used
+    assert cache.get(oldest) is not None
+
+    assert cache.evict() == 1
+    assert cache.get(middle) is None
+    assert cache.get(oldest) is not None and cache.get(newest) is not None
@@ -0,0 +1,48 @@
+"""Read-only connection pool"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from qms_connections import ConnectionPool
+
+
+def test_missing_database_is_not_created(tmp_path):
+    db_path = tmp_path / 'missing.db'
+    pool = ConnectionPool(str(db_path))
+    with pytest.raises(sqlite3.OperationalError):
+        pool.execute("SELECT 1")
+    assert not db_path.exists()
+
+
+def test_migrated_database_is_in_wal_mode(migrated_db):
+    pool = ConnectionPool(str(migrated_db))
+    assert pool.execute("PRAGMA journal_mode")[1][0][0] == 'wal'
+    with pytest.raises(sqlite3.OperationalError):
+        pool.execute("CREATE TABLE scratch (id INTEGER)")
+
+
+def test_borrowers_wait_for_a_free_connection(migrated_db):
+    pool = ConnectionPool(str(migrated_db), max_connections=2)
+    opened = []
+    borrowed = threading.Event()
+
+    def borrow():
+        with pool.connection() as conn:
+            opened.append(conn)
+            borrowed.set()
+
+    with pool.connection(), pool.connection():
+        waiting = threading.Thread(target=borrow)
+        waiting.start()
+        assert not borrowed.wait(0.2)
+        opened_while_full = list(opened)
+    waiting.join(5)
+
+    assert opened_while_full == []
+    assert borrowed.is_set()
+    # The waiting borrower got one of the two connections back instead of opening a third
+    assert opened[0] in pool._idle
+    assert len(pool._idle) == 2
+    pool.close()
@@ -0,0 +1,96 @@
+"""Columnar data sources: SQLite export and reporting parity across backends"""
+
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import yaml
+
+from conftest import load_script
+from qms_datasources import create_data_source, directory_identity, export_sqlite
+from qms_migrations import connect, migrate
+from qms_time import TimeWindow
+
+SECTIONS = ('quality_gates', 'code_coverage', 'security_issues', 'code_review')
+
+
+def _insert_results(db_path, days=8, per_day=6):
+    now = datetime.now(timezone.utc)
+    with sqlite3.connect(db_path) as conn:
+        for offset in range(1, days + 1):
+            day = (now - timedelta(days=offset)).strftime('%Y-%m-%d')
+            for index in range(per_day):
+                created_at = f"{day} 09:{index:02d}:00"
+                conn.execute("INSERT INTO quality_gate_results (repository, gate_name, status, score, created_at) "
+                             "VALUES ('org/a', 'build', ?, ?, ?)",
+                             ('PASS' if index % 3 else 'FAIL', 60 + offset + index, created_at))
+                conn.execute("INSERT INTO code_coverage_results (repository, line_coverage, branch_coverage, "
+                             "created_at) VALUES ('org/a', ?, ?, ?)", (70 + index, 50 + offset, created_at))
+                conn.execute("INSERT INTO security_scan_results (repository, scanner, severity, status, "
+                             "created_at) VALUES ('org/a', 'semgrep', ?, ?, ?)",
+                             (('HIGH', 'LOW')[index % 2], ('OPEN', 'RESOLVED')[offset % 2], created_at))
+                conn.execute("INSERT INTO code_review_results (repository, reviewer, review_time_hours, "
+                             "comments_count, approved, created_at) VALUES ('org/a', 'r', ?, ?, ?, ?)",
+                             (0.5 * index, offset, index % 2, created_at))
+    conn = connect(str(db_path))
+    migrate(conn)
+    conn.close()
+
+
+def _metrics(tmp_path, db_type, location, window):
+    config_path = tmp_path / f"{db_type}.yaml"
+    config_path.write_text(yaml.safe_dump({
+        'database': {'type': db_type, 'path': str(location)},
+        'reporting': {'output_dir': str(tmp_path / 'reports'),
+                      'query_cache': {'enabled': False}, 'chart_cache': {'enabled': False}}
+    }))
+    module = load_script('reporting/qms-reporter.py', 'qms_reporter')
+    reporter = module.QMSReporter(str(config_path))
+    try:
+        return reporter.collect_quality_metrics(30, window=window)
+    finally:
+        reporter.backend.close()
+
+
+def test_columnar_backends_report_what_sqlite_reports(tmp_path, migrated_db):
+    _insert_results(migrated_db)
+    counts = export_sqlite(str(migrated_db), duckdb_path=str(tmp_path / 'qms.duckdb'),
+                           parquet_dir=str(tmp_path / 'parquet'))
+    assert set(counts.values()) == {48}
+
+    window = TimeWindow.last(days=30)
+    expected = _metrics(tmp_path, 'sqlite', migrated_db, window)
+    assert expected['quality_gates']['total_runs'] == 48
+    assert all(expected[section] for section in SECTIONS)
+    for db_type, location in (('duckdb', tmp_path / 'qms.duckdb'), ('parquet', tmp_path / 'parquet')):
+        metrics = _metrics(tmp_path, db_type, location, window)
+        for section in SECTIONS:
+            assert metrics[section] == pytest.approx(expected[section]), (db_type, section)
+        # Columnar backends digest raw rows rather than reading the daily sketches
+        assert {metric: (item['count'], item['max']) for metric, item in metrics['distributions'].items()} == \
+            {metric: (item['count'], item['max']) for metric, item in expected['distributions'].items()}
+
+
+def test_parquet_export_is_month_partitioned(tmp_path, migrated_db):
+    _insert_results(migrated_db, days=1)
+    export_sqlite(str(migrated_db), parquet_dir=str(tmp_path / 'parquet'), tables=['quality_gate_results'])
+
+    month = datetime.now(timezone.utc) - timedelta(days=1)
+    partition = tmp_path / 'parquet' / 'quality_gate_results' / f"year={month.year}" / f"month={month.month}"
+    assert list(partition.glob('*.parquet'))
+    # The scratch DuckDB file the tables were staged in is gone
+    assert not any(path.name.startswith('.qms-export') for path in tmp_path.iterdir())
+
+    identity = directory_identity(str(tmp_path / 'parquet'))
+    export_sqlite(str(migrated_db), parquet_dir=str(tmp_path / 'parquet'), tables=['code_coverage_results'])
+    assert directory_identity(str(tmp_path / 'parquet')) != identity
+
+
+def test_export_needs_a_destination(migrated_db):
+    with pytest.raises(ValueError):
+        export_sqlite(str(migrated_db))
+
+
+def test_unknown_database_type_is_rejected():
+    with pytest.raises(ValueError):
+        create_data_source({'type': 'postgres'})
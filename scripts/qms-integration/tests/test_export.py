@@ -0,0 +1,94 @@
+"""Streaming exports of raw result rows"""
+
+import csv
+import gzip
+import json
+import sqlite3
+from datetime import datetime, timezone
+
+import pyarrow.parquet as pq
+import pytest
+
+from conftest import load_script
+from qms_export import write_export
+from qms_time import TimeWindow, to_epoch_ms
+
+
+def _insert_gates(db_path, count=25):
+    with sqlite3.connect(db_path) as conn:
+        for index in range(count):
+            conn.execute("INSERT INTO quality_gate_results (repository, gate_name, status, score, details, "
+                         "created_at) VALUES ('org/a', 'build', ?, ?, ?, ?)",
+                         ('PASS' if index % 2 else 'FAIL', 50.5 + index, f'{{"run": {index}}}',
+                          f"2026-01-{1 + index:02d} 10:00:00"))
+
+
+def _reporter(reporter_config, migrated_db):
+    module = load_script('reporting/qms-reporter.py', 'qms_reporter')
+    return module.QMSReporter(str(reporter_config), str(migrated_db))
+
+
+def _table_rows(db_path):
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.execute("SELECT * FROM quality_gate_results ORDER BY created_at_ms")
+        return [description[0] for description in cursor.description], cursor.fetchall()
+
+
+def test_parquet_export_round_trips_one_row_group_per_chunk(migrated_db, reporter_config):
+    _insert_gates(migrated_db)
+    path, count = _reporter(reporter_config, migrated_db).export_results(
+        'quality_gate_results', 'parquet', chunk_rows=10
+    )
+
+    columns, rows = _table_rows(migrated_db)
+    parquet = pq.ParquetFile(path)
+    assert count == 25
+    assert parquet.metadata.num_row_groups == 3
+    assert parquet.metadata.row_group(0).column(0).compression == 'ZSTD'
+    table = parquet.read()
+    assert table.column_names == columns
+    assert [tuple(row.values()) for row in table.to_pylist()] == rows
+
+
+def test_compressed_ndjson_export_round_trips(migrated_db, reporter_config):
+    _insert_gates(migrated_db)
+    window = TimeWindow(to_epoch_ms(datetime(2026, 1, 6, tzinfo=timezone.utc)),
+                        to_epoch_ms(datetime(2026, 1, 11, tzinfo=timezone.utc)))
+    path, count = _reporter(reporter_config, migrated_db).export_results(
+        'quality_gate_results', 'ndjson', window=window, compression='gzip', chunk_rows=2
+    )
+
+    assert path.endswith('.ndjson.gz')
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert count == len(records) == 5
+    assert [record['score'] for record in records] == [55.5, 56.5, 57.5, 58.5, 59.5]
+
+
+def test_csv_export_writes_a_header_row(migrated_db, reporter_config):
+    _insert_gates(migrated_db, count=3)
+    path, count = _reporter(reporter_config, migrated_db).export_results('quality_gate_results', 'csv')
+
+    columns, rows = _table_rows(migrated_db)
+    with open(path, newline='', encoding='utf-8') as f:
+        written = list(csv.reader(f))
+    assert count == 3
+    assert written[0] == columns
+    assert [row[columns.index('details')] for row in written[1:]] == [row[columns.index('details')] for row in rows]
+
+
+@pytest.mark.parametrize('export_format, compression', [('csv', 'zstd'), ('ndjson', 'snappy'), ('parquet', 'xz')])
+def test_unsupported_compression_is_rejected(tmp_path, export_format, compression):
+    with pytest.raises(ValueError):
+        write_export(iter([]), tmp_path / 'out', export_format, ['id'], compression, schema=object())
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_interrupted_export_leaves_no_file(tmp_path):
+    def chunks():
+        yield ['id'], [(1,), (2,)]
+        raise RuntimeError('connection lost')
+
+    with pytest.raises(RuntimeError):
+        write_export(chunks(), tmp_path / 'out.csv', 'csv', ['id'])
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,56 @@
+"""Schema migrations and the schema check of the scripts that query them"""
+
+import sqlite3
+
+import pytest
+
+from conftest import load_script
+from qms_migrations import EPOCH_VERSION, connect, current_version, migrate
+from qms_rollups import ROLLUP_TABLE, rebuild_rollups
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def test_rollups_migration_runs_before_the_epoch_column(tmp_path):
+    conn = connect(str(tmp_path / 'qms.db'))
+    migrate(conn, target=1)
+    conn.execute("INSERT INTO quality_gate_results (repository, status, score, created_at) "
+                 "VALUES ('org/a', 'PASS', 90, '2026-01-02 03:04:05')")
+    migrate(conn, target=2)
+    assert 'created_at_ms' not in _columns(conn, 'quality_gate_results')
+
+    conn.execute("INSERT INTO quality_gate_results (repository, status, score, created_at) "
+                 "VALUES ('org/a', 'FAIL', 40, '2026-01-02 05:00:00')")
+    folded = conn.execute(f"SELECT * FROM {ROLLUP_TABLE} ORDER BY 1, 2, 3, 4, 5").fetchall()
+    rebuild_rollups(conn)
+    assert folded == conn.execute(f"SELECT * FROM {ROLLUP_TABLE} ORDER BY 1, 2, 3, 4, 5").fetchall()
+    assert folded
+
+    migrate(conn)
+    assert 'created_at_ms' in _columns(conn, 'quality_gate_results')
+    assert folded == conn.execute(f"SELECT * FROM {ROLLUP_TABLE} ORDER BY 1, 2, 3, 4, 5").fetchall()
+
+
+def test_scripts_exit_on_an_outdated_schema(tmp_path, reporter_config, caplog):
+    db_path = tmp_path / 'old.db'
+    conn = connect(str(db_path))
+    migrate(conn, target=EPOCH_VERSION - 1)
+    assert current_version(conn) == EPOCH_VERSION - 1
+    conn.close()
+
+    reporter = load_script('reporting/qms-reporter.py', 'qms_reporter')
+    with pytest.raises(SystemExit):
+        reporter.QMSReporter(str(reporter_config), str(db_path))
+    assert 'qms migrate' in caplog.text
+
+    config_path = tmp_path / 'monitor.yaml'
+    config_path.write_text(f"database:\n  path: {db_path}\n")
+    monitor = load_script('monitoring/qms-monitor.py', 'qms_monitor')
+    with pytest.raises(SystemExit):
+        monitor.QMSMonitor(str(config_path))
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(f"PRAGMA user_version = {EPOCH_VERSION}")
+    monitor.QMSMonitor(str(config_path))
@@ -0,0 +1,104 @@
+"""Persistent query cache: invalidation on writes and size-capped LRU eviction"""
+
+import sqlite3
+from types import SimpleNamespace
+
+import yaml
+
+import qms_query_cache
+from conftest import load_script
+from qms_datasources import sqlite_identity
+from qms_query_cache import QueryCache
+from qms_time import TimeWindow, now_ms
+
+QUERY = "SELECT COUNT(*) FROM quality_gate_results"
+
+
+def _insert(conn):
+    conn.execute("INSERT INTO quality_gate_results (repository, status, score, created_at) "
+                 "VALUES ('org/a', 'PASS', 90, '2026-01-02 03:04:05')")
+    conn.commit()
+
+
+def test_identity_changes_on_every_committed_write(migrated_db):
+    writer = sqlite3.connect(migrated_db)
+    before = sqlite_identity(str(migrated_db))
+    _insert(writer)
+    # Committed to the WAL while the writer keeps it open
+    in_wal = sqlite_identity(str(migrated_db))
+    assert in_wal != before
+
+    writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    checkpointed = sqlite_identity(str(migrated_db))
+    assert checkpointed not in (before, in_wal)
+    _insert(writer)
+    assert sqlite_identity(str(migrated_db)) != checkpointed
+    writer.close()
+
+
+def test_reporter_serves_cached_results_until_a_write(tmp_path, migrated_db):
+    config_path = tmp_path / 'cached.yaml'
+    config_path.write_text(yaml.safe_dump({
+        'database': {'type': 'sqlite', 'path': str(migrated_db)},
+        'reporting': {'output_dir': str(tmp_path / 'reports'), 'cache_dir': str(tmp_path / 'cache')}
+    }))
+    module = load_script('reporting/qms-reporter.py', 'qms_reporter')
+    reporter = module.QMSReporter(str(config_path), str(migrated_db))
+    cache = reporter._get_query_cache()
+
+    assert reporter._fetch_rows(QUERY) == [(0,)]
+    assert reporter._fetch_rows(QUERY) == [(0,)]
+    assert (cache.misses, cache.hits) == (1, 1)
+
+    with sqlite3.connect(migrated_db) as writer:
+        _insert(writer)
+    assert reporter._fetch_rows(QUERY) == [(1,)]
+    assert (cache.misses, cache.hits) == (2, 1)
+
+
+def test_entries_under_an_old_identity_miss(tmp_path):
+    cache = QueryCache(tmp_path / 'queries.db')
+    cache.put(QUERY, (), 'v1', ['count'], [(3,)])
+    assert cache.get(QUERY, (), 'v1') == (['count'], [(3,)])
+    assert cache.get(QUERY, (), 'v2') is None
+    assert cache.get(QUERY, (1,), 'v1') is None
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+
+    def tick():
+        clock.now += 1
+        return clock.now
+
+    monkeypatch.setattr(qms_query_cache, 'time', SimpleNamespace(time=tick))
+    rows = [(index, 'x' * 100) for index in range(5)]
+    entry_size = len(qms_query_cache.json.dumps({'columns': ['id', 'pad'], 'rows': rows}).encode())
+    cache = QueryCache(tmp_path / 'queries.db', max_bytes=entry_size * 3)
+
+    for name in 'abc':
+        cache.put(f"SELECT '{name}'", (), 'v1', ['id', 'pad'], rows)
+    # Reading 'a' makes 'b' the least recently used
+    assert cache.get("SELECT 'a'", (), 'v1') is not None
+    cache.put("SELECT 'd'", (), 'v1', ['id', 'pad'], rows)
+
+    cached = {name for name in 'abcd' if cache.get(f"SELECT '{name}'", (), 'v1') is not None}
+    assert cached == {'a', 'c', 'd'}
+    cache.close()
+
+
+def test_results_larger_than_the_cache_are_not_stored(tmp_path):
+    cache = QueryCache(tmp_path / 'queries.db', max_bytes=64)
+    cache.put(QUERY, (), 'v1', ['pad'], [('x' * 100,)])
+    assert cache.get(QUERY, (), 'v1') is None
+    cache.close()
+
+
+def test_report_windows_end_on_a_past_boundary():
+    window = TimeWindow(10_000, 125_500)
+    assert window.snapped(60_000) == TimeWindow(10_000 - 5_500, 120_000)
+
+    taken = now_ms()
+    snapped = TimeWindow.last(days=1).snapped(60_000)
+    assert snapped.end_ms <= taken and snapped.end_ms % 60_000 == 0
@@ -0,0 +1,76 @@
+"""Concurrent aggregate reads behind a report"""
+
+import sqlite3
+import threading
+
+import yaml
+
+from conftest import load_script
+from qms_migrations import connect, migrate
+from qms_time import TimeWindow
+
+
+def _insert_history(db_path, days=6, per_day=10):
+    with sqlite3.connect(db_path) as conn:
+        for offset in range(1, days + 1):
+            for index in range(per_day):
+                created_at = f"datetime('now', '-{offset} days', '+{index} minutes')"
+                conn.execute("INSERT INTO quality_gate_results (repository, status, score, created_at) "
+                             f"VALUES ('org/a', ?, ?, {created_at})", ('PASS' if index % 3 else 'FAIL', 70 + index))
+                conn.execute("INSERT INTO code_coverage_results (repository, line_coverage, branch_coverage, "
+                             f"created_at) VALUES ('org/a', ?, ?, {created_at})", (80 + offset, 60 + index))
+                conn.execute("INSERT INTO code_review_results (repository, reviewer, review_time_hours, "
+                             f"comments_count, approved, created_at) VALUES ('org/a', 'r', ?, 2, 1, {created_at})",
+                             (index / 2,))
+    conn = connect(str(db_path))
+    migrate(conn)
+    conn.close()
+
+
+def _reporter(tmp_path, db_path, query_workers):
+    config_path = tmp_path / f"workers-{query_workers}.yaml"
+    config_path.write_text(yaml.safe_dump({
+        'database': {'type': 'sqlite', 'path': str(db_path)},
+        'reporting': {'output_dir': str(tmp_path / 'reports'), 'query_workers': query_workers,
+                      'query_cache': {'enabled': False}, 'chart_cache': {'enabled': False}}
+    }))
+    module = load_script('reporting/qms-reporter.py', 'qms_reporter')
+    return module.QMSReporter(str(config_path), str(db_path))
+
+
+def test_concurrent_reads_match_serial_reads(tmp_path, migrated_db):
+    _insert_history(migrated_db)
+    window = TimeWindow.last(days=30)
+
+    serial = _reporter(tmp_path, migrated_db, 1).collect_quality_metrics(30, window=window)
+    concurrent = _reporter(tmp_path, migrated_db, 4).collect_quality_metrics(30, window=window)
+    assert serial['quality_gates']['total_runs'] == 60
+    assert concurrent == serial
+
+
+def test_reads_run_on_parallel_workers(tmp_path, migrated_db):
+    reporter = _reporter(tmp_path, migrated_db, 4)
+    tables = ['quality_gate_results', 'code_coverage_results', 'security_scan_results', 'code_review_results']
+    # Every read waits for all four, so a serial plan would time out
+    barrier = threading.Barrier(len(tables), timeout=5)
+    threads = set()
+
+    def aggregate_window(table, window):
+        threads.add(threading.current_thread().name)
+        barrier.wait()
+        return {}
+
+    reporter._aggregate_window = aggregate_window
+    results = reporter.read_aggregates(TimeWindow.last(days=1), [(table, None) for table in tables])
+    assert set(results) == {(table, None) for table in tables}
+    assert len(threads) == 4 and all(name.startswith('qms-query') for name in threads)
+
+
+def test_each_read_is_profiled_under_the_calling_stage(tmp_path, migrated_db):
+    reporter = _reporter(tmp_path, migrated_db, 2)
+    with reporter.profiler.stage('collect'):
+        reporter.read_aggregates(TimeWindow.last(days=1),
+                                 [('quality_gate_results', None), ('quality_gate_results', 'day')])
+
+    names = {record.name for record in reporter.profiler.records}
+    assert {'collect/query:quality_gate_results:window', 'collect/query:quality_gate_results:day'} <= names
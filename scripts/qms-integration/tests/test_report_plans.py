@@ -0,0 +1,81 @@
+"""Report plans: each report type reads and renders only what it shows"""
+
+import json
+import sqlite3
+
+from conftest import load_script
+
+# Inside the report window, whose end is snapped back to a whole minute
+AN_HOUR_AGO = "datetime('now', '-1 hour')"
+
+
+def _reporter(reporter_config, migrated_db):
+    module = load_script('reporting/qms-reporter.py', 'qms_reporter')
+    return module, module.QMSReporter(str(reporter_config), str(migrated_db))
+
+
+def _record_work(reporter):
+    """Record the aggregate reads and chart renders the reporter asks for"""
+    work = {'reads': [], 'charts': []}
+    read_aggregates = reporter.read_aggregates
+
+    def recording_read(window, keys=None):
+        work['reads'] += list(keys)
+        return read_aggregates(window, keys)
+
+    def fake_render(jobs):
+        work['charts'] += [job.name for job in jobs]
+        return {job.name: b'<svg/>' for job in jobs}
+
+    reporter.read_aggregates = recording_read
+    reporter._render_chart_jobs = fake_render
+    return work
+
+
+def test_plans_read_only_their_sections_and_charts(reporter_config, migrated_db):
+    module, _ = _reporter(reporter_config, migrated_db)
+    plans = module.REPORT_PLANS
+
+    assert plans['executive'].reads() == [
+        ('quality_gate_results', None), ('code_coverage_results', None), ('security_scan_results', None)
+    ]
+    # The summary charts are drawn from section reads, so they add none
+    assert plans['summary'].reads() == plans['summary'].reads(with_charts=False)
+    comprehensive = plans['comprehensive'].reads()
+    assert ('quality_gate_results', 'day') in comprehensive
+    assert ('quality_gate_results', 'day') not in plans['comprehensive'].reads(with_charts=False)
+    assert len(comprehensive) == len(set(comprehensive))
+
+
+def test_executive_report_skips_charts_and_raw_scans(reporter_config, migrated_db):
+    with sqlite3.connect(migrated_db) as conn:
+        conn.execute("INSERT INTO quality_gate_results (repository, status, score, created_at) "
+                     f"VALUES ('org/a', 'PASS', 90, {AN_HOUR_AGO})")
+    module, reporter = _reporter(reporter_config, migrated_db)
+    work = _record_work(reporter)
+
+    path = reporter.generate_report('executive', 'json')
+    assert work == {'reads': module.REPORT_PLANS['executive'].reads(), 'charts': []}
+    with open(path) as f:
+        metrics = json.load(f)['metrics']
+    assert metrics['quality_gates']['total_runs'] == 1
+    assert 'code_review' not in metrics and 'distributions' not in metrics
+
+
+def test_batch_reads_and_renders_the_union_once(reporter_config, migrated_db):
+    with sqlite3.connect(migrated_db) as conn:
+        conn.execute("INSERT INTO quality_gate_results (repository, status, score, created_at) "
+                     f"VALUES ('org/a', 'PASS', 90, {AN_HOUR_AGO})")
+        conn.execute("INSERT INTO security_scan_results (repository, severity, created_at) "
+                     f"VALUES ('org/a', 'HIGH', {AN_HOUR_AGO})")
+    module, reporter = _reporter(reporter_config, migrated_db)
+    work = _record_work(reporter)
+
+    reports = reporter.generate_reports([('summary', 'html'), ('executive', 'json')])
+    # Charts only appear in HTML, and the executive reads are a subset of the summary's
+    assert work['reads'] == module.REPORT_PLANS['summary'].reads()
+    assert sorted(work['charts']) == ['quality_gates_distribution', 'security_issues_by_severity']
+    with open(reports[('summary', 'html')]) as f:
+        html = f.read()
+    assert 'alt="QG Distribution"' in html and 'alt="Security Issues"' in html
+    assert 'alt="Quality Gates Trend"' not in html
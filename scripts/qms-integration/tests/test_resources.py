@@ -0,0 +1,51 @@
+"""Background resource sampler and the monitor's resource check"""
+
+import time
+
+import yaml
+
+from conftest import load_script
+from qms_resources import ResourceSampler
+
+
+def test_window_does_not_wait_for_the_first_sample():
+    sampler = ResourceSampler(interval=5)
+    sampler.start()
+    try:
+        started = time.monotonic()
+        assert sampler.window(60) is None
+        assert time.monotonic() - started < 0.5
+    finally:
+        sampler.stop()
+
+
+def test_window_falls_back_to_the_latest_sample():
+    sampler = ResourceSampler(interval=5)
+    sampler.start()
+    try:
+        sampler.sample()
+        usage = sampler.window(0)
+        assert usage['samples'] == 1
+        assert set(usage['cpu_percent']) == {'avg', 'max'}
+    finally:
+        sampler.stop()
+
+
+def test_resource_check_is_unknown_until_sampled(tmp_path):
+    config_path = tmp_path / 'qms-config.yaml'
+    config_path.write_text(yaml.safe_dump({
+        'database': {'path': str(tmp_path / 'missing.db')},
+        'monitoring': {'resources': {'sample_interval_seconds': 5}}
+    }))
+    module = load_script('monitoring/qms-monitor.py', 'qms_monitor')
+    monitor = module.QMSMonitor(str(config_path))
+    try:
+        started = time.monotonic()
+        check = monitor.check_system_resources()
+        assert time.monotonic() - started < 0.5
+        assert check.status == module.MonitorStatus.UNKNOWN
+
+        monitor._resource_sampler.sample()
+        assert monitor.check_system_resources().status != module.MonitorStatus.UNKNOWN
+    finally:
+        monitor._resource_sampler.stop()
@@ -0,0 +1,90 @@
+"""Row archival and report cleanup"""
+
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+
+from qms_migrations import connect, migrate
+from qms_retention import archive_expired_rows, clean_reports, incremental_vacuum
+from qms_time import DAY_MS, now_ms
+
+
+def _insert_gates(db_path, days_ago):
+    now = datetime.now(timezone.utc)
+    with sqlite3.connect(db_path) as conn:
+        for offset in days_ago:
+            created_at = (now - timedelta(days=offset)).strftime('%Y-%m-%d %H:%M:%S')
+            conn.execute("INSERT INTO quality_gate_results (repository, status, score, created_at) "
+                         "VALUES ('org/a', 'PASS', 90, ?)", (created_at,))
+
+
+def test_archive_writes_one_part_per_chunk(migrated_db, tmp_path):
+    _insert_gates(migrated_db, [60 - index * 0.1 for index in range(25)] + [1, 2, 3])
+    archive_dir = tmp_path / 'archive'
+
+    conn = connect(str(migrated_db))
+    archived = archive_expired_rows(conn, archive_dir, now_ms() - 30 * DAY_MS, chunk_rows=10)
+    remaining = conn.execute("SELECT COUNT(*) FROM quality_gate_results").fetchone()[0]
+    conn.close()
+
+    assert archived['quality_gate_results'] == 25
+    assert remaining == 3
+    parts = {path.name.split('_')[3] for path in (archive_dir / 'quality_gate_results').rglob('*.parquet')}
+    assert parts == {'00001', '00002', '00003'}
+
+
+def _fill_and_empty(conn):
+    conn.execute("CREATE TABLE padding (value TEXT)")
+    conn.executemany("INSERT INTO padding VALUES (?)", [('x' * 1000,)] * 500)
+    conn.execute("DELETE FROM padding")
+
+
+def test_new_databases_reclaim_pages_incrementally(migrated_db):
+    conn = connect(str(migrated_db))
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    _fill_and_empty(conn)
+    assert incremental_vacuum(conn) > 0
+    conn.close()
+
+
+def test_old_databases_need_an_explicit_full_vacuum(tmp_path):
+    db_path = tmp_path / 'old.db'
+    with sqlite3.connect(db_path) as conn:
+        # Created by other tooling before the migrator ever ran
+        conn.execute("CREATE TABLE build_notes (note TEXT)")
+    conn = connect(str(db_path))
+    migrate(conn)
+    _fill_and_empty(conn)
+    pages = conn.execute("PRAGMA page_count").fetchone()[0]
+
+    assert incremental_vacuum(conn) == 0
+    assert conn.execute("PRAGMA page_count").fetchone()[0] == pages
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+
+    assert incremental_vacuum(conn, full_vacuum=True) > 0
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    conn.close()
+
+
+def test_clean_reports_expires_nested_reports(tmp_path):
+    reports_dir = tmp_path / 'reports'
+    (reports_dir / 'assets').mkdir(parents=True)
+    (reports_dir / 'team' / 'weekly').mkdir(parents=True)
+    old = time.time() - 90 * 86400
+
+    expired = reports_dir / 'team' / 'weekly' / 'old.html'
+    expired.write_text('<img src="../../assets/aaaa.png">')
+    os.utime(expired, (old, old))
+    current = reports_dir / 'team' / 'new.html'
+    current.write_text('<img src="../assets/bbbb.png">')
+    for name in ('aaaa.png', 'bbbb.png'):
+        asset = reports_dir / 'assets' / name
+        asset.write_bytes(b'png')
+        os.utime(asset, (old, old))
+
+    deleted = clean_reports(reports_dir, time.time() - 30 * 86400)
+
+    assert deleted['reports'] == [str(expired)]
+    assert deleted['assets'] == [str(reports_dir / 'assets' / 'aaaa.png')]
+    assert current.exists() and (reports_dir / 'assets' / 'bbbb.png').exists()
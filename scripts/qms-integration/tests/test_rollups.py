@@ -0,0 +1,103 @@
+"""Rollup maintenance on insert, update and delete"""
+
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+from conftest import load_script
+from qms_migrations import connect
+from qms_retention import archive_expired_rows
+from qms_rollups import ROLLUP_TABLE, rebuild_rollups
+from qms_time import DAY_MS, now_ms
+
+
+def _rollups(conn):
+    return sorted(conn.execute(f"SELECT * FROM {ROLLUP_TABLE}").fetchall())
+
+
+def _created_at(days_ago, minute=0):
+    moment = datetime.now(timezone.utc) - timedelta(days=days_ago)
+    return moment.replace(minute=minute).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def test_updates_and_deletes_match_a_rebuild(migrated_db):
+    conn = connect(str(migrated_db))
+    for index in range(12):
+        conn.execute("INSERT INTO quality_gate_results (repository, status, score, created_at) VALUES (?, ?, ?, ?)",
+                     ('org/a', 'PASS' if index % 3 else 'FAIL', 50 + index, _created_at(2, index)))
+        conn.execute("INSERT INTO security_scan_results (repository, severity, status, created_at) "
+                     "VALUES ('org/a', 'HIGH', 'OPEN', ?)", (_created_at(3, index),))
+
+    conn.execute("UPDATE security_scan_results SET status = 'RESOLVED' WHERE rowid % 2 = 0")
+    # The rows holding a bucket's maximum and minimum, a status move and a move to another day
+    conn.execute("DELETE FROM quality_gate_results WHERE score IN (61, 51)")
+    conn.execute("UPDATE quality_gate_results SET status = 'FAIL' WHERE score = 55")
+    conn.execute("UPDATE quality_gate_results SET created_at_ms = created_at_ms - ? WHERE score = 56", (DAY_MS,))
+    conn.execute("UPDATE quality_gate_results SET score = NULL WHERE score = 52")
+    maintained = _rollups(conn)
+
+    conn.execute("BEGIN")
+    rebuild_rollups(conn)
+    conn.execute("COMMIT")
+    assert maintained == _rollups(conn)
+    conn.close()
+
+
+def test_archived_rows_keep_their_buckets(migrated_db, tmp_path):
+    conn = connect(str(migrated_db))
+    for days_ago in (40, 41, 1):
+        conn.execute("INSERT INTO quality_gate_results (repository, status, score, created_at) "
+                     "VALUES ('org/a', 'PASS', 80, ?)", (_created_at(days_ago),))
+    before = _rollups(conn)
+
+    archived = archive_expired_rows(conn, tmp_path / 'archive', now_ms() - 30 * DAY_MS)
+    assert archived['quality_gate_results'] == 2
+    assert _rollups(conn) == before
+
+    # Deleting a row that is still live does take it out
+    conn.execute("DELETE FROM quality_gate_results")
+    assert sum(row[5] for row in _rollups(conn) if row[1] == 'day') == 2
+    conn.close()
+
+
+def test_buckets_straddling_the_archive_cutoff_keep_their_extremes(migrated_db, tmp_path):
+    conn = connect(str(migrated_db))
+    day = (datetime.now(timezone.utc) - timedelta(days=40)).replace(minute=0, second=0, microsecond=0)
+    for hour, score in ((10, 10), (12, 50), (14, 90)):
+        conn.execute("INSERT INTO quality_gate_results (repository, status, score, created_at) "
+                     "VALUES ('org/a', 'PASS', ?, ?)", (score, day.replace(hour=hour).strftime('%Y-%m-%d %H:%M:%S')))
+
+    # The cutoff falls inside the day bucket: only the 10:00 row is archived
+    cutoff_ms = int(day.replace(hour=11).timestamp() * 1000)
+    assert archive_expired_rows(conn, tmp_path / 'archive', cutoff_ms)['quality_gate_results'] == 1
+
+    # Deleting the row holding the day's maximum must not recompute the minimum from the live rows alone
+    conn.execute("DELETE FROM quality_gate_results WHERE score = 90")
+    day_bucket = conn.execute(f"SELECT row_count, value_min, value_max FROM {ROLLUP_TABLE} "
+                              f"WHERE grain = 'day' AND metric = 'score'").fetchone()
+    assert day_bucket == (2, 10, 90)
+
+    # A bucket entirely after the cutoff still recomputes its extremes
+    conn.execute("INSERT INTO quality_gate_results (repository, status, score, created_at) "
+                 "VALUES ('org/a', 'PASS', 70, ?)", (day.replace(hour=12, minute=30).strftime('%Y-%m-%d %H:%M:%S'),))
+    conn.execute("DELETE FROM quality_gate_results WHERE score = 70")
+    hour_bucket = conn.execute(f"SELECT row_count, value_min, value_max FROM {ROLLUP_TABLE} "
+                               f"WHERE grain = 'hour' AND metric = 'score' AND bucket_start = ?",
+                               (int(day.replace(hour=12).timestamp() * 1000),)).fetchone()
+    assert hour_bucket == (1, 50, 50)
+    conn.close()
+
+
+def test_html_report_renders_status_without_scores(migrated_db, reporter_config):
+    with sqlite3.connect(migrated_db) as conn:
+        conn.execute("INSERT INTO quality_gate_results (repository, status, score, created_at) "
+                     "VALUES ('org/a', 'PASS', 90, ?)", (_created_at(2),))
+        conn.execute("INSERT INTO quality_gate_results (repository, status, score, created_at) "
+                     "VALUES ('org/a', 'WARNING', NULL, ?)", (_created_at(2),))
+
+    module = load_script('reporting/qms-reporter.py', 'qms_reporter')
+    reporter = module.QMSReporter(str(reporter_config), str(migrated_db))
+    metrics = reporter.collect_quality_metrics(30)
+
+    html = reporter.generate_html_report(metrics, {})
+    assert '<td>n/a</td>' in html
+    assert '<td>90.00</td>' in html
@@ -0,0 +1,124 @@
+"""Quantile sketch maintenance and the reporter's use of it"""
+
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+from conftest import load_script
+from qms_migrations import connect, migrate
+from qms_retention import archive_expired_rows
+from qms_sketches import DIRTY_TABLE, SKETCH_MEASURES, installed_sketches, read_digests, refresh_sketches
+from qms_time import DAY_MS, TimeWindow, now_ms
+
+
+def _fetch(db_path):
+    def fetch(query, params):
+        with sqlite3.connect(db_path) as conn:
+            return conn.execute(query, params).fetchall()
+    return fetch
+
+
+def _insert_history(db_path, days_ago=range(5, 11), per_day=20):
+    """Result rows on whole days well inside a 30-day report window"""
+    now = datetime.now(timezone.utc)
+    with sqlite3.connect(db_path) as conn:
+        for offset in days_ago:
+            day = (now - timedelta(days=offset)).strftime('%Y-%m-%d')
+            for index in range(per_day):
+                created_at = f"{day} 12:{index:02d}:00"
+                conn.execute("INSERT INTO quality_gate_results (repository, gate_name, status, score, created_at) "
+                             "VALUES ('org/a', 'build', ?, ?, ?)",
+                             ('PASS' if index % 4 else 'FAIL', 50 + index, created_at))
+                conn.execute("INSERT INTO code_coverage_results (repository, line_coverage, branch_coverage, "
+                             "created_at) VALUES ('org/a', ?, ?, ?)", (60 + index, 40 + index, created_at))
+                conn.execute("INSERT INTO code_review_results (repository, reviewer, review_time_hours, "
+                             "comments_count, approved, created_at) VALUES ('org/a', 'r', ?, 1, 1, ?)",
+                             (0.5 * index, created_at))
+
+
+def test_empty_database_gets_watermarks(migrated_db):
+    assert set(installed_sketches(_fetch(migrated_db))) == set(SKETCH_MEASURES)
+
+
+def test_migrate_refreshes_sketches(migrated_db):
+    _insert_history(migrated_db)
+    conn = connect(str(migrated_db))
+    assert migrate(conn) == []
+    conn.close()
+
+    watermarks = installed_sketches(_fetch(migrated_db))
+    assert watermarks['quality_gate_results'] == 120
+
+
+def test_report_on_refreshed_database_does_not_stream_raw_rows(migrated_db, reporter_config):
+    _insert_history(migrated_db)
+    conn = connect(str(migrated_db))
+    migrate(conn)
+    conn.close()
+
+    module = load_script('reporting/qms-reporter.py', 'qms_reporter')
+    reporter = module.QMSReporter(str(reporter_config), str(migrated_db))
+    streamed = []
+
+    def stream_rows(query, params=()):
+        for columns, rows in reporter.backend.iter_chunks(query, params):
+            streamed.extend(rows)
+            yield columns, rows
+
+    reporter._stream_rows = stream_rows
+    metrics = reporter.collect_quality_metrics(30)
+
+    assert streamed == []
+    assert metrics['distributions']['score']['count'] == 120
+    assert metrics['distributions']['review_time_hours']['max'] == 9.5
+
+
+def _scores(db_path):
+    """Merged score digest over the last 30 days, and the rows read raw to build it"""
+    streamed = []
+
+    def stream(query, params):
+        with sqlite3.connect(db_path) as conn:
+            rows = conn.execute(query, params).fetchall()
+        streamed.extend(rows)
+        yield [], rows
+
+    window = TimeWindow.last(days=30)
+    digest = read_digests(_fetch(db_path), stream, 'quality_gate_results', window,
+                          installed_sketches(_fetch(db_path))['quality_gate_results'])['score']
+    return digest, streamed
+
+
+def test_changed_rows_reach_the_sketches(migrated_db):
+    _insert_history(migrated_db)
+    conn = connect(str(migrated_db))
+    migrate(conn)
+
+    conn.execute("UPDATE quality_gate_results SET score = 500 WHERE rowid = 1")
+    conn.execute("DELETE FROM quality_gate_results WHERE rowid = 2")
+    # Touches no sketched value, so no day is marked
+    conn.execute("UPDATE quality_gate_results SET repository = 'org/b' WHERE rowid = 100")
+    assert conn.execute(f"SELECT COUNT(*) FROM {DIRTY_TABLE}").fetchone()[0] == 1
+
+    # Before a refresh the dirty day is read raw
+    digest, streamed = _scores(migrated_db)
+    assert (digest.count, digest.max) == (119, 500)
+    assert len(streamed) == 19
+
+    refresh_sketches(conn)
+    assert conn.execute(f"SELECT COUNT(*) FROM {DIRTY_TABLE}").fetchone()[0] == 0
+    digest, streamed = _scores(migrated_db)
+    assert (digest.count, digest.max) == (119, 500)
+    assert streamed == []
+    conn.close()
+
+
+def test_deleting_archived_rows_keeps_their_sketches(migrated_db, tmp_path):
+    _insert_history(migrated_db)
+    conn = connect(str(migrated_db))
+    migrate(conn)
+
+    assert archive_expired_rows(conn, tmp_path / 'archive', now_ms() - 7 * DAY_MS)['quality_gate_results'] == 60
+    assert conn.execute(f"SELECT COUNT(*) FROM {DIRTY_TABLE}").fetchone()[0] == 0
+    digest, _ = _scores(migrated_db)
+    assert digest.count == 120
+    conn.close()